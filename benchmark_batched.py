@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Batched Drawing Benchmark for AdTech Teaching Assistant Diagrams
+Compares one artist per element with the collection-batched draw_spec
+
+For each diagram both ways of drawing are timed:
+
+    build   draw_spec: creating the artists and adding them to the axes
+    draw    one full canvas draw of the laid-out figure (what savefig pays)
+
+and the two images are compared pixel by pixel; batching keeps every
+element's style, z-order and drawing order, so they should be identical.
+Besides the spec diagrams, a synthetic spec of --nodes boxes in a grid,
+each with a label and joined to its neighbours by arrows and routed
+connectors, shows how both grow with the number of elements.
+
+Usage:
+    python benchmark_batched.py                       # the spec diagrams + 1,000 nodes
+    python benchmark_batched.py --nodes 5000 --runs 3
+    python benchmark_batched.py learning-path-diagram --nodes 0
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+
+from diagram_engine import close_figure, draw_spec, load_spec, new_figure, set_headless
+
+DIAGRAMS = [
+    'aws-serverless-architecture',
+    'concept-explanation-workflow',
+    'quiz-generation-workflow',
+    'conversation-flow-diagram',
+    'learning-path-diagram',
+]
+
+def synthetic_spec(nodes):
+    """A grid of labelled boxes, each joined to its right and lower neighbours"""
+    columns = max(1, round(nodes ** 0.5))
+    rows = -(-nodes // columns)
+    palette = ['#3B82F6', '#10B981', '#F59E0B', '#6B46C1']
+    spec = {'name': f'synthetic-{nodes}', 'figure': {'size': [columns * 0.6 + 1, rows * 0.45 + 1],
+                                                     'xlim': [-0.5, columns * 3], 'ylim': [-0.5, rows * 2]},
+            'nodes': [], 'edges': []}
+    for i in range(nodes):
+        x, y = i % columns * 3, (rows - 1 - i // columns) * 2
+        spec['nodes'].append({'id': f'n{i}', 'box': [x, y, 2, 1], 'facecolor': palette[i % len(palette)],
+                              'linewidth': 1, 'labels': [{'x': x + 1, 'y': y + 0.5, 'text': f'Concept {i}',
+                                                          'fontsize': 4, 'va': 'center'}]})
+        if i % columns < columns - 1 and i + 1 < nodes:
+            spec['edges'].append({'from': [x + 2.1, y + 0.5], 'delta': [0.7, 0], 'head_width': 0.15,
+                                  'head_length': 0.15, 'linewidth': 0.5})
+        if i + columns < nodes:
+            spec['edges'].append({'kind': 'route', 'source': f'n{i}', 'target': f'n{i + columns}',
+                                  'linewidth': 0.5, 'head_width': 0.15, 'head_length': 0.15})
+    return spec
+
+def time_mode(spec, batched, dpi, runs):
+    """Returns (median build s, median draw s, PNG bytes of the last run)"""
+    builds, draws = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fig, ax = new_figure(spec)
+        draw_spec(ax, spec, batched)
+        built = time.perf_counter()
+        fig.set_dpi(dpi)
+        fig.canvas.draw()
+        builds.append(built - start)
+        draws.append(time.perf_counter() - built)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi, facecolor='white')
+        close_figure(fig)
+    return statistics.median(builds), statistics.median(draws), buffer.getvalue()
+
+def pixel_difference(first, second):
+    """Returns (differing pixels, max channel difference) of two PNGs"""
+    import numpy as np
+    from PIL import Image
+
+    a, b = (np.asarray(Image.open(io.BytesIO(data)).convert('RGBA'), dtype=np.int16) for data in (first, second))
+    if a.shape != b.shape:
+        return a.size, 255
+    diff = np.abs(a - b).max(axis=2)
+    return int((diff > 0).sum()), int(diff.max())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark collection-batched drawing against one artist per element')
+    parser.add_argument('diagrams', nargs='*', default=DIAGRAMS)
+    parser.add_argument('--nodes', type=int, default=1000, help='size of the synthetic diagram (0: none)')
+    parser.add_argument('--runs', type=int, default=5, help='runs per diagram and mode (median is kept)')
+    parser.add_argument('--dpi', type=int, default=150)
+    args = parser.parse_args(argv)
+    set_headless(True)
+
+    specs = [(name, load_spec(name)) for name in args.diagrams]
+    if args.nodes:
+        specs.append((f'synthetic ({args.nodes:,} nodes)', synthetic_spec(args.nodes)))
+
+    print(f'Drawing at {args.dpi} dpi, median of {args.runs} runs (ms)')
+    print(f'  {"diagram":<30} {"artists":>8} {"build":>8} {"draw":>8} {"batched":>8} {"build":>8} {"draw":>8} '
+          f'{"speedup":>8} {"diff px":>8}')
+    for name, spec in specs:
+        elements = len(spec.get('nodes', [])) + len(spec.get('edges', []))
+        build, draw, image = time_mode(spec, False, args.dpi, args.runs)
+        batched_build, batched_draw, batched_image = time_mode(spec, True, args.dpi, args.runs)
+        differing, _ = pixel_difference(image, batched_image)
+        speedup = (build + draw) / (batched_build + batched_draw)
+        print(f'  {name:<30} {elements:8,} {build * 1000:8.1f} {draw * 1000:8.1f} {"":>8} '
+              f'{batched_build * 1000:8.1f} {batched_draw * 1000:8.1f} {speedup:7.2f}x {differing:8,}')
+    print('  artists = nodes + edges; texts are separate artists in both modes')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Multi-Format Export Benchmark for AdTech Teaching Assistant Diagrams
+Compares export_spec (one draw, many outputs) with one full run per output
+
+The "separate runs" path rebuilds the figure, re-runs tight_layout and the
+tight-bbox pass for every output file, which is what re-running a generator
+once per format costs. Both paths write the same DEFAULT_EXPORTS targets.
+Everything runs in one warm interpreter, so the savings shown are a lower
+bound: separate script runs also pay the matplotlib import each time.
+
+Usage:
+    python benchmark_export.py                       # all specs, 3 repeats
+    python benchmark_export.py learning-path-diagram --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from diagram_engine import (DEFAULT_EXPORTS, build_figure, close_figure, export_spec,
+                            load_spec, set_headless)
+
+DEFAULT_SPECS = [
+    'aws-serverless-architecture',
+    'concept-explanation-workflow',
+    'quiz-generation-workflow',
+    'conversation-flow-diagram',
+    'learning-path-diagram',
+]
+
+def export_separately(spec, output_dir, targets=DEFAULT_EXPORTS):
+    """Writes each target from its own freshly built figure"""
+    for target in targets:
+        fig = build_figure(spec)
+        dpi = target.get('dpi', 300)
+        if 'max_width' in target:
+            dpi = target['max_width'] / fig.get_tightbbox().width
+        path = os.path.join(output_dir, f"{spec['name']}{target.get('suffix', '')}.{target['format']}")
+        fig.savefig(path, format=target['format'], dpi=dpi, bbox_inches='tight', facecolor='white')
+        close_figure(fig)
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark render-once multi-format export')
+    parser.add_argument('specs', nargs='*', default=DEFAULT_SPECS)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    set_headless(True)
+
+    formats = ', '.join(f"{t['format']}{t.get('suffix', '')}" for t in DEFAULT_EXPORTS)
+    print(f'Exporting {formats} (median of {args.repeat})')
+    print(f'  {"diagram":<32} {"separate":>9} {"export":>9} {"saved":>7}')
+    total_separate = total_export = 0
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name in args.specs:
+            spec = load_spec(name)
+            separate = time_call(lambda: export_separately(spec, output_dir), args.repeat)
+            once = time_call(lambda: export_spec(spec, output_dir), args.repeat)
+            total_separate += separate
+            total_export += once
+            print(f'  {name:<32} {separate:8.2f}s {once:8.2f}s {1 - once / separate:6.0%}')
+    print(f'  {"total":<32} {total_separate:8.2f}s {total_export:8.2f}s '
+          f'{1 - total_export / total_separate:6.0%}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
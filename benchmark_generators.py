@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Generator Benchmark Suite for AdTech Teaching Assistant Diagrams
+Measures every create_* generator in clean processes and gates regressions
+
+Each run starts a fresh interpreter that imports the generator's script,
+calls it once in headless mode and reports:
+
+    wall_s        wall-clock time of import + render
+    cpu_s         user + system CPU time of the process
+    peak_rss_mb   peak resident set size of the process
+    output_bytes  size of the written image
+
+The median of the runs is kept per generator. --save stores the results as a
+JSON baseline; --compare checks them against one and exits non-zero when a
+metric grows past its threshold (relative, e.g. 0.25 = 25% worse) or a
+generator has no baseline entry. Times and memory depend on the machine, so
+record the baseline where the gate runs.
+
+Usage:
+    python benchmark_generators.py                            # measure and print
+    python benchmark_generators.py --runs 5 --save            # write benchmark-baseline.json
+    python benchmark_generators.py --compare                  # fail on regressions
+    python benchmark_generators.py --compare --threshold wall_s=0.5 create_learning_path_diagram
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from render_all import ROOT_DIR, discover_generators
+
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmark-baseline.json')
+
+# Allowed relative growth per metric before --compare fails
+DEFAULT_THRESHOLDS = {'wall_s': 0.25, 'cpu_s': 0.25, 'peak_rss_mb': 0.15, 'output_bytes': 0.05}
+
+# Runs inside the clean interpreter; prints one JSON object
+CHILD_CODE = '''
+import json, os, resource, sys, time
+start_wall, start_cpu = time.perf_counter(), time.process_time()
+from render_all import load_script
+script, name, output_dir = sys.argv[1:4]
+path = getattr(load_script(script), name)(output_dir=output_dir)
+usage = resource.getrusage(resource.RUSAGE_SELF)
+print(json.dumps({
+    'wall_s': time.perf_counter() - start_wall,
+    'cpu_s': time.process_time() - start_cpu,
+    'peak_rss_mb': usage.ru_maxrss / 1024,
+    'output_bytes': os.path.getsize(path),
+}))
+'''
+
+def measure_once(script, name):
+    """Runs one generator in a fresh headless interpreter, returns its metrics"""
+    env = dict(os.environ, DIAGRAM_HEADLESS='1', MPLBACKEND='Agg')
+    with tempfile.TemporaryDirectory() as output_dir:
+        result = subprocess.run([sys.executable, '-c', CHILD_CODE, script, name, output_dir],
+                                cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure(generators, runs):
+    """Returns {name: median metrics} over runs clean-process runs"""
+    results = {}
+    for script, name in generators:
+        samples = [measure_once(script, name) for _ in range(runs)]
+        results[name] = {metric: round(statistics.median(sample[metric] for sample in samples), 4)
+                         for metric in DEFAULT_THRESHOLDS}
+        metrics = results[name]
+        print(f'  {name:<40} {metrics["wall_s"]:6.2f}s wall {metrics["cpu_s"]:6.2f}s cpu '
+              f'{metrics["peak_rss_mb"]:6.0f} MB {metrics["output_bytes"] / 1024:6.0f} KB', flush=True)
+    return results
+
+def compare(results, baseline, thresholds):
+    """Returns a message for every metric that regressed past its threshold"""
+    failures = []
+    for name, metrics in results.items():
+        if name not in baseline:  # an unmeasured generator must not slip past the gate
+            failures.append(f'{name}: no baseline entry; record one with --save {name}')
+            continue
+        for metric, limit in thresholds.items():
+            before, after = baseline[name][metric], metrics[metric]
+            change = (after - before) / before if before else 0
+            if change > limit:
+                failures.append(f'{name} {metric}: {before:.4g} -> {after:.4g} '
+                                f'(+{change:.0%}, threshold {limit:.0%})')
+    return failures
+
+def parse_thresholds(values):
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for value in values:
+        metric, _, limit = value.partition('=')
+        if metric not in thresholds or not limit:
+            raise ValueError(f'expected METRIC=FRACTION with METRIC one of {list(thresholds)}, got {value!r}')
+        thresholds[metric] = float(limit)
+    return thresholds
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every diagram generator in clean processes')
+    parser.add_argument('names', nargs='*', help='only benchmark these create_* functions')
+    parser.add_argument('--runs', type=int, default=3, help='clean-process runs per generator (median is kept)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--save', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--compare', action='store_true', help='fail when a metric regresses past its threshold')
+    parser.add_argument('--threshold', action='append', default=[], metavar='METRIC=FRACTION',
+                        help='override an allowed relative regression, e.g. wall_s=0.5')
+    args = parser.parse_args(argv)
+    try:
+        thresholds = parse_thresholds(args.threshold)
+    except ValueError as error:
+        parser.error(str(error))
+
+    generators = discover_generators()
+    if args.names:
+        unknown = set(args.names) - {name for _, name in generators}
+        if unknown:
+            parser.error('unknown generator(s): ' + ', '.join(sorted(unknown)))
+        generators = [(script, name) for script, name in generators if name in args.names]
+
+    print(f'Benchmarking {len(generators)} generators, median of {args.runs} clean runs')
+    results = measure(generators, args.runs)
+
+    failures = []
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, thresholds)
+        for failure in failures:
+            print(f'FAIL: {failure}')
+        if not failures:
+            print(f'No regressions against {args.baseline}')
+    if args.save and not failures:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)  # a partial run keeps the other entries
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Saved baseline to {args.baseline}')
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Handler Load Generator for AdTech Teaching Assistant
+Drives the local stand-in handler at a fixed concurrency and reports latency
+
+A pool of asyncio workers sends a fixed number of requests through
+LocalHandler; each request's wall latency, status, response type and
+availability flags are recorded. Records are written as JSONL with a
+"stages" mapping, so the same file feeds latency_waterfall.py, and the raw
+responses can be captured in benchmark_test.json form for the ingestion
+tools.
+
+--scenarios runs the same load once per backend configuration, to compare
+e.g. throughput and tail latency with and without the knowledge base. With
+more than one scenario, --records and --captures get one file per scenario,
+named after it (load.jsonl -> load.no-kb.jsonl), since request ids repeat.
+
+Usage:
+    python benchmark_handler.py --requests 5000 --concurrency 200
+    python benchmark_handler.py --scenarios full,no-kb,no-bedrock --time-scale 0.1
+    python benchmark_handler.py --records load.jsonl --captures responses.jsonl
+    python benchmark_handler.py --scenarios full,no-kb --records load.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import ExitStack
+
+from local_handler import HandlerConfig, LocalHandler
+
+SCENARIOS = {
+    'full': {},
+    'no-kb': {'knowledge_base_available': False},
+    'no-bedrock': {'bedrock_available': False},
+    'no-s3': {'s3_documents_available': False},
+    'offline': {'knowledge_base_available': False, 'bedrock_available': False, 's3_documents_available': False},
+}
+
+MESSAGES = ['hello', 'What is RTB?', 'Explain header bidding', 'How does a DSP work?',
+            'What does an SSP do?', 'What is programmatic advertising?', 'Quiz me on real-time bidding']
+
+async def run_load(handler, requests, concurrency, on_record=None):
+    """Sends requests through handler with concurrency workers, returns (records, seconds)"""
+    records = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for number in counter:
+            event = {'message': MESSAGES[number % len(MESSAGES)], 'user_id': f'load_user_{number % 97}'}
+            start = time.perf_counter()
+            response, stages = await handler.invoke(event)
+            latency = (time.perf_counter() - start) * 1000
+            body = json.loads(response['body'])
+            record = {
+                'request_id': f'req_{number}',
+                'latency_ms': round(latency, 3),
+                'statusCode': response['statusCode'],
+                'type': body.get('type', 'error'),
+                'knowledge_base_available': body.get('knowledge_base_available'),
+                'bedrock_available': body.get('bedrock_available'),
+                's3_documents_available': body.get('s3_documents_available'),
+                'stages': stages,
+            }
+            records.append(record)
+            if on_record:
+                on_record(record, response)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return records, time.perf_counter() - start
+
+def summarize(records, seconds):
+    """Throughput, latency percentiles and counts by response type; percentiles are None without records"""
+    latencies = sorted(record['latency_ms'] for record in records)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    p50, p95, p99 = (round(cuts[q - 1], 2) if cuts else None for q in (50, 95, 99))
+    types = {}
+    for record in records:
+        types[record['type']] = types.get(record['type'], 0) + 1
+    return {
+        'requests': len(records),
+        'seconds': round(seconds, 3),
+        'throughput_rps': round(len(records) / seconds, 1) if seconds else 0,
+        'errors': sum(record['statusCode'] != 200 for record in records),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'max_ms': round(latencies[-1], 2) if latencies else 0,
+        'types': types,
+    }
+
+def scenario_path(path, name, scenarios):
+    """path itself for a single scenario, else path with the scenario name before the extension"""
+    if len(scenarios) == 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f'{root}.{name}{ext}'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the local stand-in handler')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--scenarios', default='full', help=f'comma-separated, from {", ".join(SCENARIOS)}')
+    parser.add_argument('--time-scale', type=float, default=1.0, help='scale simulated latencies (0.1 = 10x faster)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--records', help='write per-request records (JSONL, latency_waterfall trace format)')
+    parser.add_argument('--captures', help='write raw handler responses (JSONL, benchmark_test.json format)')
+    parser.add_argument('--json', action='store_true', help='print the summaries as JSON')
+    args = parser.parse_args(argv)
+    scenarios = args.scenarios.split(',')
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f'unknown scenarios {unknown}, expected some of {list(SCENARIOS)}')
+    if args.requests < 1 or args.concurrency < 1:
+        parser.error('--requests and --concurrency must be at least 1')
+
+    summaries = {}
+    for name in scenarios:
+        with ExitStack() as stack:
+            records_file = (stack.enter_context(open(scenario_path(args.records, name, scenarios), 'w'))
+                            if args.records else None)
+            captures_file = (stack.enter_context(open(scenario_path(args.captures, name, scenarios), 'w'))
+                             if args.captures else None)
+
+            def write(record, response):
+                if records_file:
+                    records_file.write(json.dumps(record) + '\n')
+                if captures_file:
+                    captures_file.write(json.dumps(response) + '\n')
+
+            config = HandlerConfig(time_scale=args.time_scale, error_rate=args.error_rate, seed=args.seed,
+                                   **SCENARIOS[name])
+            records, seconds = asyncio.run(run_load(LocalHandler(config), args.requests, args.concurrency, write))
+            summaries[name] = summarize(records, seconds)
+
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+        return 0
+    print(f'{args.requests} requests per scenario at concurrency {args.concurrency} '
+          f'(latencies x{args.time_scale:g})')
+    print(f'  {"scenario":<12} {"req/s":>9} {"p50":>9} {"p95":>9} {"p99":>9} {"errors":>7}  types')
+    for name, summary in summaries.items():
+        types = ', '.join(f'{kind} {count}' for kind, count in sorted(summary['types'].items()))
+        print(f'  {name:<12} {summary["throughput_rps"]:9.1f} {summary["p50_ms"]:7.1f}ms {summary["p95_ms"]:7.1f}ms '
+              f'{summary["p99_ms"]:7.1f}ms {summary["errors"]:7d}  {types}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Cold-Start Import Benchmark for AdTech Teaching Assistant Diagrams
+Measures import cost with `python -X importtime` and fails past a time budget
+
+The generator scripts and render_all.py must import without pulling in
+matplotlib or numpy; those load on first render. Each run imports the modules
+in a fresh interpreter and sums the cumulative time of the top-level imports.
+
+Usage:
+    python benchmark_import_time.py                  # default modules and budget
+    python benchmark_import_time.py --budget-ms 80 --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MODULES = ['render_all', 'diagram_engine', 'workflow_diagrams', 'conversation_flow_diagram']
+DEFAULT_BUDGET_MS = 150.0
+
+# Heavy packages that must stay deferred until a figure is actually drawn
+DEFERRED_PACKAGES = ('matplotlib', 'numpy', 'PIL')
+
+def parse_importtime(stderr):
+    """Parses -X importtime output into (module, self us, cumulative us, depth) rows"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+def measure_once(modules):
+    """Imports modules in a fresh interpreter, returns the importtime rows"""
+    code = 'import ' + ', '.join(modules)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT_DIR,
+                            capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fail when cold-start import time exceeds a budget')
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to measure (median is used)')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=10, help='heaviest imports to list')
+    args = parser.parse_args(argv)
+
+    totals = []
+    for _ in range(args.runs):
+        rows = measure_once(args.modules)
+        # Depth-0 rows include interpreter startup (site, encodings), which is part of cold start too
+        totals.append(sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000)
+    median_ms = statistics.median(totals)
+
+    print(f'Import time for {", ".join(args.modules)}:')
+    print(f'  median {median_ms:.1f} ms over {args.runs} runs '
+          f'(min {min(totals):.1f}, max {max(totals):.1f}), budget {args.budget_ms:.1f} ms')
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[1])[:args.top]:
+        print(f'  {self_us / 1000:7.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {name}')
+
+    failures = []
+    leaked = sorted({name for name, _, _, _ in rows if name.split('.')[0] in DEFERRED_PACKAGES})
+    if leaked:
+        failures.append('deferred packages imported at startup: ' + ', '.join(leaked[:5]))
+    if median_ms > args.budget_ms:
+        failures.append(f'median import time {median_ms:.1f} ms exceeds budget {args.budget_ms:.1f} ms')
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Static Layer Benchmark for AdTech Teaching Assistant Diagrams
+Compares layered rendering (cached static layer + overlay) with full redraws
+
+The full path is what personalized renders cost today: copy the spec with the
+instance's texts, build and lay out the figure, draw it and PNG-encode it
+with a tight bounding box. The layered path reuses one LayeredRenderer per
+diagram. Times are reported for the overlay alone (RGBA pixels) and with PNG
+encoding, and the images of both paths are compared pixel by pixel; the
+layered path draws at savefig's offset, so they should be identical.
+
+Usage:
+    python benchmark_layered.py                  # both diagrams, 20 instances
+    python benchmark_layered.py --count 100 --dpi 100
+"""
+
+import argparse
+import copy
+import io
+import sys
+import time
+
+from conversation_flow_diagram import learning_path_texts
+from diagram_engine import find_label, load_spec, render_to_bytes, set_headless
+from layered_render import LayeredRenderer
+from learning_path_batch import synthetic_records
+
+def learning_path_instances(spec, count):
+    """Yields {label id: text} for count generated students"""
+    for record in synthetic_records(count):
+        yield learning_path_texts(spec, record)
+
+def conversation_instances(spec, count):
+    """Yields {label id: text} with every turn label renumbered per instance"""
+    label_ids = [label['id'] for node in spec['nodes'] for label in node.get('labels', []) if 'id' in label]
+    for i in range(count):
+        yield {label_id: f"{find_label(spec, label_id)['text']} #{i}" for label_id in label_ids}
+
+DIAGRAMS = {
+    'learning-path-diagram': learning_path_instances,
+    'conversation-flow-diagram': conversation_instances,
+}
+
+def copy_with_texts(spec, texts):
+    spec = copy.deepcopy(spec)
+    for label_id, text in texts.items():
+        find_label(spec, label_id)['text'] = text
+    return spec
+
+def time_full(spec, instances, dpi):
+    start = time.perf_counter()
+    images = []
+    for texts in instances:
+        instance = copy_with_texts(spec, texts)
+        images.append(render_to_bytes(instance, 'png', dpi))
+    return (time.perf_counter() - start) / len(instances), images
+
+def time_layered(renderer, instances):
+    start = time.perf_counter()
+    for texts in instances:
+        renderer.render_rgba(texts)
+    overlay = (time.perf_counter() - start) / len(instances)
+    start = time.perf_counter()
+    images = [renderer.render(texts) for texts in instances]
+    return overlay, (time.perf_counter() - start) / len(instances), images
+
+def pixel_difference(first, second):
+    """Returns (share of differing pixels, max channel difference) of two PNGs"""
+    import numpy as np
+    from PIL import Image
+
+    a, b = (np.asarray(Image.open(io.BytesIO(data)).convert('RGBA'), dtype=np.int16) for data in (first, second))
+    if a.shape != b.shape:
+        return 1.0, 255
+    diff = np.abs(a - b).max(axis=2)
+    return float((diff > 0).mean()), int(diff.max())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark static-layer caching against full redraws')
+    parser.add_argument('diagrams', nargs='*', default=list(DIAGRAMS))
+    parser.add_argument('--count', type=int, default=20, help='instances rendered per diagram')
+    parser.add_argument('--dpi', type=int, default=150)
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.diagrams) - set(DIAGRAMS))
+    if unknown:
+        parser.error(f'unknown diagrams {unknown}, expected some of {list(DIAGRAMS)}')
+    set_headless(True)
+
+    print(f'Rendering {args.count} instances per diagram at {args.dpi} dpi (ms per image)')
+    print(f'  {"diagram":<28} {"full":>8} {"setup":>8} {"overlay":>8} {"layered":>8} {"speedup":>8} {"diff px":>8}')
+    for name in args.diagrams:
+        spec = load_spec(name)
+        instances = list(DIAGRAMS[name](spec, args.count))
+        full, full_images = time_full(spec, instances, args.dpi)
+
+        start = time.perf_counter()
+        renderer = LayeredRenderer(spec, list(instances[0]), args.dpi)
+        setup = time.perf_counter() - start
+        overlay, layered, layered_images = time_layered(renderer, instances)
+        renderer.close()
+
+        differing = max(pixel_difference(a, b)[0] for a, b in zip(full_images, layered_images))
+        print(f'  {name:<28} {full * 1000:8.1f} {setup * 1000:8.1f} {overlay * 1000:8.1f} '
+              f'{layered * 1000:8.1f} {full / layered:7.1f}x {differing:8.2%}')
+    print('  overlay = restore static layer + draw labels; layered = overlay + PNG encode')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
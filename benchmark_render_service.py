@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Render Service Load Generator for AdTech Teaching Assistant Diagrams
+Drives render_service.py at several concurrency levels and reports latency
+
+For each concurrency level a fixed number of learning path requests is sent
+over keep-alive connections, one connection per concurrent client. The
+requests cycle through --distinct learner records that are new to that
+level, so every level starts with a cold cache: the first request for a
+record is a miss (or shares the render of an identical request in flight)
+and the repeats are hits. --distinct equal to --requests makes every
+request a render.
+
+Results are summarized like benchmark_handler.py: requests per second,
+p50/p95/p99 latency, and counts by X-Cache status.
+
+Without --port the service is started in this process (its workers are
+separate processes, as in production) on a free port.
+
+Usage:
+    python benchmark_render_service.py --requests 400 --concurrency 1,8,32,128
+    python benchmark_render_service.py --distinct 400 --requests 400    # renders only
+    python benchmark_render_service.py --port 8765 --json                # a running service
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from benchmark_handler import summarize
+from conversation_flow_diagram import LEVELS
+from render_service import post, serve
+
+CONCEPTS = ['DSP Basics', 'SSP Intro', 'Ad Exchanges', 'RTB Process', 'Header Bidding', 'Attribution']
+
+def learner(number, level):
+    """A learning path request for one synthetic learner, distinct per (number, level)"""
+    return {'diagram': 'learning-path', 'record': {
+        'name': f'Learner {level}-{number}',
+        'current_level': LEVELS[number % len(LEVELS)],
+        'completed': CONCEPTS[:number % len(CONCEPTS)],
+        'next_concept': CONCEPTS[number % len(CONCEPTS)],
+    }}
+
+async def run_level(host, port, requests, concurrency, distinct):
+    """Sends requests with concurrency clients, returns (records, seconds)"""
+    records = []
+    counter = iter(range(requests))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for number in counter:
+                start = time.perf_counter()
+                status, headers, _ = await post(reader, writer, learner(number % distinct, concurrency))
+                records.append({'latency_ms': (time.perf_counter() - start) * 1000, 'statusCode': status,
+                                'type': headers.get('x-cache', 'error')})
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return records, time.perf_counter() - start
+
+async def run(args, levels):
+    summaries = {}
+
+    async def measure(host, port):
+        for concurrency in levels:
+            summaries[concurrency] = summarize(*await run_level(host, port, args.requests, concurrency,
+                                                                args.distinct))
+
+    if args.port:
+        await measure(args.host, args.port)
+        return summaries, None
+    listening = asyncio.get_running_loop().create_future()
+    server = asyncio.create_task(serve('127.0.0.1', 0, args.jobs, int(args.cache_mb * 1024 * 1024),
+                                       ready=lambda service, port: listening.set_result((service, port))))
+    started = time.perf_counter()
+    done, _ = await asyncio.wait([server, listening], return_when=asyncio.FIRST_COMPLETED)
+    if server in done:
+        server.result()  # startup failed: raise its error
+    service, port = listening.result()
+    warm_up = time.perf_counter() - started
+    try:
+        await measure('127.0.0.1', port)
+    finally:
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
+    return summaries, {'warm_up_s': round(warm_up, 2), **service.stats()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the render service')
+    parser.add_argument('--requests', type=int, default=400, help='requests per concurrency level')
+    parser.add_argument('--concurrency', default='1,8,32,128', help='comma-separated concurrency levels')
+    parser.add_argument('--distinct', type=int, default=100, help='distinct learners per level')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='use a running service instead of starting one')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='workers of the started service')
+    parser.add_argument('--cache-mb', type=float, default=256)
+    parser.add_argument('--json', action='store_true', help='print the summaries as JSON')
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    summaries, service = asyncio.run(run(args, levels))
+    if args.json:
+        print(json.dumps({'levels': summaries, 'service': service}, indent=2))
+        return 0
+    if service:
+        print(f"Service started with {service['workers']} warm workers in {service['warm_up_s']:.2f}s")
+    print(f'{args.requests} learning path requests per level over {args.distinct} distinct learners')
+    print(f'  {"clients":>7} {"req/s":>9} {"p50":>9} {"p95":>9} {"p99":>9} {"errors":>7}  cache')
+    for concurrency, summary in summaries.items():
+        types = ', '.join(f'{kind} {count}' for kind, count in sorted(summary['types'].items()))
+        print(f'  {concurrency:7d} {summary["throughput_rps"]:9.1f} {summary["p50_ms"]:7.1f}ms '
+              f'{summary["p95_ms"]:7.1f}ms {summary["p99_ms"]:7.1f}ms {summary["errors"]:7d}  {types}')
+    if service:
+        print(f"  mean render {service['mean_render_ms']} ms, {service['cache']['entries']} images "
+              f"({service['cache']['bytes'] / 1024 / 1024:.1f} MB) cached")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
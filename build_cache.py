@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Incremental Build Cache for AdTech Teaching Assistant Diagrams
+Skips re-rendering diagrams whose inputs have not changed since the last build
+
+Each diagram is keyed on a hash of everything that affects its pixels: the
+generator source, its parameters, the matplotlib, Pillow and NumPy versions
+(drawing, PNG encoding and optimization), the output settings and the files
+it draws from (specs, the rendering engine). Keys and output
+checksums live in a JSON manifest next to the images.
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = '.diagram-cache.json'
+
+# Settings every generator uses for its savefig call
+DEFAULT_OUTPUT_SETTINGS = {'format': 'png', 'dpi': 300, 'bbox_inches': 'tight', 'facecolor': 'white',
+                           'metadata': 'reproducible'}
+
+def file_digest(path):
+    """Returns the sha256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_key(source, params=None, output_settings=DEFAULT_OUTPUT_SETTINGS, dependencies=()):
+    """Hashes the inputs of a generator call into a cache key
+
+    source is the generator's source code; dependencies are paths of files
+    the generator reads, and their contents are part of the key too.
+    """
+    from importlib.metadata import version
+
+    payload = {
+        'source': source,
+        'params': params or {},
+        'matplotlib': version('matplotlib'),
+        'pillow': version('pillow'),
+        'numpy': version('numpy'),
+        'output': output_settings,
+        'dependencies': {os.path.basename(path): file_digest(path) for path in dependencies},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+class BuildCache:
+    """On-disk manifest of cache keys and output checksums for one output directory"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.hits = []
+        self.misses = []
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def is_fresh(self, name, key):
+        """True when the diagram was built with this key and its outputs are untouched"""
+        entry = self.entries.get(name)
+        fresh = entry is not None and entry['key'] == key and all(
+            self._output_matches(filename, digest) for filename, digest in entry['outputs'].items())
+        (self.hits if fresh else self.misses).append(name)
+        return fresh
+
+    def _output_matches(self, filename, digest):
+        path = os.path.join(self.output_dir, filename)
+        return os.path.exists(path) and file_digest(path) == digest
+
+    def intact_outputs(self):
+        """Returns {key: output paths} for every entry whose outputs are untouched"""
+        return {entry['key']: [os.path.join(self.output_dir, filename) for filename in entry['outputs']]
+                for entry in self.entries.values()
+                if all(self._output_matches(filename, digest) for filename, digest in entry['outputs'].items())}
+
+    def record(self, name, key, output_paths):
+        """Stores the key and output checksums of a freshly rendered diagram"""
+        self.entries[name] = {
+            'key': key,
+            'outputs': {os.path.relpath(path, self.output_dir): file_digest(path) for path in output_paths},
+        }
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        total = len(self.hits) + len(self.misses)
+        print(f'Build cache: {len(self.hits)}/{total} hits, {len(self.misses)} misses')
+        for name in self.hits:
+            print(f'  hit   {name}')
+        for name in self.misses:
+            print(f'  miss  {name}')
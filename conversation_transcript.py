@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Conversation Transcript Diagrams for AdTech Teaching Assistant
+Lays out multi-turn conversation diagrams from real transcripts of any length
+
+A transcript is JSONL, one turn per line, with the context and memory state
+the agent had at that turn:
+
+    {"user": "What is RTB?", "agent": "Explains Real-Time Bidding basics",
+     "context": "Beginner", "memory": "Store: RTB",
+     "topic": "RTB", "level": "Beginner", "suggestions": ["DSP Integration"]}
+
+Only user and agent are required. topic and level feed the Context Memory
+panel (falling back to memory and context); suggestions are taken from the
+latest turn that has them. A .json file may instead hold
+{"title": ..., "subtitle": ..., "turns": [...]}, and --slack reads a Slack
+channel export, pairing each user message with the bot reply after it.
+
+Rows reuse the first turn of diagram_specs/conversation-flow-diagram.json as
+a template, so the figure grows linearly with the number of turns. PDF output
+is paginated: turns are read lazily, one page is built, saved and released at
+a time, and only a small running summary is kept, so memory stays flat
+however long the conversation is.
+
+Usage:
+    python conversation_transcript.py transcripts/rtb-basics.jsonl -o out/
+    python conversation_transcript.py support.jsonl --format pdf --turns-per-page 12
+    python conversation_transcript.py --slack export/ad-ops/2024-05-01.json --format pdf
+"""
+
+import argparse
+import copy
+import json
+import os
+import re
+import sys
+from collections import deque
+from itertools import islice
+
+from diagram_engine import (SAVE_METADATA, build_figure, close_figure, default_output_dir, find_node,
+                            load_spec, render_spec, set_headless)
+
+BASE_SPEC = 'conversation-flow-diagram'
+
+# Turn field -> (template node, label format)
+COLUMNS = {
+    'user': ('user_turn1', 'User: "{}"'),
+    'agent': ('agent_turn1', 'Agent: {}'),
+    'context': ('context_turn1', 'Context: {}'),
+    'memory': ('memory_turn1', '{}'),
+}
+
+# Items kept in the Context Memory panel's history and progression lines
+SUMMARY_ITEMS = 5
+
+DEFAULT_TURNS_PER_PAGE = 12
+
+def read_transcript(path):
+    """Returns (metadata, turns) for a transcript file; turns of a JSONL file are read lazily"""
+    if path.endswith('.jsonl'):
+        return {}, _read_jsonl(path)
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {}, iter(data)
+    return {key: value for key, value in data.items() if key != 'turns'}, iter(data['turns'])
+
+def _read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                turn = json.loads(line)
+                if 'user' not in turn or 'agent' not in turn:
+                    raise ValueError(f'{path}:{number}: a turn needs "user" and "agent"')
+                yield turn
+
+def turns_from_slack(messages):
+    """Pairs the messages of a Slack export into turns
+
+    Bot messages are agent replies; consecutive messages from the same side
+    are joined. Context and memory state are taken from a bot message's
+    metadata event_payload when present.
+    """
+    turn = None
+    for message in sorted(messages, key=lambda message: float(message.get('ts', 0))):
+        text = message.get('text', '').strip()
+        if not text or message.get('subtype') in ('channel_join', 'channel_leave'):
+            continue
+        from_agent = 'bot_id' in message or message.get('subtype') == 'bot_message'
+        if not from_agent:
+            if turn is not None and turn['agent']:
+                yield turn
+                turn = None
+            if turn is None:
+                turn = {'user': text, 'agent': ''}
+            else:
+                turn['user'] += ' ' + text
+        elif turn is not None:
+            turn['agent'] = f"{turn['agent']} {text}".strip()
+            payload = message.get('metadata', {}).get('event_payload', {})
+            turn.update({key: payload[key] for key in ('context', 'memory', 'topic', 'level', 'suggestions')
+                         if key in payload})
+    if turn is not None:
+        yield turn
+
+def _plain(text):
+    # Collapsed whitespace, the engine wraps to the box; '$' would otherwise start mathtext
+    return re.sub(r'\s+', ' ', str(text)).strip().replace('$', r'\$')
+
+class ConversationSummary:
+    """Running Context Memory panel texts, bounded however many turns are added"""
+
+    def __init__(self):
+        self.topics = deque(maxlen=SUMMARY_ITEMS)
+        self.levels = deque(maxlen=SUMMARY_ITEMS)
+        self.topic_count = self.level_count = 0
+        self.suggestions = None
+
+    def add(self, turn):
+        topic = turn.get('topic') or turn.get('memory')
+        if topic:
+            self.topics.append(_plain(topic))
+            self.topic_count += 1
+        level = turn.get('level') or turn.get('context')
+        if level and (not self.levels or self.levels[-1] != _plain(level)):
+            self.levels.append(_plain(level))
+            self.level_count += 1
+        if turn.get('suggestions'):
+            suggestions = turn['suggestions']
+            self.suggestions = _plain(suggestions if isinstance(suggestions, str) else ', '.join(suggestions))
+
+    @staticmethod
+    def _chain(items, count):
+        return ('… → ' if count > len(items) else '') + ' → '.join(items) if items else '—'
+
+    def texts(self):
+        return {
+            'history': '• Conversation History: ' + self._chain(self.topics, self.topic_count),
+            'progression': '• User Progression: ' + self._chain(self.levels, self.level_count),
+            'suggestions': '• Next Suggestions: ' + (self.suggestions or '—'),
+        }
+
+def _shift(points, dy):
+    return [points[0], points[1] + dy]
+
+def conversation_spec(turns, title=None, subtitle=None, first_turn=1, rows=None, summary=None, base=None):
+    """Builds a conversation flow spec with one row per turn
+
+    rows is the number of turns the canvas is sized for (default: all of
+    them), so pages of a long transcript share one size. summary holds the
+    Context Memory panel texts (see ConversationSummary.texts); without it
+    the panel is left out.
+    """
+    base = base or load_spec(BASE_SPEC)
+    turns = list(turns)
+    rows = max(rows or len(turns), 1)
+    top = base['figure']['ylim'][1]
+    first_y = find_node(base, 'user_turn1')['box'][1]
+    pitch = first_y - find_node(base, 'user_turn2')['box'][1]
+    last_y = find_node(base, 'user_turn3')['box'][1]
+    panel = find_node(base, 'context_memory')
+    panel_gap = last_y - panel['box'][1]
+    bottom_margin = panel['box'][1] - base['figure']['ylim'][0]
+
+    # Heights in the base spec's units: header, one pitch per extra row, panel and margin
+    height = (top - first_y) + (rows - 1) * pitch + panel_gap + bottom_margin
+    shift = height - top  # moves template y positions into the taller canvas
+    width = base['figure']['size'][0]
+    spec = {
+        'name': base['name'],
+        'output': base.get('output', base['name'] + '.png'),
+        'figure': {'size': [width, height], 'xlim': base['figure']['xlim'], 'ylim': [0, height]},
+        'colors': base['colors'],
+        'texts': copy.deepcopy(base['texts']),
+        'nodes': [],
+        'edges': [],
+    }
+    for item, text in zip(spec['texts'], (title, subtitle)):
+        item['y'] += shift
+        if text is not None:
+            item['text'] = _plain(text)
+
+    row_top = first_y + find_node(base, 'user_turn1')['box'][3]
+    row_edges = [edge for edge in base['edges'] if first_y <= edge['from'][1] <= row_top]
+    for index, turn in enumerate(turns):
+        number = first_turn + index
+        dy = shift - index * pitch
+        for field, (template_id, label_format) in COLUMNS.items():
+            node = copy.deepcopy(find_node(base, template_id))
+            node['id'] = f'{field}_turn{number}'
+            node['box'][1] += dy
+            label = node['labels'][0]
+            label['id'] = f'{field}{number}'
+            label['y'] += dy
+            text = label_format.format(_plain(turn.get(field, ''))) if turn.get(field) else ''
+            label['text'] = text
+            spec['nodes'].append(node)
+        for edge in row_edges:
+            if edge.get('kind') == 'curve' and index == len(turns) - 1:
+                continue  # memory feeds the next turn's context
+            edge = copy.deepcopy(edge)
+            edge['from'] = _shift(edge['from'], dy)
+            if 'to' in edge:
+                edge['to'] = _shift(edge['to'], dy)
+            spec['edges'].append(edge)
+    # Same draw order as the base spec: arrows first, curves on top
+    spec['edges'].sort(key=lambda edge: edge.get('kind') == 'curve')
+
+    if summary is not None:
+        node = copy.deepcopy(panel)
+        dy = shift + (first_y - last_y) - (len(turns) - 1) * pitch  # keep the gap below the last row
+        node['box'][1] += dy
+        for label in node['labels']:
+            label['y'] += dy
+            if label.get('id') in summary:
+                label['text'] = summary[label['id']]
+        spec['nodes'].append(node)
+    return spec
+
+def transcript_spec(turns, title=None, subtitle=None):
+    """Builds one spec holding every turn and the Context Memory panel"""
+    turns = list(turns)
+    summary = ConversationSummary()
+    for turn in turns:
+        summary.add(turn)
+    return conversation_spec(turns, title, subtitle, summary=summary.texts())
+
+def paginate(turns, turns_per_page):
+    """Yields (first turn number, turns, is last page) with one page of lookahead"""
+    turns = iter(turns)
+    page = list(islice(turns, turns_per_page))
+    first = 1
+    while page:
+        following = list(islice(turns, turns_per_page))
+        yield first, page, not following
+        first += len(page)
+        page = following
+
+def write_transcript_pdf(turns, path, title=None, subtitle=None, turns_per_page=DEFAULT_TURNS_PER_PAGE):
+    """Streams a transcript into a multi-page PDF, returns the number of pages
+
+    Every page is the same size; the Context Memory panel closes the last one.
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    base = load_spec(BASE_SPEC)
+    summary = ConversationSummary()
+    pages = 0
+    with PdfPages(path, metadata=SAVE_METADATA['pdf']) as pdf:
+        for first, page, last in paginate(turns, turns_per_page):
+            for turn in page:
+                summary.add(turn)
+            pages += 1
+            page_subtitle = subtitle or base['texts'][1]['text']
+            page_subtitle += f' (turns {first}–{first + len(page) - 1}, page {pages})'
+            spec = conversation_spec(page, title, page_subtitle, first, rows=turns_per_page,
+                                     summary=summary.texts() if last else None, base=base)
+            fig = build_figure(spec)
+            pdf.savefig(fig, facecolor='white')
+            close_figure(fig)
+    return pages
+
+def render_transcript(turns, output_dir=None, stem='conversation-flow-diagram', format='png', dpi=300,
+                      title=None, subtitle=None, turns_per_page=DEFAULT_TURNS_PER_PAGE):
+    """Renders a transcript to output_dir, returns the path
+
+    PDF output is paginated and streamed; other formats draw one figure
+    whose height grows with the number of turns.
+    """
+    if format == 'pdf':
+        output_dir = output_dir or default_output_dir()
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f'{stem}.pdf')
+        write_transcript_pdf(turns, path, title, subtitle, turns_per_page)
+        return path
+    spec = transcript_spec(turns, title, subtitle)
+    spec['output'] = f'{stem}.{format}'
+    return render_spec(spec, output_dir, format, dpi)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render a conversation flow diagram from a transcript')
+    parser.add_argument('transcript', help='JSONL/JSON transcript, or a Slack export file with --slack')
+    parser.add_argument('--slack', action='store_true', help='read a Slack channel export')
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help='directory for the output (default: $DIAGRAM_OUTPUT_DIR or the repository root)')
+    parser.add_argument('--format', default='png', help='png, svg or pdf (paginated)')
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--turns-per-page', type=int, default=DEFAULT_TURNS_PER_PAGE)
+    parser.add_argument('--title')
+    parser.add_argument('--subtitle')
+    args = parser.parse_args(argv)
+    set_headless(True)
+
+    if args.slack:
+        with open(args.transcript, encoding='utf-8') as f:
+            metadata, turns = {}, turns_from_slack(json.load(f))
+    else:
+        metadata, turns = read_transcript(args.transcript)
+    stem = os.path.splitext(os.path.basename(args.transcript))[0]
+    path = render_transcript(turns, args.output_dir, stem, args.format, args.dpi,
+                             args.title or metadata.get('title'), args.subtitle or metadata.get('subtitle'),
+                             args.turns_per_page)
+    print(f'Wrote {path}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
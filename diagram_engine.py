@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+"""
+Declarative Diagram Engine for AdTech Teaching Assistant
+Loads JSON/YAML diagram specs, validates them and renders them with matplotlib
+
+A spec describes a diagram as data:
+
+    name     diagram name, also the default output file stem
+    output   output file name (default: <name>.png)
+    figure   {"size": [w, h], "xlim": [x0, x1], "ylim": [y0, y1]}
+    colors   palette of named colors usable anywhere a color is expected
+    texts    free-standing labels: {"x", "y", "text", ...text options}; texts and
+             node labels may carry an "id" so callers can replace their text
+    nodes    boxes with their labels: {"id", "box": [x, y, w, h], "facecolor",
+             "edgecolor", "linewidth", "boxstyle", "textcolor", "labels": [...]};
+             "lines": [{"text", ...}] are labels without coordinates that are
+             wrapped, shrunk and stacked inside the box, and "fit": true
+             re-stacks the placed labels when one outgrows the box (text_fit)
+    edges    connectors, either straight arrows {"from": [x, y], "delta": [dx, dy]}
+             or curved annotations {"kind": "curve", "from": [x, y], "to": [x, y], "rad",
+             "linestyle", "arrowstyle"}, or routed connectors between two nodes
+             {"kind": "route", "source": id, "target": id, "style": "orthogonal" |
+             "curved" | "straight", "label": {"text", ...text options}, ...} whose path
+             avoids the other boxes (edge_router); the label sits at the path's midpoint,
+             and an orthogonal route with "arrowstyle" or "linestyle" is drawn like a
+             curve annotation along its polyline
+    legend   {"items": [{"color", "label"}], "loc", "bbox_to_anchor"}
+
+matplotlib is only imported when a figure is first created. In headless mode
+(DIAGRAM_HEADLESS=1, MPLBACKEND=Agg, or no display on Linux) figures are drawn
+on a bare Agg canvas and pyplot is never imported, so nothing tries to open a
+GUI window. Those figures come from a FigurePool: close_figure clears a
+figure and returns it to the pool, and the next blank_figure reuses it
+(with its Agg buffer when the size matches) instead of allocating a new
+one, so long-running processes neither accumulate figures nor churn
+memory (soak_render.py checks RSS stays flat over 10,000 renders).
+
+Nodes and connectors are drawn as a few collections (one PatchCollection
+for the boxes, one for the arrows, one LineCollection for routed polylines)
+rather than one artist each, which keeps draw time flat as diagrams grow;
+the images are pixel-identical to per-artist drawing (benchmark_batched.py).
+
+render_to_buffer/render_to_bytes return encoded images without touching disk;
+render_spec writes them to a directory ($DIAGRAM_OUTPUT_DIR or the repository
+root when none is given).
+
+Saving is byte-reproducible: the metadata that changes between runs or
+installs (creation dates, the matplotlib version in Software/Creator/
+Producer) is left out via SAVE_METADATA, SVG element ids are salted with a
+fixed SVG_HASHSALT rather than a random one, and PNGs use a fixed zlib level.
+The same spec renders to the same bytes, which publish_assets.py relies on
+for content-hashed file names.
+
+Usage:
+    python diagram_engine.py diagram_specs/learning-path-diagram.json -o out/
+    python diagram_engine.py --export learning-path-diagram -o out/
+    python diagram_engine.py --check diagram_specs/*.json
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import numbers
+import os
+import sys
+from collections import OrderedDict
+
+from edge_router import Router, midpoint
+from text_fit import DEFAULT_BOXSTYLE, fit_node
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SPEC_DIR = os.path.join(ROOT_DIR, 'diagram_specs')
+SPEC_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+TEXT_OPTIONS = {'fontsize', 'fontweight', 'style', 'color', 'ha', 'va', 'rotation'}
+TEXT_KEYS = {'id', 'x', 'y', 'text'} | TEXT_OPTIONS
+NODE_KEYS = {'id', 'box', 'facecolor', 'edgecolor', 'linewidth', 'boxstyle', 'textcolor', 'labels', 'lines', 'fit'}
+LINE_KEYS = TEXT_KEYS - {'x', 'y'}
+ARROW_KEYS = {'kind', 'from', 'delta', 'color', 'linewidth', 'head_width', 'head_length'}
+CURVE_KEYS = {'kind', 'from', 'to', 'color', 'linewidth', 'rad', 'linestyle', 'arrowstyle'}
+ROUTE_KEYS = {'kind', 'source', 'target', 'style', 'color', 'linewidth', 'head_width', 'head_length', 'rad',
+              'linestyle', 'arrowstyle', 'label'}
+ROUTE_STYLES = ('orthogonal', 'curved', 'straight')
+LEGEND_KEYS = {'items', 'loc', 'bbox_to_anchor'}
+SPEC_KEYS = {'name', 'output', 'figure', 'colors', 'texts', 'nodes', 'edges', 'legend'}
+
+# Metadata savefig writes unless told otherwise, all of it varying between runs or versions
+SAVE_METADATA = {
+    'png': {'Software': None},
+    'svg': {'Creator': None, 'Date': None},
+    'pdf': {'Creator': None, 'Producer': None, 'CreationDate': None},
+    'ps': {'Creator': 'diagram_engine'},  # None would be written out literally
+    'eps': {'Creator': 'diagram_engine'},
+}
+SVG_HASHSALT = 'adtech-diagrams'
+
+POOL_SIZE = 4  # idle headless figures kept for reuse
+SUBPLOT_PARAMETERS = ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')
+PNG_COMPRESS_LEVEL = 6
+
+# Files written by export_figure: one layout, several formats and sizes.
+# Targets with max_width are thumbnails drawn at whatever dpi gives that width.
+DEFAULT_EXPORTS = [
+    {'format': 'png', 'dpi': 300},
+    {'format': 'svg'},
+    {'format': 'pdf'},
+    {'format': 'png', 'max_width': 480, 'suffix': '-thumb'},
+]
+
+class SpecError(ValueError):
+    """Raised when a diagram spec is malformed"""
+
+def spec_path(name):
+    """Resolves a spec name (e.g. 'learning-path-diagram') to a file in SPEC_DIR"""
+    if os.path.splitext(name)[1] in SPEC_EXTENSIONS:
+        return name
+    for extension in SPEC_EXTENSIONS:
+        path = os.path.join(SPEC_DIR, name + extension)
+        if os.path.exists(path):
+            return path
+    raise SpecError(f'no spec named {name!r} in {SPEC_DIR}')
+
+def load_spec(name):
+    """Loads and validates a spec by name or file path"""
+    path = spec_path(name)
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            spec = json.load(f)
+        else:
+            try:
+                import yaml
+            except ImportError:
+                raise SpecError(f'PyYAML is required to load {path}') from None
+            spec = yaml.safe_load(f)
+    return validate_spec(spec, source=path)
+
+def find_label(spec, label_id):
+    """Returns the text or node label with the given id"""
+    for item in spec.get('texts', []):
+        if item.get('id') == label_id:
+            return item
+    for node in spec.get('nodes', []):
+        for label in node.get('labels', []) + node.get('lines', []):
+            if label.get('id') == label_id:
+                return label
+    raise KeyError(label_id)
+
+def find_node(spec, node_id):
+    """Returns the node with the given id"""
+    for node in spec.get('nodes', []):
+        if node['id'] == node_id:
+            return node
+    raise KeyError(node_id)
+
+def spec_digest(spec):
+    """Returns a stable content hash of a spec"""
+    encoded = json.dumps(spec, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+# Validation
+
+def _fail(where, message):
+    raise SpecError(f'{where}: {message}')
+
+def _check_keys(item, allowed, required, where):
+    if not isinstance(item, dict):
+        _fail(where, 'expected an object')
+    for key in required:
+        if key not in item:
+            _fail(where, f'missing {key!r}')
+    unknown = set(item) - allowed
+    if unknown:
+        _fail(where, 'unknown keys ' + ', '.join(sorted(unknown)))
+
+def _check_numbers(value, count, where):
+    if (not isinstance(value, (list, tuple)) or len(value) != count
+            or not all(isinstance(v, numbers.Real) and not isinstance(v, bool) for v in value)):
+        _fail(where, f'expected a list of {count} numbers')
+
+def _check_text(item, where, positioned=True):
+    if positioned:
+        _check_keys(item, TEXT_KEYS, ('x', 'y', 'text'), where)
+        _check_numbers([item['x'], item['y']], 2, where)
+    else:
+        _check_keys(item, LINE_KEYS, ('text',), where)
+    if not isinstance(item['text'], str):
+        _fail(where + '.text', 'expected a string')
+
+def validate_spec(spec, source='spec'):
+    """Checks the structure of a spec, raising SpecError on the first problem"""
+    _check_keys(spec, SPEC_KEYS, ('name', 'figure'), source)
+    figure = spec['figure']
+    _check_keys(figure, {'size', 'xlim', 'ylim'}, ('size',), source + '.figure')
+    _check_numbers(figure['size'], 2, source + '.figure.size')
+    for key in ('xlim', 'ylim'):
+        if key in figure:
+            _check_numbers(figure[key], 2, f'{source}.figure.{key}')
+
+    colors = spec.get('colors', {})
+    if not isinstance(colors, dict) or not all(isinstance(v, str) for v in colors.values()):
+        _fail(source + '.colors', 'expected a mapping of names to color strings')
+
+    ids = set()
+
+    def check_id(item, where):
+        if 'id' in item:
+            if item['id'] in ids:
+                _fail(where, f'duplicate id {item["id"]!r}')
+            ids.add(item['id'])
+
+    for i, item in enumerate(spec.get('texts', [])):
+        _check_text(item, f'{source}.texts[{i}]')
+        check_id(item, f'{source}.texts[{i}]')
+
+    for i, node in enumerate(spec.get('nodes', [])):
+        where = f'{source}.nodes[{i}]'
+        _check_keys(node, NODE_KEYS, ('id', 'box'), where)
+        check_id(node, where)
+        _check_numbers(node['box'], 4, where + '.box')
+        if node['box'][2] <= 0 or node['box'][3] <= 0:
+            _fail(where + '.box', 'width and height must be positive')
+        for j, label in enumerate(node.get('labels', [])):
+            _check_text(label, f'{where}.labels[{j}]')
+            check_id(label, f'{where}.labels[{j}]')
+        for j, line in enumerate(node.get('lines', [])):
+            _check_text(line, f'{where}.lines[{j}]', positioned=False)
+            check_id(line, f'{where}.lines[{j}]')
+        if not isinstance(node.get('fit', False), bool):
+            _fail(where + '.fit', 'expected true or false')
+
+    node_ids = {node['id'] for node in spec.get('nodes', [])}
+    for i, edge in enumerate(spec.get('edges', [])):
+        where = f'{source}.edges[{i}]'
+        kind = edge.get('kind', 'arrow') if isinstance(edge, dict) else None
+        if kind == 'arrow':
+            _check_keys(edge, ARROW_KEYS, ('from', 'delta'), where)
+            _check_numbers(edge['delta'], 2, where + '.delta')
+        elif kind == 'curve':
+            _check_keys(edge, CURVE_KEYS, ('from', 'to'), where)
+            _check_numbers(edge['to'], 2, where + '.to')
+        elif kind == 'route':
+            _check_keys(edge, ROUTE_KEYS, ('source', 'target'), where)
+            for key in ('source', 'target'):
+                if edge[key] not in node_ids:
+                    _fail(f'{where}.{key}', f'no node with id {edge[key]!r}')
+            if edge.get('style', 'orthogonal') not in ROUTE_STYLES:
+                _fail(where + '.style', f'expected one of {", ".join(ROUTE_STYLES)}')
+            if 'label' in edge:
+                _check_text(edge['label'], where + '.label', positioned=False)
+                check_id(edge['label'], where + '.label')
+            continue
+        else:
+            _fail(where, f'unknown edge kind {kind!r}')
+        _check_numbers(edge['from'], 2, where + '.from')
+
+    if 'legend' in spec:
+        _check_keys(spec['legend'], LEGEND_KEYS, ('items',), source + '.legend')
+        for i, item in enumerate(spec['legend']['items']):
+            _check_keys(item, {'color', 'label'}, ('color', 'label'), f'{source}.legend.items[{i}]')
+    return spec
+
+# Headless mode
+
+_headless = None
+
+def set_headless(enabled=True):
+    """Forces headless rendering on or off for this process"""
+    global _headless
+    _headless = enabled
+    if enabled:
+        os.environ['MPLBACKEND'] = 'Agg'
+
+def headless_mode():
+    """True when figures must not touch a GUI toolkit"""
+    if _headless is not None:
+        return _headless
+    setting = os.environ.get('DIAGRAM_HEADLESS')
+    if setting is not None:
+        return setting not in ('', '0', 'false', 'no')
+    if os.environ.get('MPLBACKEND', '').lower() == 'agg':
+        return True
+    return sys.platform.startswith('linux') and not (
+        os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+# Rendering
+
+def _resolve(spec, color):
+    return spec.get('colors', {}).get(color, color)
+
+def _text_options(spec, item, default_color=None):
+    options = {key: item[key] for key in TEXT_OPTIONS if key in item}
+    options.setdefault('ha', 'center')
+    color = options.get('color', default_color)
+    if color is not None:
+        options['color'] = _resolve(spec, color)
+    return options
+
+class FigurePool:
+    """Idle bare Agg figures, cleared on release and handed out again
+
+    An idle figure of the requested size is preferred: reused at the same
+    size and dpi it keeps its canvas's Agg renderer, so the pixel buffer
+    savefig draws into is not allocated again. Otherwise the least recently
+    released figure is resized. At most max_idle figures are kept; the
+    least recently released one is dropped beyond that.
+    """
+
+    def __init__(self, max_idle=POOL_SIZE):
+        self.max_idle = max_idle
+        self.idle = OrderedDict()  # id(fig) -> fig, least recently released first
+        self.created = self.reused = 0
+
+    def acquire(self, width, height):
+        matches = [key for key, fig in self.idle.items() if tuple(fig.get_size_inches()) == (width, height)]
+        if matches or self.idle:
+            fig = self.idle.pop(matches[-1] if matches else next(iter(self.idle)))
+            fig.set_size_inches(width, height, forward=False)
+            self.reused += 1
+            return fig
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(width, height))
+        FigureCanvasAgg(fig)
+        fig._diagram_pool = self
+        self.created += 1
+        return fig
+
+    def release(self, fig):
+        if id(fig) in self.idle or not self.max_idle:
+            return
+        import matplotlib
+
+        fig.clear()
+        fig.set_dpi(matplotlib.rcParams['figure.dpi'])
+        fig.patch.set_facecolor(matplotlib.rcParams['figure.facecolor'])
+        fig.subplots_adjust(**{name: matplotlib.rcParams[f'figure.subplot.{name}'] for name in SUBPLOT_PARAMETERS})
+        self.idle[id(fig)] = fig
+        while len(self.idle) > self.max_idle:
+            self.idle.popitem(last=False)
+
+    def clear(self):
+        self.idle.clear()
+
+_figure_pool = FigurePool()
+
+def figure_pool():
+    """The process's FigurePool of headless figures"""
+    return _figure_pool
+
+def blank_figure(width, height):
+    """Creates a figure with one axes: a pooled bare Agg figure in headless mode, else via pyplot"""
+    if headless_mode():
+        fig = _figure_pool.acquire(width, height)
+        ax = fig.subplots(1, 1)
+    else:
+        import matplotlib.pyplot as plt
+
+        fig, ax = plt.subplots(1, 1, figsize=(width, height))
+    return fig, ax
+
+def new_figure(spec):
+    """Creates the figure and axes a spec is drawn into"""
+    figure = spec['figure']
+    width, height = figure['size']
+    fig, ax = blank_figure(width, height)
+    ax.set_xlim(*figure.get('xlim', (0, width)))
+    ax.set_ylim(*figure.get('ylim', (0, height)))
+    ax.axis('off')
+    return fig, ax
+
+def points_per_unit(ax):
+    """Returns the (x, y) size of one data unit of ax in points"""
+    (x0, y0), (x1, y1) = ax.transData.transform([(0, 0), (1, 1)])
+    points = 72 / ax.figure.dpi
+    return (x1 - x0) * points, (y1 - y0) * points
+
+def _draw_arrow(ax, edge, color, start, delta, batch=None, **extra):
+    from matplotlib.patches import FancyArrow
+
+    options = {'linewidth': edge['linewidth']} if 'linewidth' in edge else {}
+    arrow = FancyArrow(*start, *delta, head_width=edge.get('head_width', 0.1),
+                       head_length=edge.get('head_length', 0.1), fc=color, ec=color, **options, **extra)
+    if batch is None:
+        ax.add_patch(arrow)
+    else:
+        batch.patches.append(arrow)
+
+class _Batch:
+    """Artists collected while drawing a spec, added as a few collections at the end
+
+    Nodes and arrows become one PatchCollection each and polylines one
+    LineCollection, keeping every element's own colors and widths; each keeps
+    the z-order and drawing order its separate artists would have had, so the
+    image does not change.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.patches = []
+        self.lines = []
+        self.line_colors = []
+        self.line_widths = []
+
+    @staticmethod
+    def _add_patches(ax, patches):
+        from matplotlib.collections import PatchCollection
+
+        if patches:
+            collection = PatchCollection(patches, match_original=True, zorder=1)
+            collection.set_joinstyle('miter')
+            ax.add_collection(collection, autolim=False)
+
+    def add_nodes(self, ax):
+        """Adds the node boxes; called before any connector is drawn, so unbatched ones stay on top"""
+        self._add_patches(ax, self.nodes)
+
+    def add_to(self, ax):
+        """Adds the collected arrows and polylines"""
+        from matplotlib.collections import LineCollection
+
+        self._add_patches(ax, self.patches)
+        if self.lines:
+            ax.add_collection(LineCollection(self.lines, colors=self.line_colors, linewidths=self.line_widths,
+                                             joinstyle='miter', capstyle='projecting', zorder=2), autolim=False)
+
+def _draw_curve(ax, edge, color, start, end, rad):
+    arrowprops = dict(arrowstyle=edge.get('arrowstyle', '->'), lw=edge.get('linewidth', 1.5), color=color,
+                      linestyle=edge.get('linestyle', 'solid'))
+    if rad:
+        arrowprops['connectionstyle'] = f"arc3,rad={rad}"
+    ax.annotate('', xy=tuple(end), xytext=tuple(start), arrowprops=arrowprops)
+
+def _draw_path(ax, edge, color, points):
+    """An orthogonal route as one annotate-style arrow along its polyline, for dashes and other heads"""
+    from matplotlib.patches import FancyArrowPatch
+    from matplotlib.path import Path
+
+    ax.add_patch(FancyArrowPatch(path=Path(points), arrowstyle=edge.get('arrowstyle', '->'), mutation_scale=10,
+                                 lw=edge.get('linewidth', 1.5), color=color,
+                                 linestyle=edge.get('linestyle', 'solid'), joinstyle='miter'))
+
+def draw_spec(ax, spec, batched=True):
+    """Draws every element of a spec onto ax
+
+    Returns the artists that have ids: node patches and labelled texts.
+    batched draws nodes and connectors as a few collections (see _Batch)
+    instead of one artist each; the image is the same.
+    """
+    from matplotlib.patches import FancyBboxPatch, Patch
+
+    batch = _Batch() if batched else None
+    artists = {}
+    scale = points_per_unit(ax)
+    for item in spec.get('texts', []):
+        text = ax.text(item['x'], item['y'], item['text'], **_text_options(spec, item))
+        if 'id' in item:
+            artists[item['id']] = text
+
+    for node in spec.get('nodes', []):
+        x, y, width, height = node['box']
+        patch = FancyBboxPatch((x, y), width, height,
+                               boxstyle=node.get('boxstyle', DEFAULT_BOXSTYLE),
+                               facecolor=_resolve(spec, node.get('facecolor', 'white')),
+                               edgecolor=_resolve(spec, node.get('edgecolor', 'black')),
+                               linewidth=node.get('linewidth', 2))
+        if batch is None:
+            ax.add_patch(patch)
+        else:
+            batch.nodes.append(patch)
+        artists[node['id']] = patch
+        for label in fit_node(node, scale):
+            text = ax.text(label['x'], label['y'], label['text'],
+                           **_text_options(spec, label, node.get('textcolor')))
+            if 'id' in label:
+                artists[label['id']] = text
+
+    if batch is not None:
+        batch.add_nodes(ax)
+    router = None
+    for edge in spec.get('edges', []):
+        color = _resolve(spec, edge.get('color', 'black'))
+        kind = edge.get('kind', 'arrow')
+        if kind == 'route':
+            router = router or Router(spec.get('nodes', []), points_per_unit=scale)
+            style = edge.get('style', 'orthogonal')
+            if style == 'curved':
+                start, end, rad = router.curved(edge['source'], edge['target'], edge.get('rad'))
+                _draw_curve(ax, edge, color, start, end, rad)
+                points = router.curve_points(start, end, rad or 0.0)
+            elif style == 'straight':
+                points = (x0, y0), (x1, y1) = router.straight(edge['source'], edge['target'])
+                _draw_arrow(ax, edge, color, (x0, y0), (x1 - x0, y1 - y0), batch, length_includes_head=True)
+            else:
+                points = router.orthogonal(edge['source'], edge['target'])
+                if 'arrowstyle' in edge or 'linestyle' in edge:
+                    _draw_path(ax, edge, color, points)
+                elif len(points) > 2 and batch is None:
+                    ax.plot(*zip(*points[:-1]), color=color, linewidth=edge.get('linewidth', 1),
+                            solid_joinstyle='miter')
+                elif len(points) > 2:
+                    batch.lines.append(points[:-1])
+                    batch.line_colors.append(color)
+                    batch.line_widths.append(edge.get('linewidth', 1))
+                if 'arrowstyle' not in edge and 'linestyle' not in edge:
+                    (x0, y0), (x1, y1) = points[-2:]
+                    _draw_arrow(ax, edge, color, (x0, y0), (x1 - x0, y1 - y0), batch, length_includes_head=True)
+            if 'label' in edge:
+                label = edge['label']
+                x, y = midpoint(points)
+                text = ax.text(x, y, label['text'], **_text_options(spec, {'va': 'center', **label}, color))
+                if 'id' in label:
+                    artists[label['id']] = text
+        elif kind == 'arrow':
+            _draw_arrow(ax, edge, color, edge['from'], edge['delta'], batch)
+        else:
+            _draw_curve(ax, edge, color, edge['from'], edge['to'], edge.get('rad'))
+
+    if batch is not None:
+        batch.add_to(ax)
+    if 'legend' in spec:
+        legend = spec['legend']
+        handles = [Patch(color=_resolve(spec, item['color']), label=item['label'])
+                   for item in legend['items']]
+        options = {key: legend[key] for key in ('loc', 'bbox_to_anchor') if key in legend}
+        ax.legend(handles=handles, **options)
+    return artists
+
+def layout_figure(spec):
+    """Creates, draws and lays out the figure for a spec, returns (fig, artists by id)"""
+    fig, ax = new_figure(spec)
+    artists = draw_spec(ax, spec)
+    fig.tight_layout()
+    return fig, artists
+
+def build_figure(spec):
+    """Creates, draws and lays out the figure for a spec"""
+    return layout_figure(spec)[0]
+
+def close_figure(fig):
+    """Releases a figure: back to its FigurePool when it came from one, else out of pyplot's registry
+
+    The figure must not be used afterwards; a pooled one is cleared and
+    handed to the next blank_figure call of the same size.
+    """
+    pool = getattr(fig, '_diagram_pool', None)
+    if pool is not None:
+        pool.release(fig)
+    elif 'matplotlib.pyplot' in sys.modules:
+        sys.modules['matplotlib.pyplot'].close(fig)
+
+def default_output_dir():
+    """Directory create_* functions write to: $DIAGRAM_OUTPUT_DIR or the repository root"""
+    return os.environ.get('DIAGRAM_OUTPUT_DIR') or ROOT_DIR
+
+def output_filename(spec, format='png'):
+    """File name for a spec rendered in the given format"""
+    stem = os.path.splitext(spec.get('output', spec['name'] + '.png'))[0]
+    return f'{stem}.{format}'
+
+def _render(spec, format, dpi, show=False):
+    return _encode(build_figure(spec), format, dpi, show)
+
+def save_figure(fig, target, format, dpi, bbox_inches='tight', facecolor='white'):
+    """savefig with fixed metadata, SVG ids and PNG encoder settings, so output bytes are reproducible"""
+    import matplotlib
+
+    options = {'pil_kwargs': {'compress_level': PNG_COMPRESS_LEVEL}} if format == 'png' else {}
+    # The PostScript CreationDate can only be fixed through the environment; set it for this save alone
+    fix_date = format in ('ps', 'eps') and 'SOURCE_DATE_EPOCH' not in os.environ
+    if fix_date:
+        os.environ['SOURCE_DATE_EPOCH'] = '0'
+    try:
+        with matplotlib.rc_context({'svg.hashsalt': SVG_HASHSALT}):
+            fig.savefig(target, format=format, dpi=dpi, bbox_inches=bbox_inches, facecolor=facecolor,
+                        metadata=SAVE_METADATA.get(format), **options)
+    finally:
+        if fix_date:
+            del os.environ['SOURCE_DATE_EPOCH']
+
+def _encode(fig, format, dpi, show=False):
+    buffer = io.BytesIO()
+    save_figure(fig, buffer, format, dpi)
+    if show and not headless_mode():
+        import matplotlib.pyplot as plt
+
+        plt.show()
+    close_figure(fig)
+    return buffer
+
+def render_to_buffer(spec, format='png', dpi=300):
+    """Renders a spec in memory, returns a zero-copy memoryview of the encoded image"""
+    return _render(spec, format, dpi).getbuffer()
+
+def render_figure(fig, format='png', dpi=300):
+    """Encodes a finished figure (tight bbox, white background) and closes it, returns a memoryview"""
+    return _encode(fig, format, dpi).getbuffer()
+
+def render_to_bytes(spec, format='png', dpi=300):
+    """Renders a spec in memory, returns the encoded image as bytes"""
+    return _render(spec, format, dpi).getvalue()
+
+def write_image(data, output_dir, filename):
+    """Writes encoded image bytes (or a memoryview) to output_dir, returns the path"""
+    output_dir = output_dir or default_output_dir()
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, filename)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return output_path
+
+def render_spec(spec, output_dir=None, format='png', dpi=300, show=False):
+    """Renders a spec to a file in output_dir (default_output_dir() if None), returns the path
+
+    show displays the figure as well, except in headless mode.
+    """
+    view = _render(spec, format, dpi, show).getbuffer()
+    return write_image(view, output_dir, output_filename(spec, format))
+
+def tight_bbox(fig, dpi=300, pad_inches=0.1):
+    """Computes the crop box savefig(bbox_inches='tight') would use, for reuse across saves"""
+    original_dpi = fig.dpi
+    fig.dpi = dpi  # measure text at the resolution the raster output uses
+    try:
+        return fig.get_tightbbox(fig.canvas.get_renderer()).padded(pad_inches)
+    finally:
+        fig.dpi = original_dpi
+
+def export_figure(fig, output_dir, stem, targets=DEFAULT_EXPORTS, facecolor='white'):
+    """Writes a laid-out figure in several formats, returns the written paths
+
+    The tight bounding box is computed once and shared by every target, so
+    each output costs a single draw with no layout or cropping pass.
+    """
+    raster_dpis = [target['dpi'] for target in targets if 'dpi' in target]
+    bbox = tight_bbox(fig, dpi=max(raster_dpis, default=300))
+    paths = []
+    for target in targets:
+        fmt = target['format']
+        dpi = target['max_width'] / bbox.width if 'max_width' in target else target.get('dpi', 300)
+        path = os.path.join(output_dir, f"{stem}{target.get('suffix', '')}.{fmt}")
+        with open(path, 'wb') as f:
+            f.write(_savefig_bytes(fig, fmt, dpi, bbox, facecolor))
+        paths.append(path)
+    return paths
+
+def _savefig_bytes(fig, fmt, dpi, bbox, facecolor):
+    buffer = io.BytesIO()
+    save_figure(fig, buffer, fmt, dpi, bbox, facecolor)
+    return buffer.getvalue()
+
+def export_spec(spec, output_dir, targets=DEFAULT_EXPORTS):
+    """Builds a spec's figure once and exports it to every target"""
+    fig = build_figure(spec)
+    stem = os.path.splitext(output_filename(spec))[0]
+    try:
+        return export_figure(fig, output_dir, stem, targets)
+    finally:
+        close_figure(fig)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render declarative diagram specs')
+    parser.add_argument('specs', nargs='+', help='spec names or JSON/YAML files')
+    parser.add_argument('-o', '--output-dir', default='.', help='directory for the rendered images')
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--format', default='png', help='png, svg, pdf, ... (default: png)')
+    parser.add_argument('--check', action='store_true', help='only validate the specs')
+    parser.add_argument('--export', action='store_true',
+                        help='write PNG, SVG, PDF and a thumbnail from a single draw')
+    args = parser.parse_args(argv)
+    set_headless(True)
+
+    for name in args.specs:
+        try:
+            spec = load_spec(name)
+        except SpecError as error:
+            print(f'invalid spec: {error}', file=sys.stderr)
+            return 1
+        if args.check:
+            print(f'{name}: ok ({spec_digest(spec)[:12]})')
+        elif args.export:
+            for path in export_spec(spec, args.output_dir):
+                print(path)
+        else:
+            print(render_spec(spec, args.output_dir, format=args.format, dpi=args.dpi))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
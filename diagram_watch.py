@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Watch Mode for AdTech Teaching Assistant Diagrams
+Keeps a warm interpreter and re-renders only the diagrams an edit affects
+
+Started by render_all.py --watch. matplotlib, the fonts and every generator
+script are loaded once; then the generator scripts, the local modules they
+import (transitively, including imports inside functions) and the specs
+they load are polled for changes every POLL_SECONDS. On a change:
+
+    1. changed local modules are reloaded with importlib.reload, followed
+       by every loaded module that imports them, dependencies first
+    2. generator scripts that changed or depend on a reloaded module are
+       executed afresh
+    3. the affected create_* functions are re-rendered: those whose own
+       source (or the shared code of their script) changed, those that
+       load a changed spec, and every generator of a script whose imports
+       changed
+
+Each affected diagram is written at the preview dpi first, then again at
+the final dpi into the same file, so an image viewer that reloads on
+change shows the preview almost at once. An edit made while final renders
+are running cancels the rest of them and starts over with previews. Final
+renders at the default 300 dpi are recorded in the build cache, so a later
+render_all run skips them. Errors are printed and the watch goes on.
+
+Usage:
+    python render_all.py --watch
+    python render_all.py --watch --preview-dpi 50 create_learning_path_diagram
+"""
+
+import importlib
+import os
+import sys
+import time
+import traceback
+
+from build_cache import DEFAULT_OUTPUT_SETTINGS, BuildCache, cache_key
+from diagram_engine import default_output_dir, set_headless, spec_path
+from render_all import (ROOT_DIR, _loaded_scripts, generator_dependencies, generator_sources, load_script, loaded_specs,
+                        local_imports, module_path)
+
+POLL_SECONDS = 0.1
+PREVIEW_DPI = 72
+FINAL_DPI = 300
+
+class Watcher:
+    """Polls a set of files and maps their changes to the generators to re-render"""
+
+    def __init__(self, generators, output_dir=None, preview_dpi=PREVIEW_DPI, final_dpi=FINAL_DPI):
+        self.generators = generators
+        self.output_dir = output_dir or default_output_dir()
+        self.preview_dpi, self.final_dpi = preview_dpi, final_dpi
+        self.scripts = list(dict.fromkeys(script for script, _ in generators))
+        self.cache = BuildCache(self.output_dir)
+        self._scan()
+        self.mtimes = self._mtimes()
+
+    def _scan(self):
+        """Reads the import graph, generator sources and spec references from disk"""
+        self.imports = {}  # module name -> local modules it imports
+        pending = [name for script in self.scripts for name in local_imports(os.path.join(ROOT_DIR, script))]
+        while pending:
+            name = pending.pop()
+            if name not in self.imports:
+                self.imports[name] = local_imports(module_path(name))
+                pending.extend(self.imports[name])
+        self.sources = {script: generator_sources(script) for script in self.scripts}
+        self.specs = {}  # spec path -> generators that load it
+        for script, sources in self.sources.items():
+            for name in sources:
+                for spec in loaded_specs(script, name):
+                    self.specs.setdefault(spec_path(spec), set()).add(name)
+
+    def _files(self):
+        return ([os.path.join(ROOT_DIR, script) for script in self.scripts]
+                + [module_path(name) for name in self.imports] + list(self.specs))
+
+    def _mtimes(self):
+        mtimes = {}
+        for path in self._files():
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                mtimes[path] = None  # mid-save; picked up when it reappears
+        return mtimes
+
+    def changed_files(self):
+        """Returns the watched paths modified since the last call"""
+        current = self._mtimes()
+        changed = [path for path, mtime in current.items() if self.mtimes.get(path) != mtime]
+        self.mtimes = current
+        return changed
+
+    def _dependents(self, modules):
+        """modules plus every local module that imports one of them, transitively"""
+        affected = set(modules)
+        grew = True
+        while grew:
+            grew = False
+            for name, imported in self.imports.items():
+                if name not in affected and imported & affected:
+                    affected.add(name)
+                    grew = True
+        return affected
+
+    def _reload_order(self, modules):
+        """Orders modules so each comes after the local modules it imports"""
+        ordered, seen = [], set()
+
+        def visit(name):
+            if name not in seen:
+                seen.add(name)
+                for dependency in sorted(self.imports.get(name, ()) & modules):
+                    visit(dependency)
+                ordered.append(name)
+
+        for name in sorted(modules):
+            visit(name)
+        return ordered
+
+    def apply(self, changed):
+        """Reloads what the changed files affect, returns the generators to re-render in order"""
+        old_sources = self.sources
+        self._scan()
+        changed_modules = {os.path.splitext(os.path.basename(path))[0] for path in changed
+                           if path.endswith('.py') and os.path.basename(path) not in self.scripts}
+        reloaded = self._dependents(changed_modules)
+        for name in self._reload_order(reloaded):
+            if name in sys.modules:
+                importlib.reload(sys.modules[name])
+        set_headless(True)  # a reloaded diagram_engine starts without the setting
+
+        affected = set()
+        for path in changed:
+            affected |= self.specs.get(path, set())
+        for script in self.scripts:
+            script_path = os.path.join(ROOT_DIR, script)
+            imports_changed = bool(local_imports(script_path) & reloaded)
+            if script_path in changed or imports_changed:
+                _loaded_scripts.pop(script, None)
+            for name, source in self.sources[script].items():
+                if imports_changed or old_sources.get(script, {}).get(name) != source:
+                    affected.add(name)
+        return [(script, name) for script, name in self.generators if name in affected]
+
+    def render(self, generators, dpi, record=False):
+        """Renders generators at dpi; stops early and returns False when files change meanwhile"""
+        try:
+            return self._render(generators, dpi, record)
+        finally:
+            if record:
+                self.cache.save()
+
+    def _render(self, generators, dpi, record):
+        for script, name in generators:
+            start = time.perf_counter()
+            try:
+                path = getattr(load_script(script), name)(output_dir=self.output_dir, dpi=dpi)
+            except Exception:
+                traceback.print_exc()
+                continue
+            print(f'  {name:<40} {dpi:4d} dpi {time.perf_counter() - start:6.2f}s  {path}')
+            if record:
+                key = cache_key(self.sources[script][name], dependencies=generator_dependencies(script, name))
+                self.cache.record(name, key, [path])
+            if self._pending():
+                return False
+        return True
+
+    def _pending(self):
+        return any(self.mtimes.get(path) != mtime for path, mtime in self._mtimes().items())
+
+    def warm_up(self):
+        """Loads matplotlib, the fonts and every generator script before the first edit"""
+        from diagram_engine import blank_figure, render_figure
+
+        fig, ax = blank_figure(1, 1)
+        ax.text(0.5, 0.5, 'warm', fontweight='bold')
+        render_figure(fig, 'png', 10)
+        for script in self.scripts:
+            load_script(script)
+
+    def run(self):
+        print(f'Watching {len(self._files())} files for {len(self.generators)} diagrams '
+              f'(preview {self.preview_dpi} dpi, final {self.final_dpi} dpi); Ctrl-C stops')
+        while True:
+            changed = self.changed_files()
+            if not changed:
+                time.sleep(POLL_SECONDS)
+                continue
+            time.sleep(POLL_SECONDS / 2)  # let the editor finish writing
+            changed += self.changed_files()
+            edited = max((os.stat(path).st_mtime for path in changed if os.path.exists(path)), default=time.time())
+            print(f"Changed: {', '.join(sorted({os.path.relpath(path, ROOT_DIR) for path in changed}))}")
+            try:
+                generators = self.apply(changed)
+            except Exception:
+                traceback.print_exc()
+                continue
+            if not generators:
+                print('  no diagram affected')
+                continue
+            if self.render(generators, self.preview_dpi):
+                print(f'  preview {time.time() - edited:.2f}s after the edit')
+                record = self.final_dpi == DEFAULT_OUTPUT_SETTINGS['dpi']  # the cache keys assume it
+                if self.render(generators, self.final_dpi, record):
+                    print(f'  final {time.time() - edited:.2f}s after the edit')
+
+def watch(generators, output_dir=None, preview_dpi=PREVIEW_DPI, final_dpi=FINAL_DPI):
+    """Renders generators whenever their inputs change, until interrupted"""
+    set_headless(True)
+    watcher = Watcher(generators, output_dir, preview_dpi, final_dpi)
+    watcher.warm_up()
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print()
+    return 0
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Connector Routing for AdTech Teaching Assistant Diagrams
+Computes arrow paths between spec nodes that avoid the other boxes
+
+A "route" edge names only its end nodes (see diagram_engine):
+
+    {"kind": "route", "source": "slack_handler", "target": "strands_agent_sdk",
+     "style": "orthogonal" | "curved" | "straight", "rad": 0.3, ...arrow options}
+
+and the path is computed from the boxes when the diagram is drawn, so
+arrows follow boxes that move.
+
+Orthogonal routes use a straight segment when the boxes face each other
+and it is clear; otherwise an A* search runs over a sparse grid whose lines
+are the box edges (plus clearance) and port positions inside a window
+around both ends, minimizing length plus a penalty per bend. The window
+grows until a path exists. Connectors sharing a box side get ports
+PORT_SPACING apart. Curved routes are matplotlib arc3 curves between the
+facing sides: the requested curvature wins unless another one, on either
+side, crosses fewer boxes. Straight routes are direct lines between the
+facing sides, for diagonal relations the author wants drawn as such.
+
+A box that contains another node's box is a container, such as a mermaid
+subgraph frame: connectors may cross it, so it is not an obstacle.
+
+Every obstacle lookup goes through GridIndex, a uniform grid of box
+buckets, so a query only looks at boxes near the segment or window. A
+route's cost depends on the boxes around it rather than on the diagram's
+size, which keeps diagrams with hundreds of nodes and edges near-linear.
+
+Usage:
+    router = Router(spec['nodes'], points_per_unit=(55.8, 55.4))
+    points = router.orthogonal('user_query', 'slack_handler')
+    start, end, rad = router.curved('state_update', 'strands_agent_sdk', rad=0.3)
+    x, y = midpoint(points)
+"""
+
+import heapq
+import math
+from collections import defaultdict
+
+from text_fit import box_extent
+
+CLEARANCE = 0.15  # data units kept free around every box
+BEND_COST = 0.6  # a bend costs as much as this much extra length
+PORT_SPACING = 0.25  # distance between connectors sharing a box side
+CURVE_SAMPLES = 24
+CURVE_RADS = (0.3, 0.15, 0.45, 0.6, 0.8, 1.0)
+
+class GridIndex:
+    """Uniform grid of rectangles (x0, y0, x1, y1) for window and segment queries"""
+
+    def __init__(self, cell):
+        self.cell = cell
+        self.boxes = {}
+        self.buckets = defaultdict(list)
+
+    def _span(self, low, high):
+        return range(math.floor(low / self.cell), math.floor(high / self.cell) + 1)
+
+    def insert(self, key, box):
+        self.boxes[key] = box
+        x0, y0, x1, y1 = box
+        for i in self._span(x0, x1):
+            for j in self._span(y0, y1):
+                self.buckets[i, j].append(key)
+
+    def at(self, x, y):
+        """Returns the keys of boxes whose open interior contains the point"""
+        return {key for key in self.buckets.get((math.floor(x / self.cell), math.floor(y / self.cell)), ())
+                if self.boxes[key][0] < x < self.boxes[key][2] and self.boxes[key][1] < y < self.boxes[key][3]}
+
+    def query(self, x0, y0, x1, y1):
+        """Returns the keys of boxes overlapping the closed window"""
+        found = set()
+        for i in self._span(x0, x1):
+            for j in self._span(y0, y1):
+                for key in self.buckets.get((i, j), ()):
+                    if key not in found:
+                        bx0, by0, bx1, by1 = self.boxes[key]
+                        if bx0 <= x1 and x0 <= bx1 and by0 <= y1 and y0 <= by1:
+                            found.add(key)
+        return found
+
+def _inflate(box, margin):
+    x0, y0, x1, y1 = box
+    return x0 - margin, y0 - margin, x1 + margin, y1 + margin
+
+def _contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+def _crosses(p, q, box):
+    """True when segment pq passes through the open interior of box (Liang-Barsky)"""
+    x0, y0, x1, y1 = box
+    low, high = 0.0, 1.0
+    dx, dy = q[0] - p[0], q[1] - p[1]
+    for delta, start, lower, upper in ((dx, p[0], x0, x1), (dy, p[1], y0, y1)):
+        if abs(delta) < 1e-12:
+            if not lower < start < upper:
+                return False
+            continue
+        t0, t1 = (lower - start) / delta, (upper - start) / delta
+        if t0 > t1:
+            t0, t1 = t1, t0
+        low, high = max(low, t0), min(high, t1)
+        if high - low <= 1e-9:
+            return False
+    return True
+
+class Router:
+    """Routes connectors between the nodes of one spec"""
+
+    def __init__(self, nodes, clearance=CLEARANCE, bend_cost=BEND_COST, points_per_unit=(1, 1)):
+        self.clearance = clearance
+        self.bend_cost = bend_cost
+        self.points_per_unit = points_per_unit
+        self.extents = {}
+        self.used_ports = defaultdict(list)  # (node id, side): positions along the side
+        for node in nodes:
+            x, y, width, height = box_extent(node)
+            self.extents[node['id']] = (x, y, x + width, y + height)
+        sizes = sorted(max(x1 - x0, y1 - y0) for x0, y0, x1, y1 in self.extents.values())
+        cell = sizes[len(sizes) // 2] if sizes else 1.0
+        boxes = GridIndex(cell)
+        for key, box in self.extents.items():
+            boxes.insert(key, box)
+        self.index = GridIndex(cell)
+        for key, box in self.extents.items():
+            if not any(other != key and _contains(box, boxes.boxes[other]) for other in boxes.query(*box)):
+                self.index.insert(key, _inflate(box, clearance))
+
+    def _blocked(self, p, q, exclude):
+        keys = self.index.query(min(p[0], q[0]), min(p[1], q[1]), max(p[0], q[0]), max(p[1], q[1]))
+        return any(_crosses(p, q, self.index.boxes[key]) for key in keys - exclude)
+
+    def _path_blocked(self, points, exclude):
+        return any(self._blocked(p, q, exclude) for p, q in zip(points, points[1:]))
+
+    # Orthogonal routes
+
+    # Ports: connectors sharing a box side are spread PORT_SPACING apart
+
+    def _slot(self, sides, preferred, low, high):
+        """Position nearest preferred within [low, high] that is free on every (node, side)"""
+        used = [position for side in sides for position in self.used_ports[side]]
+        low, high = low + PORT_SPACING / 2, high - PORT_SPACING / 2
+        for k in range(int((high - low) / PORT_SPACING) * 2 + 1):
+            position = preferred + (k + 1) // 2 * PORT_SPACING * (1 if k % 2 else -1) if k else preferred
+            if low <= position <= high and all(abs(position - other) > PORT_SPACING * 0.9 for other in used):
+                return position
+        return preferred
+
+    def _claim(self, key, point):
+        x0, y0, x1, y1 = self.extents[key]
+        distances = {'right': abs(point[0] - x1), 'left': abs(point[0] - x0),
+                     'top': abs(point[1] - y1), 'bottom': abs(point[1] - y0)}
+        side = min(distances, key=distances.get)
+        self.used_ports[key, side].append(point[1] if side in ('right', 'left') else point[0])
+
+    def _straight(self, source, target):
+        sx0, sy0, sx1, sy1 = self.extents[source]
+        tx0, ty0, tx1, ty1 = self.extents[target]
+        low, high = max(sy0, ty0), min(sy1, ty1)
+        if low < high and (tx0 >= sx1 or sx0 >= tx1):
+            right = tx0 >= sx1
+            sides = [(source, 'right' if right else 'left'), (target, 'left' if right else 'right')]
+            y = self._slot(sides, (low + high) / 2, low, high)
+            return [(sx1, y), (tx0, y)] if right else [(sx0, y), (tx1, y)]
+        low, high = max(sx0, tx0), min(sx1, tx1)
+        if low < high and (ty0 >= sy1 or sy0 >= ty1):
+            up = ty0 >= sy1
+            sides = [(source, 'top' if up else 'bottom'), (target, 'bottom' if up else 'top')]
+            x = self._slot(sides, (low + high) / 2, low, high)
+            return [(x, sy1), (x, ty0)] if up else [(x, sy0), (x, ty1)]
+        return None
+
+    def _ports(self, key):
+        """Free side ports of a box with the point one clearance outside and the outward direction"""
+        x0, y0, x1, y1 = self.extents[key]
+        c = self.clearance
+        cy = {side: self._slot([(key, side)], (y0 + y1) / 2, y0, y1) for side in ('right', 'left')}
+        cx = {side: self._slot([(key, side)], (x0 + x1) / 2, x0, x1) for side in ('top', 'bottom')}
+        return [((x1, cy['right']), (x1 + c, cy['right']), (1, 0)), ((x0, cy['left']), (x0 - c, cy['left']), (-1, 0)),
+                ((cx['top'], y1), (cx['top'], y1 + c), (0, 1)), ((cx['bottom'], y0), (cx['bottom'], y0 - c), (0, -1))]
+
+    def _search(self, source, target, window):
+        """A* over the window's grid; returns (path or None, whether the search hit the window edge)"""
+        exclude = {source, target}
+        x0, y0, x1, y1 = window
+        starts, goals = self._ports(source), self._ports(target)
+        xs, ys = {x0, x1}, {y0, y1}
+        for key in self.index.query(*window):
+            bx0, by0, bx1, by1 = self.index.boxes[key]
+            xs.update(x for x in (bx0, bx1) if x0 <= x <= x1)
+            ys.update(y for y in (by0, by1) if y0 <= y <= y1)
+        for _, (px, py), _ in starts + goals:
+            xs.add(px)
+            ys.add(py)
+        xs, ys = sorted(xs), sorted(ys)
+        column, row = {x: i for i, x in enumerate(xs)}, {y: j for j, y in enumerate(ys)}
+        goal_points = {(column[p[0]], row[p[1]]): (port, direction) for port, p, direction in goals}
+
+        blocked_points = {}
+
+        def blocked_at(x, y):
+            if (x, y) not in blocked_points:
+                blocked_points[x, y] = bool(self.index.at(x, y) - exclude)
+            return blocked_points[x, y]
+
+        def inside(i, j):
+            return blocked_at(xs[i], ys[j])
+
+        def estimate(i, j):
+            return min(abs(xs[i] - xs[gi]) + abs(ys[j] - ys[gj]) for gi, gj in goal_points)
+
+        # States are (column, row, direction of travel); parents link them back to a start port
+        queue, best, parents, start_ports = [], {}, {}, {}
+        if all(blocked_at(*point) for _, point, _ in goals):
+            return None, False  # every port of the target is walled in; a bigger window will not help
+        touched_edge = False
+        for port, (px, py), direction in starts:
+            state = (column[px], row[py], direction)
+            if not inside(*state[:2]) and not self._blocked(port, (px, py), exclude):
+                best[state], parents[state], start_ports[state] = self.clearance, None, port
+                heapq.heappush(queue, (self.clearance + estimate(*state[:2]), self.clearance, state))
+        while queue:
+            _, cost, state = heapq.heappop(queue)
+            if cost > best[state]:
+                continue
+            i, j, direction = state
+            if (i, j) in goal_points and direction != goal_points[i, j][1]:
+                points = []
+                while parents[state] is not None:
+                    points.append((xs[state[0]], ys[state[1]]))
+                    state = parents[state]
+                points.append((xs[state[0]], ys[state[1]]))
+                return [start_ports[state]] + points[::-1] + [goal_points[i, j][0]], touched_edge
+            for step in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                if step == (-direction[0], -direction[1]):
+                    continue
+                ni, nj = i + step[0], j + step[1]
+                if not (0 <= ni < len(xs) and 0 <= nj < len(ys)):
+                    touched_edge = True
+                    continue
+                if inside(ni, nj):
+                    continue
+                p, q = (xs[i], ys[j]), (xs[ni], ys[nj])
+                # Every box edge is a grid line, so a step crosses a box only if its midpoint is inside
+                if blocked_at((p[0] + q[0]) / 2, (p[1] + q[1]) / 2):
+                    continue
+                next_state = (ni, nj, step)
+                next_cost = cost + abs(q[0] - p[0]) + abs(q[1] - p[1]) + (self.bend_cost if step != direction else 0)
+                if next_cost < best.get(next_state, math.inf):
+                    best[next_state], parents[next_state] = next_cost, state
+                    heapq.heappush(queue, (next_cost + estimate(ni, nj), next_cost, next_state))
+        return None, touched_edge
+
+    def orthogonal(self, source, target):
+        """Returns the points of an orthogonal path from source's box to target's box"""
+        exclude = {source, target}
+        straight = self._straight(source, target)
+        if straight and not self._path_blocked(straight, exclude):
+            return self._claimed(source, target, straight)
+        sx0, sy0, sx1, sy1 = self.extents[source]
+        tx0, ty0, tx1, ty1 = self.extents[target]
+        window = (min(sx0, tx0), min(sy0, ty0), max(sx1, tx1), max(sy1, ty1))
+        margin = max(self.index.cell, 4 * self.clearance)
+        for _ in range(6):
+            window = _inflate(window, margin)
+            path, touched_edge = self._search(source, target, window)
+            if path:
+                return self._claimed(source, target, _simplify(path))
+            if not touched_edge:
+                break  # the reachable area is enclosed; a bigger window finds nothing new
+            margin *= 2
+        return straight or [((sx0 + sx1) / 2, (sy0 + sy1) / 2), ((tx0 + tx1) / 2, (ty0 + ty1) / 2)]
+
+    def _claimed(self, source, target, points):
+        self._claim(source, points[0])
+        self._claim(target, points[-1])
+        return points
+
+    # Straight and curved routes
+
+    def _facing_points(self, source, target):
+        """Where the line between the box centers leaves each box"""
+        def exit_point(box, toward):
+            x0, y0, x1, y1 = box
+            cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+            dx, dy = toward[0] - cx, toward[1] - cy
+            scale = min((x1 - cx) / abs(dx) if dx else math.inf, (y1 - cy) / abs(dy) if dy else math.inf)
+            return cx + dx * scale, cy + dy * scale
+
+        source_box, target_box = self.extents[source], self.extents[target]
+        centers = [((x0 + x1) / 2, (y0 + y1) / 2) for x0, y0, x1, y1 in (source_box, target_box)]
+        return exit_point(source_box, centers[1]), exit_point(target_box, centers[0])
+
+    def straight(self, source, target):
+        """Returns the (start, end) of a direct line between the facing sides"""
+        return self._facing_points(source, target)
+
+    def curve_points(self, start, end, rad, samples=CURVE_SAMPLES):
+        """Samples matplotlib's arc3 curve, which bends in display (point) space"""
+        kx, ky = self.points_per_unit
+        (x1, y1), (x2, y2) = (start[0] * kx, start[1] * ky), (end[0] * kx, end[1] * ky)
+        cx, cy = (x1 + x2) / 2 + rad * (y2 - y1), (y1 + y2) / 2 - rad * (x2 - x1)
+        points = []
+        for k in range(samples + 1):
+            t = k / samples
+            x = (1 - t) ** 2 * x1 + 2 * (1 - t) * t * cx + t ** 2 * x2
+            y = (1 - t) ** 2 * y1 + 2 * (1 - t) * t * cy + t ** 2 * y2
+            points.append((x / kx, y / ky))
+        return points
+
+    def _side_centers(self, key):
+        x0, y0, x1, y1 = self.extents[key]
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        return [(x1, cy), (x0, cy), (cx, y1), (cx, y0)]
+
+    def curved(self, source, target, rad=None):
+        """Returns (start, end, rad) of an arc3 curve that misses the other boxes
+
+        The line between the facing sides with the requested curvature is
+        preferred; other curvatures, then other side centers, are tried when
+        they cross fewer boxes.
+        """
+        facing = self._facing_points(source, target)
+        exclude = {source, target}
+        ends = [_inflate(self.extents[key], self.clearance) for key in exclude]
+        preferred = CURVE_RADS[0] if rad is None else rad
+        rads = [preferred] + [sign * value for value in CURVE_RADS for sign in (1, -1)
+                              if sign * value != preferred] + [0.0]
+        pairs = [facing] + sorted(((start, end) for start in self._side_centers(source)
+                                   for end in self._side_centers(target)), key=lambda pair: math.dist(*pair))
+
+        def collisions(start, end, candidate):
+            # Parts of the curve inside its own end boxes do not count; those may overlap others
+            points = [point for point in self.curve_points(start, end, candidate)
+                      if not any(x0 <= point[0] <= x1 and y0 <= point[1] <= y1 for x0, y0, x1, y1 in ends)]
+            return sum(self._blocked(p, q, exclude) for p, q in zip(points, points[1:]))
+
+        best = None
+        for pair_rank, (start, end) in enumerate(pairs):
+            for rad_rank, candidate in enumerate(rads):
+                score = (collisions(start, end, candidate), pair_rank, rad_rank)
+                if best is None or score < best[0]:
+                    best = score, (start, end, candidate)
+                if not score[0]:
+                    return best[1]
+        return best[1]
+
+def midpoint(points):
+    """The point halfway along a polyline, by length"""
+    lengths = [math.dist(p, q) for p, q in zip(points, points[1:])]
+    remaining = sum(lengths) / 2
+    for (p, q), length in zip(zip(points, points[1:]), lengths):
+        if remaining <= length and length:
+            t = remaining / length
+            return p[0] + (q[0] - p[0]) * t, p[1] + (q[1] - p[1]) * t
+        remaining -= length
+    return tuple(points[-1])
+
+def _simplify(points):
+    """Drops repeated and collinear points"""
+    result = []
+    for point in points:
+        if result and point == result[-1]:
+            continue
+        if len(result) >= 2:
+            (ax, ay), (bx, by) = result[-2], result[-1]
+            if (ax == bx == point[0]) or (ay == by == point[1]):
+                result[-1] = point
+                continue
+        result.append(point)
+    return result
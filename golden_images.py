@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Golden Image Regression Check for AdTech Teaching Assistant Diagrams
+Renders every generator at low dpi and compares it with stored golden images
+
+Each create_* generator (discovered like render_all.py does) is rendered at
+GOLDEN_DPI in a process pool, one diagram per task, and checked in two
+stages:
+
+    hash    a perceptual hash of the new image is compared with the one
+            stored in golden/golden.json, without opening the golden
+            image. The hash is a GRID x GRID mosaic of 64-bit DCT hashes
+            (pHash: the 8x8 lowest frequencies of a 32x32 grayscale
+            thumbnail, each bit set when above the median), so a change
+            confined to one label still flips bits of its tile. Equal
+            hashes of equal-sized images pass
+    pixels  only when the hash differs (or with --strict): the golden PNG
+            is decoded and the absolute per-channel difference computed
+            with NumPy. A diagram fails when more than --max-changed of
+            its pixels (none by default) differ by over --tolerance levels;
+            the tolerance absorbs antialiasing jitter, while a one-letter
+            label edit changes a few hundred pixels by far more
+
+A failing diagram leaves <name>-actual.png and <name>-diff.png in
+--diff-dir. The heatmap shows the golden image faded to gray, with changed
+pixels in red, brighter for larger differences. A size change fails at
+once.
+
+Golden images depend on the fonts and matplotlib version they were made
+with; regenerate them with --update after an intended visual change or an
+environment change (the manifest records the matplotlib version).
+
+Usage:
+    python golden_images.py                     # check everything, exit 1 on a regression
+    python golden_images.py --strict -j 4       # pixel diff every diagram
+    python golden_images.py --update            # accept the current output as golden
+    python golden_images.py create_latency_waterfall --tolerance 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from png_io import write_png
+from png_optimize import read_png
+from render_all import ROOT_DIR, _init_worker, discover_generators, load_script
+
+GOLDEN_DIR = os.path.join(ROOT_DIR, 'golden')
+MANIFEST_NAME = 'golden.json'
+GOLDEN_DPI = 60
+GRID = 4
+HASH_SIZE = 32  # thumbnail side per tile
+HASH_BITS = 8  # lowest frequencies kept per axis
+TOLERANCE = 24  # channel levels a pixel may move without counting as changed
+MAX_CHANGED = 0.0  # fraction of pixels that may change; raise it to compare across font setups
+
+def _dct_matrix(size):
+    import numpy as np
+
+    k, n = np.meshgrid(np.arange(size), np.arange(size), indexing='ij')
+    return np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+
+def _area_resize(gray, rows, columns):
+    """Averages a 2D array down to rows x columns (each output cell is the mean of its source block)"""
+    import numpy as np
+
+    row_edges = np.linspace(0, gray.shape[0], rows + 1).astype(int)
+    column_edges = np.linspace(0, gray.shape[1], columns + 1).astype(int)
+    sums = np.add.reduceat(np.add.reduceat(gray, row_edges[:-1], axis=0), column_edges[:-1], axis=1)
+    return sums / np.outer(np.diff(row_edges), np.diff(column_edges))
+
+def perceptual_hash(pixels):
+    """Returns GRID x GRID 64-bit tile hashes as hex strings, row by row"""
+    import numpy as np
+
+    gray = pixels[..., :3].astype(np.float64) @ np.array([0.299, 0.587, 0.114])
+    side = GRID * HASH_SIZE
+    if min(gray.shape) < side:
+        gray = np.pad(gray, ((0, max(0, side - gray.shape[0])), (0, max(0, side - gray.shape[1]))), mode='edge')
+    tiles = _area_resize(gray, side, side).reshape(GRID, HASH_SIZE, GRID, HASH_SIZE).transpose(0, 2, 1, 3)
+    dct = _dct_matrix(HASH_SIZE)[:HASH_BITS]
+    low = np.einsum('ik,abkl,jl->abij', dct, tiles, dct).reshape(GRID * GRID, HASH_BITS * HASH_BITS)
+    bits = low > np.median(low[:, 1:], axis=1, keepdims=True)  # the DC term would skew the median
+    weights = 1 << np.arange(HASH_BITS * HASH_BITS, dtype=np.uint64)[::-1]
+    return [f'{value:016x}' for value in (bits.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)]
+
+def hash_distance(first, second):
+    """Number of differing bits between two perceptual hashes"""
+    return sum(bin(int(a, 16) ^ int(b, 16)).count('1') for a, b in zip(first, second))
+
+def pixel_diff(actual, golden, tolerance=TOLERANCE):
+    """Returns (per-pixel max channel difference, changed pixel mask)"""
+    import numpy as np
+
+    difference = np.abs(actual[..., :3].astype(np.int16) - golden[..., :3]).max(axis=2)
+    return difference, difference > tolerance
+
+def heatmap(golden, difference):
+    """The golden image faded to light gray with differing pixels in red, stronger for larger differences"""
+    import numpy as np
+
+    gray = golden[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    faded = np.repeat((gray * 0.3 + 255 * 0.7)[..., None], 3, axis=2)
+    strength = np.clip(difference / 64, 0, 1)[..., None]
+    strength[difference > 0] = np.maximum(strength[difference > 0], 0.35)
+    return np.rint(faded * (1 - strength) + np.array([220, 0, 0]) * strength).astype(np.uint8)
+
+def _render(script, name, dpi):
+    """Renders one generator at dpi, returns (output file name, RGB pixels)"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = getattr(load_script(script), name)(output_dir=directory, dpi=dpi)
+        pixels, _ = read_png(path)
+    return os.path.basename(path), pixels[..., :3]
+
+def capture(script, name, dpi):
+    """Writes a generator's golden image, returns its manifest entry"""
+    filename, pixels = _render(script, name, dpi)
+    write_png(os.path.join(GOLDEN_DIR, filename), pixels, level=9)
+    return name, {'file': filename, 'size': [pixels.shape[1], pixels.shape[0]], 'hash': perceptual_hash(pixels)}
+
+def check(script, name, entry, dpi, tolerance, max_changed, strict, diff_dir):
+    """Compares a generator's output with its golden image, returns a result dict"""
+    start = time.perf_counter()
+    filename, actual = _render(script, name, dpi)
+    result = {'name': name, 'stage': 'hash', 'passed': True, 'hash_distance': 0, 'changed': 0, 'max_diff': 0}
+    size = [actual.shape[1], actual.shape[0]]
+    if size != entry['size']:
+        result.update(stage='size', passed=False, detail=f"{entry['size'][0]}x{entry['size'][1]} -> "
+                                                         f"{size[0]}x{size[1]} px")
+    else:
+        result['hash_distance'] = hash_distance(perceptual_hash(actual), entry['hash'])
+        if result['hash_distance'] or strict:
+            golden, _ = read_png(os.path.join(GOLDEN_DIR, entry['file']))
+            difference, changed = pixel_diff(actual, golden, tolerance)
+            result.update(stage='pixels', changed=int(changed.sum()), max_diff=int(difference.max()))
+            result['passed'] = result['changed'] <= max_changed * changed.size
+            if not result['passed']:
+                os.makedirs(diff_dir, exist_ok=True)
+                stem = os.path.splitext(filename)[0]
+                write_png(os.path.join(diff_dir, f'{stem}-diff.png'), heatmap(golden, difference))
+                result['detail'] = f'{result["changed"]:,} px changed by more than {tolerance}'
+    if not result['passed']:
+        os.makedirs(diff_dir, exist_ok=True)
+        write_png(os.path.join(diff_dir, f'{os.path.splitext(filename)[0]}-actual.png'), actual)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def load_manifest():
+    try:
+        with open(os.path.join(GOLDEN_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'dpi': GOLDEN_DPI, 'diagrams': {}}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check rendered diagrams against golden images')
+    parser.add_argument('names', nargs='*', help='only these create_* functions')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: number of CPUs)')
+    parser.add_argument('--tolerance', type=int, default=TOLERANCE, help='channel levels a pixel may move')
+    parser.add_argument('--max-changed', type=float, default=MAX_CHANGED,
+                        help='fraction of pixels that may change before a diagram fails')
+    parser.add_argument('--strict', action='store_true', help='pixel diff even when the hashes match')
+    parser.add_argument('--update', action='store_true', help='store the current output as the golden images')
+    parser.add_argument('--diff-dir', default=os.path.join(tempfile.gettempdir(), 'golden-diffs'),
+                        help='where failing diagrams leave their actual image and diff heatmap')
+    args = parser.parse_args(argv)
+
+    generators = discover_generators()
+    if args.names:
+        unknown = set(args.names) - {name for _, name in generators}
+        if unknown:
+            parser.error('unknown generator(s): ' + ', '.join(sorted(unknown)))
+        generators = [(script, name) for script, name in generators if name in args.names]
+    manifest = load_manifest()
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker) as pool:
+        if args.update:
+            import matplotlib
+
+            os.makedirs(GOLDEN_DIR, exist_ok=True)
+            futures = [pool.submit(capture, script, name, manifest['dpi']) for script, name in generators]
+            for future in as_completed(futures):
+                name, entry = future.result()
+                manifest['diagrams'][name] = entry
+                print(f"  updated {name:<40} {entry['file']}")
+            manifest['matplotlib'] = matplotlib.__version__
+            with open(os.path.join(GOLDEN_DIR, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+                f.write('\n')
+            print(f'Stored {len(futures)} golden images in {time.perf_counter() - start:.2f}s')
+            return 0
+
+        missing = [name for _, name in generators if name not in manifest['diagrams']]
+        if missing:
+            print(f"No golden image for {', '.join(missing)}; run with --update")
+            return 1
+        futures = [pool.submit(check, script, name, manifest['diagrams'][name], manifest['dpi'], args.tolerance,
+                               args.max_changed, args.strict, args.diff_dir) for script, name in generators]
+        results = [future.result() for future in as_completed(futures)]
+
+    print(f'  {"diagram":<40} {"result":<6} {"stage":<6} {"hash bits":>9} {"changed px":>10} {"max diff":>8} '
+          f'{"time":>6}')
+    for result in sorted(results, key=lambda result: result['name']):
+        print(f"  {result['name']:<40} {'ok' if result['passed'] else 'FAIL':<6} {result['stage']:<6} "
+              f"{result['hash_distance']:9d} {result['changed']:10,} {result['max_diff']:8d} "
+              f"{result['seconds']:5.2f}s  {result.get('detail', '')}")
+    failed = [result for result in results if not result['passed']]
+    print(f'{len(results) - len(failed)}/{len(results)} diagrams match their golden images '
+          f'({time.perf_counter() - start:.2f}s)')
+    if failed:
+        print(f'Actual images and diff heatmaps: {args.diff_dir}')
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Concept Knowledge Graph for AdTech Teaching Assistant
+Lays out and draws the concept prerequisite graph behind the learning paths
+
+A graph is a list of concepts, each naming the concepts it builds on:
+
+    JSON   {"concepts": [{"id": "rtb", "label": "RTB Process", "prerequisites": ["dsp", "ssp"]}, ...]}
+    JSONL  {"id": "rtb", "label": "RTB Process", "prerequisites": ["dsp", "ssp"]}   (one per line)
+
+label defaults to the id. Without a file the built-in AdTech curriculum
+(CONCEPTS) is drawn; --synthetic N generates a random curriculum of N
+concepts for trying the renderer at scale.
+
+Layout is force-directed (Fruchterman-Reingold) with every force computed
+on NumPy arrays. Up to EXACT_MAX concepts, repulsion is summed over all
+pairs; above it, a Barnes-Hut style approximation takes over: concepts are
+binned into a uniform grid, repelled exactly by the concepts in their own
+and the 8 neighbouring cells, and by cell centroids, weighted by their
+counts, farther away, using coarser cells (2x2 merged per level, like a
+quadtree) the farther the cell. A pass then costs O(n log n) instead of
+O(n^2).
+
+Positions start from the prerequisite depth of each concept; the "layered"
+layout keeps that depth as the row, top to bottom, and only lets forces
+spread concepts sideways, the "force" layout frees both axes.
+
+All nodes are one PatchCollection, all edges one LineCollection and all
+arrowheads one PolyCollection, so drawing costs the same handful of artists
+for 20 or 20,000 concepts. Labels are drawn up to LABEL_MAX concepts; larger
+graphs show colored dots by depth.
+
+render_* functions return the encoded image as a memoryview; create_*
+functions write it to output_dir ($DIAGRAM_OUTPUT_DIR or the repository root
+by default).
+
+Usage:
+    python knowledge_graph.py -o out/
+    python knowledge_graph.py curriculum.json --layout force
+    python knowledge_graph.py --synthetic 5000 --dpi 100 -o out/
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from diagram_engine import blank_figure, default_output_dir, points_per_unit, render_figure, set_headless, write_image
+
+# The built-in curriculum: concept id -> (label, prerequisites)
+CONCEPTS = {
+    'digital_ads': ('Digital Advertising Basics', []),
+    'impressions': ('Impressions & Ad Units', ['digital_ads']),
+    'pricing': ('CPM, CPC & CPA Pricing', ['impressions']),
+    'publishers': ('Publishers & Inventory', ['impressions']),
+    'advertisers': ('Advertisers & Campaigns', ['digital_ads']),
+    'ad_servers': ('Ad Servers', ['publishers', 'advertisers']),
+    'cookies': ('Cookies & Identity', ['digital_ads']),
+    'dsp': ('DSP Basics', ['advertisers', 'pricing']),
+    'ssp': ('SSP Intro', ['publishers', 'pricing']),
+    'ad_exchanges': ('Ad Exchanges', ['dsp', 'ssp']),
+    'dmp': ('Data Management Platforms', ['cookies', 'advertisers']),
+    'targeting': ('Audience Targeting', ['dmp']),
+    'contextual': ('Contextual Targeting', ['publishers']),
+    'privacy': ('Privacy & Consent (GDPR, CCPA)', ['cookies']),
+    'programmatic': ('Programmatic Advertising', ['ad_exchanges', 'ad_servers']),
+    'auctions': ('First & Second Price Auctions', ['pricing', 'ad_exchanges']),
+    'openrtb': ('OpenRTB Bid Requests', ['ad_exchanges']),
+    'rtb': ('RTB Process', ['programmatic', 'auctions', 'openrtb']),
+    'header_bidding': ('Header Bidding', ['rtb', 'ad_servers']),
+    'prebid': ('Prebid.js', ['header_bidding']),
+    'pmp': ('Private Marketplaces', ['programmatic']),
+    'guaranteed': ('Programmatic Guaranteed', ['pmp']),
+    'spo': ('Supply Path Optimization', ['header_bidding', 'ssp']),
+    'fraud': ('Ad Fraud & Viewability', ['rtb']),
+    'attribution': ('Attribution & Measurement', ['targeting', 'rtb']),
+    'privacy_sandbox': ('Privacy Sandbox & Cookieless', ['privacy', 'targeting', 'contextual']),
+}
+
+EXACT_MAX = 600  # above this many concepts, far repulsion comes from grid cells
+BLOCK_ROWS = 2048  # rows of the pairwise matrices held in memory at once
+CELL_CONCEPTS = 4  # average concepts per finest grid cell
+LABEL_MAX = 150
+LABEL_WIDTH_PT = 110  # longer labels wrap
+UNIT_INCHES = 1.6  # drawn size of the layout's ideal edge length when labelled
+ROW_INCHES = 1.1
+ITERATIONS = 120
+
+DEPTH_COLORS = ['#6B46C1', '#3B82F6', '#0EA5E9', '#10B981', '#84CC16', '#F59E0B', '#EF4444', '#EC4899']
+
+# Graphs
+
+def read_graph(path):
+    """Reads a JSON or JSONL concept file, returns (ids, labels, prerequisite edges)"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+        concepts = data['concepts'] if isinstance(data, dict) else data
+    except ValueError:
+        concepts = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return graph_arrays({item['id']: (item.get('label', item['id']), item.get('prerequisites', []))
+                         for item in concepts})
+
+def graph_arrays(concepts):
+    """Turns {id: (label, prerequisites)} into (ids, labels, (m, 2) array of prerequisite -> concept)"""
+    import numpy as np
+
+    ids = list(concepts)
+    index = {concept: i for i, concept in enumerate(ids)}
+    edges = []
+    for concept, (_, prerequisites) in concepts.items():
+        for prerequisite in dict.fromkeys(prerequisites):  # a repeated prerequisite is one edge
+            if prerequisite not in index:
+                raise ValueError(f'{concept!r} depends on unknown concept {prerequisite!r}')
+            edges.append((index[prerequisite], index[concept]))
+    return ids, [concepts[concept][0] for concept in ids], np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+def synthetic_graph(concepts, seed=11):
+    """A random curriculum: each concept builds on 1-3 earlier concepts, later ones more likely"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(1, 4, concepts)
+    counts[0] = 0
+    targets = np.repeat(np.arange(concepts), counts)
+    # Like real curricula the depth grows with the logarithm of the size
+    prerequisites = (targets * np.sqrt(rng.random(targets.size))).astype(np.int64)
+    edges = np.unique(np.column_stack([prerequisites, targets]), axis=0)
+    ids = [f'c{i}' for i in range(concepts)]
+    return ids, ids, edges
+
+def depths(count, edges):
+    """Longest prerequisite chain above each concept; a cycle is entered below its deepest placed parent"""
+    import numpy as np
+
+    depth = np.zeros(count, dtype=np.int64)
+    placed = np.zeros(count, dtype=bool)
+    indegree = np.bincount(edges[:, 1], minlength=count)
+    order = np.argsort(edges[:, 0], kind='stable')
+    sources, targets = edges[order, 0], edges[order, 1]
+    starts = np.searchsorted(sources, np.arange(count + 1))
+    ready = list(np.flatnonzero(indegree == 0))
+    while True:
+        while ready:
+            concept = ready.pop()
+            placed[concept] = True
+            children = targets[starts[concept]:starts[concept + 1]]
+            below = children[~placed[children]]  # a cycle's closing edge does not move a placed concept
+            depth[below] = np.maximum(depth[below], depth[concept] + 1)
+            np.subtract.at(indegree, children, 1)  # counts a repeated edge every time
+            ready.extend(np.unique(children[indegree[children] == 0]))
+        stuck = np.flatnonzero(~placed)
+        if not stuck.size:
+            return depth
+        # Cycles: release the waiting concept whose placed parents are deepest; its depth already
+        # counts them, and the rest of its cycle follows one row further down each
+        concept = stuck[np.argmax(depth[stuck])]
+        indegree[concept] = 0
+        ready.append(concept)
+
+# Layout
+
+def _repulsion_exact(positions, k2, out):
+    """Adds the all-pairs repulsion k^2 / d to out, a block of rows at a time"""
+    import numpy as np
+
+    for start in range(0, len(positions), BLOCK_ROWS):
+        block = positions[start:start + BLOCK_ROWS]
+        delta = block[:, None, :] - positions[None, :, :]
+        distance2 = np.einsum('ijk,ijk->ij', delta, delta)
+        np.maximum(distance2, 1e-9, out=distance2)
+        out[start:start + BLOCK_ROWS] += np.einsum('ijk,ij->ik', delta, k2 / distance2)
+
+def _grid_pairs(cells, count, columns, rows):
+    """(i, j) pairs of concepts in the same or 8-neighbouring cells, each pair once
+
+    Indices are into the concepts sorted by cell (the returned order), so the
+    pairs gather from memory that is mostly contiguous.
+    """
+    import numpy as np
+
+    order = np.argsort(cells, kind='stable')
+    start = np.concatenate([[0], np.cumsum(count)[:-1]])
+    occupied = np.flatnonzero(count)
+    cx, cy = occupied % columns, occupied // columns
+    firsts, seconds = [], []
+    # Half of the neighbourhood, plus the cell itself, visits every cell pair once
+    for dx, dy in ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+        nx, ny = cx + dx, cy + dy
+        inside = (nx >= 0) & (nx < columns) & (ny >= 0) & (ny < rows)
+        a = occupied[inside]
+        b = (ny * columns + nx)[inside]
+        sizes = count[a] * count[b]
+        keep = sizes > 0
+        a, b, sizes = a[keep], b[keep], sizes[keep]
+        # Expand every cell pair into its count[a] x count[b] concept pairs
+        pair = np.repeat(np.arange(a.size), sizes)
+        offset = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        width = count[b][pair]
+        first, second = start[a][pair] + offset // width, start[b][pair] + offset % width
+        if dx == dy == 0:
+            first, second = first[first < second], second[first < second]
+        firsts.append(first)
+        seconds.append(second)
+    return order, np.concatenate(firsts), np.concatenate(seconds)
+
+def _repulsion_grid(positions, k2, out):
+    """Adds grid-approximated repulsion to out: exact nearby, cell centroids farther away"""
+    import numpy as np
+
+    n = len(positions)
+    low = positions.min(axis=0)
+    extent = np.maximum(positions.max(axis=0) - low, 1e-9)
+    size = np.sqrt(extent[0] * extent[1] * CELL_CONCEPTS / n)
+    columns, rows = np.maximum(1, np.ceil(extent / size - 1e-9)).astype(np.int64)
+    grid = np.minimum((positions - low) / size, [columns - 1, rows - 1]).astype(np.int64)
+    cells = grid[:, 1] * columns + grid[:, 0]
+    count = np.bincount(cells, minlength=columns * rows)
+
+    # Near field, exact
+    order, first, second = _grid_pairs(cells, count, columns, rows)
+    x, y = positions[order, 0], positions[order, 1]
+    dx, dy = x[first] - x[second], y[first] - y[second]
+    push = k2 / np.maximum(dx * dx + dy * dy, 1e-9)
+    dx *= push
+    dy *= push
+    out[order, 0] += np.bincount(first, dx, n) - np.bincount(second, dx, n)
+    out[order, 1] += np.bincount(first, dy, n) - np.bincount(second, dy, n)
+
+    # Far field: at each level of ever coarser cells (2x2 merged per level), a
+    # concept feels the centroids of the children of its parent's neighbours
+    # that are not its own neighbours; the levels together cover every cell
+    # outside the near field exactly once.
+    x, y = positions[:, 0, None], positions[:, 1, None]
+    offsets = np.array([(ox, oy) for oy in range(6) for ox in range(6)])
+    level = 0
+    while True:
+        level_columns, level_rows = ((columns - 1) >> level) + 1, ((rows - 1) >> level) + 1
+        gx, gy = grid[:, 0] >> level, grid[:, 1] >> level
+        level_cells = gy * level_columns + gx
+        weight = np.bincount(level_cells, minlength=level_columns * level_rows).astype(np.float64)
+        filled = np.maximum(weight, 1)
+        centroid_x = np.bincount(level_cells, positions[:, 0], weight.size) / filled
+        centroid_y = np.bincount(level_cells, positions[:, 1], weight.size) / filled
+
+        tx = ((gx >> 1) - 1) * 2
+        ty = ((gy >> 1) - 1) * 2
+        tx, ty = tx[:, None] + offsets[:, 0], ty[:, None] + offsets[:, 1]
+        valid = ((tx >= 0) & (tx < level_columns) & (ty >= 0) & (ty < level_rows)
+                 & ((np.abs(tx - gx[:, None]) > 1) | (np.abs(ty - gy[:, None]) > 1)))
+        target = np.where(valid, ty * level_columns + tx, 0)
+        dx, dy = x - centroid_x[target], y - centroid_y[target]
+        push = np.where(valid, weight[target] * k2, 0.0) / np.maximum(dx * dx + dy * dy, 1e-9)
+        out[:, 0] += (dx * push).sum(axis=1)
+        out[:, 1] += (dy * push).sum(axis=1)
+        if (level_columns + 1) // 2 <= 2 and (level_rows + 1) // 2 <= 2:
+            break  # every parent neighbourhood now spans the whole grid
+        level += 1
+
+def force_layout(count, edges, depth=None, layered=False, iterations=ITERATIONS, seed=3):
+    """Returns (count, 2) positions; k, the ideal edge length, is 1
+
+    depth seeds the rows (deeper concepts lower); layered keeps them fixed.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    depth = np.zeros(count) if depth is None else np.asarray(depth, dtype=np.float64)
+    width = np.sqrt(count)
+    positions = np.column_stack([rng.uniform(0, width, count), -depth * 1.5])
+    if not layered:
+        positions[:, 1] += rng.uniform(-0.5, 0.5, count)
+    repulsion = _repulsion_exact if count <= EXACT_MAX else _repulsion_grid
+    source, target = edges[:, 0], edges[:, 1]
+    temperature = width / 4
+    for step in range(iterations):
+        force = np.zeros((count, 2))
+        repulsion(positions, 1.0, force)
+        # Attraction d^2 / k along each edge, pulling both ends together
+        delta = positions[target] - positions[source]
+        pull = delta * np.hypot(delta[:, 0], delta[:, 1])[:, None]
+        for axis in (0, 1):
+            force[:, axis] += np.bincount(source, pull[:, axis], count) - np.bincount(target, pull[:, axis], count)
+        force -= positions * 0.01 * np.array([1.0, 0.0 if layered else 1.0])  # weak gravity keeps islands near
+        if layered:
+            force[:, 1] = 0
+        length = np.maximum(np.hypot(force[:, 0], force[:, 1]), 1e-9)
+        positions += force * (np.minimum(length, temperature) / length)[:, None]
+        temperature = width / 4 * (1 - (step + 1) / iterations) + 0.01
+    return positions
+
+# Drawing
+
+def _colors(depth):
+    return [DEPTH_COLORS[d % len(DEPTH_COLORS)] for d in depth.tolist()]
+
+def _arrowheads(ends, direction, length, width):
+    """(m, 3, 2) triangles pointing along direction with their tips at ends"""
+    import numpy as np
+
+    normal = direction[:, ::-1] * np.array([-1.0, 1.0])
+    base = ends - direction * length[:, None]
+    return np.stack([ends, base + normal * width[:, None] / 2, base - normal * width[:, None] / 2], axis=1)
+
+def _spread_rows(x, depth, widths, gap):
+    """Pushes boxes apart within each row so neighbours keep gap between them, row centers fixed"""
+    import numpy as np
+
+    x = x.copy()
+    for row in np.unique(depth):
+        members = np.flatnonzero(depth == row)
+        members = members[np.argsort(x[members], kind='stable')]
+        placed = x[members]
+        for i in range(1, len(members)):
+            placed[i] = max(placed[i], placed[i - 1] + (widths[members[i - 1]] + widths[members[i]]) / 2 + gap)
+        x[members] = placed - (placed.mean() - x[members].mean())
+    return x
+
+def draw_graph(labels, edges, positions, depth, title='AdTech Concept Knowledge Graph', layered=True):
+    """Draws the laid-out graph with collection artists, returns the figure"""
+    import numpy as np
+    from matplotlib.collections import LineCollection, PatchCollection, PolyCollection
+    from matplotlib.patches import Circle, FancyBboxPatch
+
+    from text_fit import DEFAULT_BOXSTYLE, PADDING_PT, box_extent, fit_node, text_width
+
+    count = len(positions)
+    labelled = count <= LABEL_MAX
+    if labelled:
+        # Labelled graphs are drawn at a fixed scale, one data unit per inch,
+        # with boxes sized to their labels (wrapped to two lines past LABEL_WIDTH_PT)
+        width_pt = np.array([min(text_width(label, 9, 'bold'), LABEL_WIDTH_PT) for label in labels])
+        half = np.column_stack([(width_pt + 2 * PADDING_PT) / 72 / 2, np.full(count, 30 / 72 / 2)])
+        positions = positions * [UNIT_INCHES, ROW_INCHES / 1.5]
+        if layered:
+            positions[:, 0] = _spread_rows(positions[:, 0], depth, 2 * half[:, 0], 0.3)
+    low, high = positions.min(axis=0), positions.max(axis=0)
+    span = np.maximum(high - low, 1.0)
+    if labelled:
+        margin = half.max(axis=0) + 0.3
+        fig, ax = blank_figure(*(span + 2 * margin))
+        ax.set_position([0, 0, 1, 1])
+    else:
+        margin = span * 0.06 + 0.2
+        scale = 12 / max(span)
+        fig, ax = blank_figure(12 * span[0] / max(span) + 0.5, max(4.0, span[1] * scale) + 1)
+    ax.set_xlim(low[0] - margin[0], high[0] + margin[0])
+    ax.set_ylim(low[1] - margin[1], high[1] + margin[1])
+    ax.axis('off')
+    colors = _colors(depth)
+    x_scale, y_scale = points_per_unit(ax)
+
+    if labelled:
+        nodes = [{'box': [x - hx, y - hy, 2 * hx, 2 * hy], 'boxstyle': DEFAULT_BOXSTYLE,
+                  'lines': [{'text': label, 'fontsize': 9, 'fontweight': 'bold'}]}
+                 for (x, y), (hx, hy), label in zip(positions.tolist(), half.tolist(), labels)]
+        patches = [FancyBboxPatch(node['box'][:2], *node['box'][2:], boxstyle=DEFAULT_BOXSTYLE) for node in nodes]
+        pad = np.array(box_extent(nodes[0])[2:]) - 2 * half[0]
+        half = half + pad / 2
+    else:
+        radius = min(0.35, 0.5 * span[0] / np.sqrt(count))
+        half = np.full((count, 2), radius)
+        patches = [Circle(center, radius) for center in positions.tolist()]
+    ax.add_collection(PatchCollection(patches, facecolors=colors, edgecolors='black' if labelled else 'none',
+                                      linewidths=1 if labelled else 0, alpha=0.9 if labelled else 0.85, zorder=2))
+
+    if len(edges):
+        start, end = positions[edges[:, 0]], positions[edges[:, 1]]
+        delta = end - start
+        # Clip each end to its node: the scale that first reaches the half-extent on either axis
+        absolute = np.maximum(np.abs(delta), 1e-9)
+        leave = np.minimum(half[edges[:, 0], 0] / absolute[:, 0], half[edges[:, 0], 1] / absolute[:, 1])
+        enter = np.minimum(half[edges[:, 1], 0] / absolute[:, 0], half[edges[:, 1], 1] / absolute[:, 1])
+        visible = leave + enter < 1
+        start = start + delta * leave[:, None]
+        end = end - delta * enter[:, None]
+        start, end, delta = start[visible], end[visible], (end - start)[visible]
+        # Arrowheads are sized in points, then converted per axis
+        length_pt = np.hypot(delta[:, 0] * x_scale, delta[:, 1] * y_scale)
+        direction_pt = np.column_stack([delta[:, 0] * x_scale, delta[:, 1] * y_scale]) / np.maximum(length_pt, 1e-9)[:, None]
+        head = np.minimum(8.0 if labelled else 3.0, length_pt / 3)
+        heads = _arrowheads(end * [x_scale, y_scale], direction_pt, head, head * 0.7) / [x_scale, y_scale]
+        shaft_end = end - direction_pt / [x_scale, y_scale] * head[:, None] * 0.9
+        edge_color = '#4B5563' if labelled else '#9CA3AF'
+        ax.add_collection(LineCollection(np.stack([start, shaft_end], axis=1), colors=edge_color,
+                                         linewidths=1.2 if labelled else 0.3, alpha=1 if labelled else 0.5, zorder=1))
+        ax.add_collection(PolyCollection(heads, facecolors=edge_color, edgecolors='none',
+                                         alpha=1 if labelled else 0.5, zorder=1))
+
+    if labelled:
+        for node in nodes:
+            for label in fit_node(node, (x_scale, y_scale)):
+                ax.text(label['x'], label['y'], label['text'], fontsize=label['fontsize'],
+                        ha='center', va='center', color='white', fontweight=label['fontweight'], zorder=3)
+    levels = int(depth.max()) + 1 if count else 0
+    ax.set_title(f'{title}\n{count:,} concepts · {len(edges):,} prerequisites · {levels} levels',
+                 fontsize=14, fontweight='bold')
+    return fig
+
+def build_graph(graph=None, synthetic=None):
+    """Returns (ids, labels, edges) from a file, a synthetic size or the built-in curriculum"""
+    if synthetic:
+        return synthetic_graph(synthetic)
+    return read_graph(graph) if graph else graph_arrays(CONCEPTS)
+
+def lay_out(edges, count, layout='layered', iterations=ITERATIONS):
+    """Returns (positions, depth) for a graph"""
+    depth = depths(count, edges)
+    return force_layout(count, edges, depth, layered=layout == 'layered', iterations=iterations), depth
+
+def render_knowledge_graph(format='png', dpi=300, graph=None, layout='layered', synthetic=None):
+    """Renders the concept knowledge graph in memory"""
+    _, labels, edges = build_graph(graph, synthetic)
+    positions, depth = lay_out(edges, len(labels), layout)
+    return render_figure(draw_graph(labels, edges, positions, depth, layered=layout == 'layered'), format, dpi)
+
+def create_knowledge_graph(output_dir=None, format='png', dpi=300, graph=None, layout='layered', synthetic=None):
+    """Creates the AdTech concept prerequisite graph"""
+    data = render_knowledge_graph(format, dpi, graph, layout, synthetic)
+    return write_image(data, output_dir, f'knowledge-graph.{format}')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Lay out and draw the concept prerequisite graph')
+    parser.add_argument('graph', nargs='?', help='JSON or JSONL concept file (default: built-in curriculum)')
+    parser.add_argument('-o', '--output-dir', default=None)
+    parser.add_argument('--format', default='png')
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--layout', choices=('layered', 'force'), default='layered')
+    parser.add_argument('--iterations', type=int, default=ITERATIONS)
+    parser.add_argument('--synthetic', type=int, metavar='N', help='draw a random curriculum of N concepts')
+    args = parser.parse_args(argv)
+    set_headless(True)
+
+    start = time.perf_counter()
+    _, labels, edges = build_graph(args.graph, args.synthetic)
+    positions, depth = lay_out(edges, len(labels), args.layout, args.iterations)
+    laid_out = time.perf_counter()
+    fig = draw_graph(labels, edges, positions, depth, layered=args.layout == 'layered')
+    data = render_figure(fig, args.format, args.dpi)
+    name = 'knowledge-graph' if not (args.graph or args.synthetic) else f'knowledge-graph-{len(labels)}'
+    path = write_image(data, args.output_dir or default_output_dir(), f'{name}.{args.format}')
+    print(f'{len(labels):,} concepts, {len(edges):,} prerequisites: layout {laid_out - start:.2f}s, '
+          f'drawing {time.perf_counter() - laid_out:.2f}s')
+    print(f'Wrote {path}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Latency Waterfall Diagrams for AdTech Teaching Assistant
+Measures per-stage response times from traces instead of drawing fixed ones
+
+A trace holds one request per row with the time spent in each pipeline
+stage, in milliseconds, in pipeline order:
+
+    JSONL  {"request_id": "r1", "stages": {"intent_recognition": 41.2, ...}}
+    CSV    request_id,intent_recognition,context_analysis,...   (one column per stage)
+
+Stages run one after another, so a request's stage i starts when stage i-1
+ends. The waterfall draws, per stage, the p50 start-to-end bar followed by
+the p95 and p99 bands of the stage's end time, and the end-to-end total
+against the response time budget.
+
+Traces are read in chunks of rows; every chunk is binned into fixed-width
+histograms with one vectorized bincount, so percentiles come from the
+histograms (to BIN_MS resolution) and memory stays flat for any number of
+rows. Without a trace, a seeded synthetic one shaped like the "Response Time
+Analysis" chart in blog_post.md is used.
+
+render_* functions return the encoded image as a memoryview; create_*
+functions write it to output_dir ($DIAGRAM_OUTPUT_DIR or the repository root
+by default).
+
+Usage:
+    python latency_waterfall.py traces.jsonl -o out/ --summary out/latency.json
+    python latency_waterfall.py traces.csv --budget-ms 400
+    python latency_waterfall.py --write-synthetic 1000000 traces.jsonl
+"""
+
+import argparse
+import csv
+import json
+import sys
+from itertools import islice
+
+from diagram_engine import blank_figure, default_output_dir, render_figure, set_headless, write_image
+
+# Pipeline stages and their typical duration in ms, as in blog_post.md
+DEFAULT_STAGES = {
+    'intent_recognition': 50,
+    'context_analysis': 50,
+    'knowledge_retrieval': 100,
+    'content_assembly': 150,
+    'formatting': 50,
+    'slack_delivery': 100,
+}
+DEFAULT_BUDGET_MS = 500
+ID_COLUMNS = {'request_id', 'trace_id', 'user_id', 'timestamp'}
+
+# Histogram resolution and range; slower values land in the last bin
+BIN_MS = 0.25
+MAX_MS = 30000
+CHUNK_ROWS = 100000
+PERCENTILES = (50, 95, 99)
+
+STAGE_COLORS = ['#3B82F6', '#6B46C1', '#10B981', '#F59E0B', '#EF4444', '#0EA5E9']
+
+class LatencyHistograms:
+    """Streaming per-stage duration and end-time histograms"""
+
+    def __init__(self, stages):
+        import numpy as np
+
+        self._np = np
+        self.stages = list(stages)
+        self.bins = int(MAX_MS / BIN_MS)
+        # Series: each stage's duration, each stage's end time, the request total
+        self.series = len(self.stages) * 2 + 1
+        self.counts = np.zeros((self.series, self.bins), dtype=np.int64)
+        self.sums = np.zeros(self.series)
+        self.maxima = np.zeros(self.series)
+        self.requests = 0
+
+    def add_stages(self, stages):
+        """Grows the histograms to a stage order that keeps every current stage
+
+        Earlier requests skipped the new stages, so their end times stand.
+        """
+        np = self._np
+        stages = list(stages)
+        new_count = len(stages)
+        rows = [stages.index(stage) for stage in self.stages]
+        rows = rows + [new_count + row for row in rows] + [2 * new_count]
+        counts = np.zeros((new_count * 2 + 1, self.bins), dtype=np.int64)
+        sums, maxima = np.zeros(len(counts)), np.zeros(len(counts))
+        counts[rows], sums[rows], maxima[rows] = self.counts, self.sums, self.maxima
+        self.stages, self.series = stages, len(counts)
+        self.counts, self.sums, self.maxima = counts, sums, maxima
+
+    def add(self, durations):
+        """Adds an (requests, stages) array of ms; NaN marks a stage a request skipped
+
+        Negative durations (clock skew) count as 0.
+        """
+        np = self._np
+        durations = np.maximum(np.asarray(durations, dtype=np.float64), 0)
+        ends = np.nancumsum(durations, axis=1)
+        ends[np.isnan(durations)] = np.nan
+        totals = np.nansum(durations, axis=1)[:, None]
+        values = np.concatenate([durations, ends, totals], axis=1)
+        valid = ~np.isnan(values)
+        index = np.minimum((np.where(valid, values, 0) / BIN_MS).astype(np.int64), self.bins - 1)
+        index += np.arange(self.series) * self.bins
+        self.counts += np.bincount(index[valid], minlength=self.series * self.bins).reshape(self.series, self.bins)
+        self.sums += np.where(valid, values, 0).sum(axis=0)
+        self.maxima = np.maximum(self.maxima, np.where(valid, values, 0).max(axis=0, initial=0))
+        self.requests += len(durations)
+
+    def percentiles(self, series, qs=PERCENTILES):
+        """Percentiles of one series, interpolated within histogram bins"""
+        np = self._np
+        counts = self.counts[series]
+        total = counts.sum()
+        if not total:
+            return [0.0] * len(qs)
+        cumulative = np.cumsum(counts)
+        results = []
+        for q in qs:
+            rank = q / 100 * total
+            bin_index = int(np.searchsorted(cumulative, rank))
+            before = cumulative[bin_index - 1] if bin_index else 0
+            fraction = (rank - before) / counts[bin_index] if counts[bin_index] else 0
+            results.append(min((bin_index + fraction) * BIN_MS, self.maxima[series]))
+        return results
+
+    def share_within(self, series, limit_ms):
+        counts = self.counts[series]
+        return float(counts[:int(limit_ms / BIN_MS)].sum() / counts.sum()) if counts.sum() else 0.0
+
+    def summary(self, budget_ms=DEFAULT_BUDGET_MS):
+        """Compact JSON-ready statistics for every stage and the total"""
+        count = len(self.stages)
+
+        def stats(series):
+            n = int(self.counts[series].sum())
+            values = self.percentiles(series)
+            return {'count': n, 'mean': round(float(self.sums[series]) / n, 3) if n else 0,
+                    'max': round(float(self.maxima[series]), 3),
+                    **{f'p{q}': round(float(value), 3) for q, value in zip(PERCENTILES, values)}}
+
+        return {
+            'requests': self.requests,
+            'budget_ms': budget_ms,
+            'within_budget': round(self.share_within(2 * count, budget_ms), 5),
+            'stages': [{'name': name, 'duration': stats(i), 'end': stats(count + i)}
+                       for i, name in enumerate(self.stages)],
+            'total': stats(2 * count),
+        }
+
+# Trace input
+
+def _merge_stage_order(stages, names):
+    """Adds stage names not seen yet, each right after its predecessor in names"""
+    for previous, name in zip([None] + names, names):
+        if name not in stages:
+            stages.insert(stages.index(previous) + 1 if previous in stages else len(stages), name)
+
+def _jsonl_chunks(path, stages, chunk_rows):
+    import numpy as np
+
+    nan = float('nan')
+    with open(path, encoding='utf-8') as f:
+        lines = (line for line in f if line.strip())
+        records = [json.loads(line) for line in islice(lines, chunk_rows)]
+        # Requests may skip stages, so the order grows with every chunk unless given
+        merge = not stages
+        stages = list(stages or [])
+        if merge:
+            for record in records:
+                _merge_stage_order(stages, list(record['stages']))
+        yield list(stages), None
+        while records:
+            if merge:
+                for record in records:
+                    _merge_stage_order(stages, list(record['stages']))
+            yield list(stages), np.array([[record['stages'].get(stage, nan) for stage in stages]
+                                    for record in records], dtype=np.float64)
+            records = [json.loads(line) for line in islice(lines, chunk_rows)]
+
+def _csv_chunks(path, stages, chunk_rows):
+    import numpy as np
+
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        stages = stages or [column for column in header if column not in ID_COLUMNS]
+        columns = [header.index(stage) for stage in stages]
+        yield stages, None
+        while True:
+            rows = [[row[i] for i in columns] for row in islice(reader, chunk_rows)]
+            if not rows:
+                return
+            cells = np.array(rows, dtype=str)
+            yield stages, np.where(cells == '', 'nan', cells).astype(np.float64)
+
+def read_trace_chunks(path, stages=None, chunk_rows=CHUNK_ROWS):
+    """Yields (stage names, (rows, stages) array of ms) chunks of a JSONL or CSV trace
+
+    The first item carries only the stage names (array None). A JSONL trace's
+    names grow when a later chunk has a stage the earlier ones did not.
+    """
+    reader = _csv_chunks if path.endswith('.csv') else _jsonl_chunks
+    return reader(path, stages, chunk_rows)
+
+def synthetic_chunks(requests, stages=DEFAULT_STAGES, seed=7, chunk_rows=CHUNK_ROWS):
+    """Yields seeded log-normal stage timings centred on the typical durations"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    medians = np.array(list(stages.values()), dtype=np.float64) * 0.8
+    yield list(stages), None
+    for start in range(0, requests, chunk_rows):
+        rows = min(chunk_rows, requests - start)
+        yield list(stages), medians * rng.lognormal(0, 0.35, size=(rows, len(medians)))
+
+def collect(chunks):
+    """Feeds trace chunks into a LatencyHistograms"""
+    stages, _ = next(chunks)
+    histograms = LatencyHistograms(stages)
+    for stages, durations in chunks:
+        if stages != histograms.stages:
+            histograms.add_stages(stages)
+        histograms.add(durations)
+    return histograms
+
+def write_synthetic(path, requests, seed=7):
+    """Writes a synthetic trace as JSONL, for trying the tool on realistic volumes"""
+    chunks = synthetic_chunks(requests, seed=seed)
+    stages, _ = next(chunks)
+    number = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for _, durations in chunks:
+            for row in durations.round(3).tolist():
+                f.write(json.dumps({'request_id': f'r{number}', 'stages': dict(zip(stages, row))}) + '\n')
+                number += 1
+
+# Drawing
+
+def draw_waterfall(histograms, budget_ms=DEFAULT_BUDGET_MS, title='Response Time Waterfall'):
+    """Draws the stage waterfall with percentile bands, returns the figure"""
+    summary = histograms.summary(budget_ms)
+    stages = summary['stages']
+    fig, ax = blank_figure(14, 1.6 + 0.7 * (len(stages) + 1))
+    rows = len(stages) + 1
+    for i, stage in enumerate(stages):
+        y = rows - i - 1
+        color = STAGE_COLORS[i % len(STAGE_COLORS)]
+        start = stage['end']['p50'] - stage['duration']['p50']
+        end = stage['end']
+        # One batched artist per row: p50 bar, then the p95 and p99 end-time bands
+        ax.broken_barh([(start, end['p50'] - start), (end['p50'], end['p95'] - end['p50']),
+                        (end['p95'], end['p99'] - end['p95'])], (y - 0.3, 0.6),
+                       facecolors=[color, _tint(color, 0.55), _tint(color, 0.8)], edgecolor='none')
+        duration = stage['duration']
+        ax.text(end['p99'] + budget_ms * 0.01, y,
+                f"p50 {duration['p50']:.0f} · p95 {duration['p95']:.0f} · p99 {duration['p99']:.0f} ms",
+                va='center', fontsize=9, color='#333333')
+
+    total = summary['total']
+    ax.broken_barh([(0, total['p50']), (total['p50'], total['p95'] - total['p50']),
+                    (total['p95'], total['p99'] - total['p95'])], (-0.3, 0.6),
+                   facecolors=['#374151', _tint('#374151', 0.55), _tint('#374151', 0.8)], edgecolor='none')
+    ax.text(total['p99'] + budget_ms * 0.01, 0,
+            f"p50 {total['p50']:.0f} · p95 {total['p95']:.0f} · p99 {total['p99']:.0f} ms",
+            va='center', fontsize=9, fontweight='bold', color='#111111')
+
+    over = total['p99'] > budget_ms
+    ax.axvline(budget_ms, color='#DC2626' if over else '#16A34A', linestyle='--', linewidth=1.5)
+    ax.text(budget_ms, rows - 0.4, f' {budget_ms:g} ms budget', color='#DC2626' if over else '#16A34A',
+            fontsize=9, va='bottom')
+    ax.set_yticks(range(rows))
+    ax.set_yticklabels(['Total'] + [stage['name'].replace('_', ' ').title() for stage in reversed(stages)])
+    ax.set_ylim(-0.7, rows - 0.1)
+    ax.set_xlim(0, max(total['p99'], budget_ms) * 1.3)
+    ax.set_xlabel('Time since request start (ms)')
+    for side in ('top', 'right', 'left'):
+        ax.spines[side].set_visible(False)
+    ax.tick_params(axis='y', length=0)
+    ax.grid(axis='x', color='#E5E7EB', linewidth=0.8)
+    ax.set_axisbelow(True)
+    ax.set_title(f"{title}\n{summary['requests']:,} requests · {summary['within_budget']:.1%} within "
+                 f"{budget_ms:g} ms · bars p50, bands to p95 / p99", fontsize=13, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+def _tint(color, amount):
+    """Mixes a hex color with white"""
+    rgb = [int(color[i:i + 2], 16) for i in (1, 3, 5)]
+    return '#' + ''.join(f'{round(c + (255 - c) * amount):02X}' for c in rgb)
+
+def _histograms(trace, stages=None):
+    return collect(read_trace_chunks(trace, stages) if trace else synthetic_chunks(20000))
+
+def render_latency_waterfall(format='png', dpi=300, trace=None, budget_ms=DEFAULT_BUDGET_MS):
+    """Renders the latency waterfall in memory, from a trace file or the synthetic sample"""
+    title = 'Response Time Waterfall' + ('' if trace else ' (simulated)')
+    return render_figure(draw_waterfall(_histograms(trace), budget_ms, title), format, dpi)
+
+def create_latency_waterfall(output_dir=None, format='png', dpi=300, trace=None, budget_ms=DEFAULT_BUDGET_MS):
+    """Creates the measured response time waterfall"""
+    data = render_latency_waterfall(format, dpi, trace, budget_ms)
+    return write_image(data, output_dir, f'latency-waterfall.{format}')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render a per-stage latency waterfall from request traces')
+    parser.add_argument('trace', nargs='?', help='JSONL or CSV trace (default: simulated sample)')
+    parser.add_argument('-o', '--output-dir', default=None)
+    parser.add_argument('--format', default='png')
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--stages', help='comma-separated stage order (default: as in the trace)')
+    parser.add_argument('--summary', help='also write the percentile summary as JSON here')
+    parser.add_argument('--write-synthetic', type=int, metavar='N', help='write N synthetic requests to TRACE and exit')
+    args = parser.parse_args(argv)
+    set_headless(True)
+
+    if args.write_synthetic:
+        if not args.trace:
+            parser.error('--write-synthetic needs a TRACE path to write')
+        write_synthetic(args.trace, args.write_synthetic)
+        print(f'Wrote {args.write_synthetic} requests to {args.trace}')
+        return 0
+
+    stages = args.stages.split(',') if args.stages else None
+    histograms = _histograms(args.trace, stages)
+    summary = histograms.summary(args.budget_ms)
+    title = 'Response Time Waterfall' + ('' if args.trace else ' (simulated)')
+    fig = draw_waterfall(histograms, args.budget_ms, title)
+    path = write_image(render_figure(fig, args.format, args.dpi), args.output_dir or default_output_dir(),
+                       f'latency-waterfall.{args.format}')
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+    total = summary['total']
+    print(f"{summary['requests']:,} requests: p50 {total['p50']:.1f} ms, p95 {total['p95']:.1f} ms, "
+          f"p99 {total['p99']:.1f} ms; {summary['within_budget']:.2%} within {args.budget_ms:g} ms")
+    print(f'Wrote {path}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Static Background Caching for AdTech Teaching Assistant Diagrams
+Draws the unchanging part of a diagram once and overlays per-instance text
+
+Personalized diagrams (a learner's progress, a conversation recap) share
+their title, boxes, arrows and panels; only a few labels change. The
+renderer draws the figure once with the variable labels left out, keeps the
+Agg pixel buffer, and for each instance restores that buffer and draws only
+the variable labels on top (blitting). The canvas covers only the tight
+bounding box of the full diagram, placed like savefig(bbox_inches='tight')
+places it, and the pixels are PNG-encoded.
+
+Many variable labels take only a handful of values (a concept is either
+ticked or not), so the finished pixels of each (label, text) pair are cached
+and pasted back with NumPy instead of being rasterized again.
+
+Usage:
+    renderer = LayeredRenderer(spec, ['user', 'progress', 'next'], dpi=150)
+    png = renderer.render({'user': 'Current User: Ana', ...})
+"""
+
+import io
+
+from diagram_engine import close_figure, layout_figure, points_per_unit, tight_bbox
+from text_fit import DEFAULT_FONTSIZE, available_width, shrink_to_width
+
+# Extra pixels kept around a label's extent to cover antialiasing
+PATCH_MARGIN = 2
+
+class LayeredRenderer:
+    """Renders variants of one spec that differ only in the text of some labels"""
+
+    def __init__(self, spec, variable_ids, dpi=150, max_cached_patches=4096):
+        import numpy as np
+
+        self._np = np
+        self.dpi = dpi
+        self.max_cached_patches = max_cached_patches
+        self.patches = {}
+        self.fig, artists = layout_figure(spec)
+        canvas = self.fig.canvas
+        if not hasattr(canvas, 'copy_from_bbox'):
+            raise TypeError(f'{type(canvas).__name__} cannot blit; use an Agg canvas (headless mode)')
+
+        self.fig.dpi = dpi
+        self._restore_bbox = self._adjust_bbox(tight_bbox(self.fig, dpi=dpi))
+
+        self.variables = {label_id: artists[label_id] for label_id in variable_ids}
+        self.defaults = {label_id: artist.get_text() for label_id, artist in self.variables.items()}
+        self.fits = self._fitted_labels(spec, variable_ids)
+        for artist in self.variables.values():
+            artist.set_animated(True)  # left out of the static draw
+        canvas.draw()
+        self.background = canvas.copy_from_bbox(self.fig.bbox)
+        # Pasting cached pixels is only exact when no two variable labels overlap
+        self.use_patches = not self._labels_overlap()
+
+    def _adjust_bbox(self, bbox):
+        """Shrinks the canvas to bbox and shifts the figure by its corner, as savefig(bbox_inches='tight') does
+
+        The figure is drawn at the same sub-pixel offset as render_to_bytes,
+        so its pixels match; cropping a full-size draw would round the offset.
+        This is savefig's own helper, private to matplotlib (the supported
+        versions are pinned by tests/test_layered_render.py). Returns the
+        function that undoes the change.
+        """
+        from matplotlib._tight_bbox import adjust_bbox
+
+        return adjust_bbox(self.fig, bbox, self.fig.canvas.get_renderer(), self.fig.dpi)
+
+    def _fitted_labels(self, spec, variable_ids):
+        # Background boxes cannot be re-stacked, so variable labels of fitted
+        # nodes shrink on one line instead: {label id: (width, size, weight, style)}
+        scale = points_per_unit(self.fig.axes[0])
+        fits = {}
+        for node in spec.get('nodes', []):
+            if not (node.get('fit') or node.get('lines')):
+                continue
+            for label in node.get('labels', []) + node.get('lines', []):
+                if label.get('id') in variable_ids:
+                    fits[label['id']] = (available_width(node, label, scale), label.get('fontsize', DEFAULT_FONTSIZE),
+                                         label.get('fontweight', 'normal'), label.get('style', 'normal'))
+        return fits
+
+    def _extent_slices(self, artist):
+        height = self.fig.canvas.get_width_height()[1]
+        extent = artist.get_window_extent(self.fig.canvas.get_renderer())
+        return (slice(max(0, int(height - extent.y1) - PATCH_MARGIN), int(height - extent.y0) + PATCH_MARGIN + 1),
+                slice(max(0, int(extent.x0) - PATCH_MARGIN), int(extent.x1) + PATCH_MARGIN + 1))
+
+    def _labels_overlap(self):
+        boxes = [self._extent_slices(artist) for artist in self.variables.values()]
+        for i, (rows, cols) in enumerate(boxes):
+            for other_rows, other_cols in boxes[i + 1:]:
+                if (rows.start < other_rows.stop and other_rows.start < rows.stop
+                        and cols.start < other_cols.stop and other_cols.start < cols.stop):
+                    return True
+        return False
+
+    def render_rgba(self, texts):
+        """Returns the RGBA pixels of one instance; texts maps label ids to their text
+
+        Labels missing from texts show their text from the spec. The array is
+        a view of the canvas buffer and is overwritten by the next call.
+        """
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        pixels = self._np.asarray(canvas.buffer_rgba())
+        for label_id, artist in self.variables.items():
+            text = texts.get(label_id, self.defaults[label_id])
+            cached = self.patches.get((label_id, text))
+            if cached is not None:
+                region, patch = cached
+                pixels[region] = patch
+                continue
+            if label_id in self.fits:
+                width, size, weight, style = self.fits[label_id]
+                shown, size = shrink_to_width(text, width, size, weight, style)
+                artist.set_text(shown)
+                artist.set_fontsize(size)
+            else:
+                artist.set_text(text)
+            self.fig.draw_artist(artist)
+            if self.use_patches and len(self.patches) < self.max_cached_patches:
+                region = self._extent_slices(artist)
+                self.patches[label_id, text] = (region, pixels[region].copy())
+        return pixels
+
+    def render(self, texts, format='png'):
+        """Returns one instance encoded as an image file"""
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.fromarray(self.render_rgba(texts)).save(buffer, format=format, dpi=(self.dpi, self.dpi))
+        return buffer.getvalue()
+
+    def close(self):
+        self._restore_bbox()
+        close_figure(self.fig)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Bulk Personalized Learning Path Renderer for AdTech Teaching Assistant
+Renders one learning path diagram per student across a worker pool
+
+Records are user progress dicts as described in conversation_flow_diagram.py,
+read from JSONL (one record per line). Rendered images stream back in input
+order; at most a fixed window of records is in flight, so memory stays flat
+however large the cohort is.
+
+PNG output is layered by default: each worker draws the static part of the
+diagram once and only overlays the per-student labels (see layered_render.py).
+--full-redraw renders every record from scratch instead.
+
+Usage:
+    python learning_path_batch.py cohort.jsonl -o out/ --jobs 8
+    python learning_path_batch.py --synthetic 10000 --jobs 8 --dpi 100 -o out/
+"""
+
+import argparse
+import json
+import os
+import re
+import resource
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from conversation_flow_diagram import LEVELS, learning_path_texts, personalize_learning_path
+from diagram_engine import load_spec, render_to_bytes, set_headless, write_image
+
+_base_spec = None
+_layered = None
+
+def _init_worker(format, dpi, layered):
+    global _base_spec, _layered
+    set_headless(True)
+    _base_spec = load_spec('learning-path-diagram')
+    if layered and format == 'png':
+        from layered_render import LayeredRenderer
+
+        variable_ids = learning_path_texts(_base_spec, {'name': '', 'current_level': LEVELS[0], 'next_concept': ''})
+        _layered = LayeredRenderer(_base_spec, list(variable_ids), dpi)
+
+def _render_record(record, format, dpi):
+    if _layered is not None:
+        return _layered.render(learning_path_texts(_base_spec, record))
+    return render_to_bytes(personalize_learning_path(_base_spec, record), format, dpi)
+
+def render_learning_paths(records, jobs=None, format='png', dpi=150, window=None, layered=True):
+    """Yields (record, image bytes) for every record, in input order
+
+    records may be any iterable, including a lazy one; no more than window
+    records (default: 4 per worker) are queued or held at once. layered
+    reuses a pre-drawn static layer for PNG output.
+    """
+    jobs = jobs or os.cpu_count()
+    window = window or jobs * 4
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(format, dpi, layered)) as pool:
+        pending = deque()
+        for record in records:
+            pending.append((record, pool.submit(_render_record, record, format, dpi)))
+            if len(pending) >= window:
+                record, future = pending.popleft()
+                yield record, future.result()
+        while pending:
+            record, future = pending.popleft()
+            yield record, future.result()
+
+def read_records(path):
+    """Lazily reads user progress records from a JSONL file"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def synthetic_records(count):
+    """Generates fake progress records for load testing"""
+    concepts = [label['text'][2:] for node in load_spec('learning-path-diagram')['nodes'][:len(LEVELS)]
+                for label in node['labels'][1:]]
+    for i in range(count):
+        level = i % len(LEVELS)
+        done = concepts[:level * 3 + i % 3]
+        yield {'name': f'Student {i:05d}', 'role': 'Cohort Member', 'current_level': LEVELS[level],
+               'completed': done, 'next_concept': concepts[min(len(done), len(concepts) - 1)]}
+
+def record_filename(index, record, format):
+    slug = re.sub(r'[^a-z0-9]+', '-', record['name'].lower()).strip('-')
+    return f'learning-path-{index:05d}-{slug}.{format}'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render a learning path diagram per student')
+    parser.add_argument('records', nargs='?', help='JSONL file of user progress records')
+    parser.add_argument('--synthetic', type=int, help='render N generated records instead')
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help='directory for the images (default: $DIAGRAM_OUTPUT_DIR or the repository root)')
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('--format', default='png')
+    parser.add_argument('--dpi', type=int, default=150)
+    parser.add_argument('--limit', type=int, help='stop after this many records')
+    parser.add_argument('--full-redraw', action='store_true',
+                        help='draw every diagram from scratch instead of reusing the static layer')
+    args = parser.parse_args(argv)
+    if not args.records and not args.synthetic:
+        parser.error('give a records file or --synthetic N')
+
+    records = synthetic_records(args.synthetic) if args.synthetic else read_records(args.records)
+    if args.limit:
+        records = islice(records, args.limit)
+
+    start = time.perf_counter()
+    count = 0
+    results = render_learning_paths(records, args.jobs, args.format, args.dpi, layered=not args.full_redraw)
+    for count, (record, image) in enumerate(results, 1):
+        write_image(image, args.output_dir, record_filename(count, record, args.format))
+        if count % 500 == 0:
+            print(f'  {count} rendered, {count / (time.perf_counter() - start):.1f}/s')
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'Rendered {count} learning paths in {elapsed:.1f}s '
+          f'({count / elapsed if elapsed else 0:.1f}/s, parent peak RSS {peak_mb:.0f} MB)')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
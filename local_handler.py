@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Local Stand-In Handler for AdTech Teaching Assistant
+Answers like the deployed Lambda, with simulated knowledge base and model latency
+
+Responses have the shape of benchmark_test.json: a statusCode and a
+JSON-encoded body with type, response, user_id and the availability flags of
+the knowledge base, Bedrock and the S3 documents. Nothing talks to AWS; each
+backend is a log-normal sleep whose median and spread are configurable, so
+throughput and tail latency can be measured on one machine, for example with
+the knowledge base switched off.
+
+Events are either {"message": ..., "user_id": ...} or API Gateway style with
+those keys inside a JSON "body".
+
+Usage:
+    from local_handler import HandlerConfig, LocalHandler
+    handler = LocalHandler(HandlerConfig(knowledge_base_available=False))
+    response, stages = await handler.invoke({'message': 'What is RTB?', 'user_id': 'u1'})
+
+    python local_handler.py "What is header bidding?" --no-knowledge-base
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass
+
+GREETING = ("👋 **AdTech Teaching Assistant**\n\nI'm here to help you learn programmatic advertising!\n\n"
+            "**Available Topics:**\n• DSP & SSP Platforms\n• Real-Time Bidding (RTB)\n• Header Bidding\n"
+            "• Programmatic Advertising\n\n"
+            "*Enhanced AI-powered responses available with knowledge base integration.*")
+
+TOPICS = {
+    'rtb': 'Real-Time Bidding (RTB) auctions each impression in about 100ms as the page loads.',
+    'real-time bidding': 'Real-Time Bidding (RTB) auctions each impression in about 100ms as the page loads.',
+    'header bidding': 'Header bidding lets several SSPs bid on an impression before the ad server is called.',
+    'dsp': 'A Demand-Side Platform (DSP) buys impressions for advertisers across many exchanges.',
+    'ssp': 'A Supply-Side Platform (SSP) sells publisher inventory to many buyers at once.',
+    'programmatic': 'Programmatic advertising automates buying and selling ad inventory with software.',
+}
+
+@dataclass
+class HandlerConfig:
+    """Backend availability and simulated latencies (median ms, log-normal sigma)"""
+    knowledge_base_available: bool = True
+    bedrock_available: bool = True
+    s3_documents_available: bool = True
+    intent_ms: float = 8.0
+    knowledge_base_ms: float = 120.0
+    model_ms: float = 450.0
+    fallback_ms: float = 15.0
+    formatting_ms: float = 5.0
+    sigma: float = 0.4
+    error_rate: float = 0.0
+    time_scale: float = 1.0  # multiplies every sleep; < 1 runs simulations faster
+    seed: int = None  # None: a different run every time
+
+class LocalHandler:
+    """Simulated handler; invoke() returns the Lambda response and its stage timings"""
+
+    def __init__(self, config=None):
+        self.config = config or HandlerConfig()
+        self._random = random.Random(self.config.seed)
+
+    async def _stage(self, stages, name, median_ms):
+        # Timings are what the sleep actually took, including event loop delay
+        start = time.perf_counter()
+        delay = median_ms * self._random.lognormvariate(0, self.config.sigma) * self.config.time_scale
+        await asyncio.sleep(delay / 1000)
+        stages[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    async def invoke(self, event):
+        """Handles one event, returns (response dict, {stage: ms})"""
+        config = self.config
+        request = json.loads(event['body']) if isinstance(event.get('body'), str) else event
+        message = request.get('message', '').strip()
+        user_id = request.get('user_id', 'anonymous')
+        stages = {}
+
+        await self._stage(stages, 'intent_recognition', config.intent_ms)
+        if self._random.random() < config.error_rate:
+            return {'statusCode': 500, 'body': json.dumps({'error': 'simulated backend failure'})}, stages
+        topic = next((text for key, text in TOPICS.items() if key in message.lower()), None)
+        if config.knowledge_base_available and topic:
+            await self._stage(stages, 'knowledge_retrieval', config.knowledge_base_ms)
+        if config.bedrock_available:
+            await self._stage(stages, 'content_assembly', config.model_ms)
+            kind = 'enhanced_response'
+        else:
+            await self._stage(stages, 'content_assembly', config.fallback_ms)
+            kind = 'basic_response'
+        await self._stage(stages, 'formatting', config.formatting_ms)
+
+        body = {
+            'type': kind,
+            'response': topic or GREETING,
+            'user_id': user_id,
+            'knowledge_base_available': config.knowledge_base_available,
+            'bedrock_available': config.bedrock_available,
+            's3_documents_available': config.s3_documents_available,
+        }
+        return {'statusCode': 200, 'body': json.dumps(body)}, stages
+
+def lambda_handler(event, context=None, config=None):
+    """Synchronous Lambda-style entry point"""
+    response, _ = asyncio.run(LocalHandler(config).invoke(event))
+    return response
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Answer one message with the local stand-in handler')
+    parser.add_argument('message', nargs='?', default='hello')
+    parser.add_argument('--user-id', default='test_benchmarks')
+    parser.add_argument('--no-knowledge-base', action='store_true')
+    parser.add_argument('--no-bedrock', action='store_true')
+    args = parser.parse_args(argv)
+    config = HandlerConfig(knowledge_base_available=not args.no_knowledge_base,
+                           bedrock_available=not args.no_bedrock)
+    print(json.dumps(lambda_handler({'message': args.message, 'user_id': args.user_id}, config=config)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
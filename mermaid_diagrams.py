@@ -0,0 +1,750 @@
+#!/usr/bin/env python3
+"""
+Mermaid Diagram Renderer for AdTech Teaching Assistant Docs
+Renders the fenced mermaid blocks of the markdown docs through diagram_engine
+
+Every ```mermaid block is pulled out of the docs and numbered in document
+order. The graph/flowchart and gantt subsets are parsed and turned into
+ordinary diagram specs (nodes, labels, edges), so they are drawn by the same
+engine, fonts and colors as the generator PNGs. Graph links become routed
+orthogonal connectors (edge_router) that go around the other boxes.
+Everything runs offline; no browser or mermaid CLI is involved.
+
+Supported:
+    graph/flowchart  TB/TD/BT/LR/RL, node shapes [] () ([]) [[]] (()) {} {{}},
+                     links --> --- -.-> ==> <--> with |labels| or -- text -->,
+                     A & B chains, subgraphs, style, classDef/class, ::: and
+                     the %%{init}%% theme colors
+    gantt            title, sections, tasks as "Name: [crit,] [id,] start, end"
+                     with ms/s units or "after id"
+
+Other diagram types (sequenceDiagram, pie, journey, ...) are listed as skipped.
+
+Blocks are rendered in a process pool. Each block is cached on a hash of its
+own source (plus this module, the engine and the output settings), so editing
+one block re-renders only that block; a block that only moved reuses its
+previous image.
+
+Usage:
+    python mermaid_diagrams.py                         # all docs -> ./mermaid/
+    python mermaid_diagrams.py blog_post.md -o docs/img --jobs 4
+    python mermaid_diagrams.py --list
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from build_cache import BuildCache, cache_key
+from diagram_engine import default_output_dir, render_spec, set_headless, validate_spec
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_DOCS = ['architecture_diagrams.md', 'blog_post.md', 'visual_summary.md', 'enhanced-blog-with-diagrams.md']
+
+# Files every rendered block depends on besides its own source
+RENDERER_FILES = [os.path.join(ROOT_DIR, name)
+                  for name in ('mermaid_diagrams.py', 'diagram_engine.py', 'text_fit.py', 'edge_router.py')]
+
+FENCE = re.compile(r'^```mermaid[ \t]*\n(.*?)^```', re.MULTILINE | re.DOTALL)
+
+# Mermaid's default theme, overridden by %%{init}%% themeVariables
+DEFAULT_THEME = {
+    'primaryColor': '#ECECFF',
+    'primaryTextColor': '#333333',
+    'primaryBorderColor': '#9370DB',
+    'lineColor': '#333333',
+    'sectionBkgColor': '#F4F4F4',
+    'altSectionBkgColor': '#FFFFFF',
+    'gridColor': '#D0D0D0',
+    'taskColor': '#8A90DD',
+    'critColor': '#FF5722',
+}
+
+# Sizes in inches (spec units are inches, so text keeps its point size)
+FONT_SIZE = 9
+CHAR_WIDTH = 0.072
+LINE_HEIGHT = 0.17
+NODE_MIN_WIDTH = 1.0
+NODE_GAP = 0.45
+RANK_GAP = 0.8
+MARGIN = 0.4
+SUBGRAPH_PAD = 0.2
+SUBGRAPH_TITLE = 0.3
+BOX_PAD = 0.05  # FancyBboxPatch pad, drawn outside the spec box
+
+# Node shape delimiters -> boxstyle
+SHAPES = [
+    ('((', '))', 'circle,pad=0.05'),
+    ('([', '])', 'round,pad=0.05,rounding_size=0.2'),
+    ('[[', ']]', 'square,pad=0.05'),
+    ('[(', ')]', 'round,pad=0.05,rounding_size=0.1'),
+    ('{{', '}}', 'round4,pad=0.05'),
+    ('[', ']', 'round,pad=0.05,rounding_size=0.04'),
+    ('(', ')', 'round,pad=0.05,rounding_size=0.15'),
+    ('{', '}', 'round4,pad=0.05'),
+    ('>', ']', 'square,pad=0.05'),
+]
+
+NODE_ID = re.compile(r'\s*([A-Za-z0-9_][\w.-]*?)(?=[\s\[\(\{>&:;]|-->|---|-\.|==|--|$)')
+LINK = re.compile(r'\s*(<?)(-\.+->|-\.+-|={2,}>|={3,}|-{2,}>|-{3,}|--o|--x)\s*(?:\|([^|]*)\|)?')
+TEXT_LINK = re.compile(r'\s*(--|-\.|==)\s+([^|>-][^>]*?)\s+(-->|\.->|==>|---)')
+
+class MermaidError(ValueError):
+    """Raised when a mermaid block cannot be parsed"""
+
+# Extraction
+
+def extract_blocks(path):
+    """Returns [(index, line number, source)] for every mermaid block of a markdown file"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return [(index, text.count('\n', 0, match.start()) + 1, match.group(1))
+            for index, match in enumerate(FENCE.finditer(text), 1)]
+
+def _statements(source):
+    """Yields (directive theme, statements) without comments and blank lines"""
+    theme = dict(DEFAULT_THEME)
+    statements = []
+    for line in source.splitlines():
+        line = line.strip()
+        if line.startswith('%%{'):
+            theme.update(_init_theme(line))
+            continue
+        if not line or line.startswith('%%'):
+            continue
+        statements.extend(part.strip() for part in line.rstrip(';').split(';') if part.strip())
+    return theme, statements
+
+def _init_theme(line):
+    match = re.search(r'%%\{\s*init\s*:\s*(.*)\}%%', line)
+    if not match:
+        return {}
+    try:
+        config = json.loads(match.group(1).replace("'", '"'))
+    except ValueError:
+        return {}
+    return config.get('themeVariables', {})
+
+def diagram_type(source):
+    """Returns the first keyword of a block (graph, flowchart, gantt, pie, ...)"""
+    _, statements = _statements(source)
+    return statements[0].split()[0] if statements else ''
+
+def _label(text):
+    text = text.strip().strip('"').strip()
+    text = re.sub(r'<br\s*/?>', '\n', text)
+    text = re.sub(r'<[^>]+>', '', text)  # bold/italic markup
+    return text.replace('$', r'\$')
+
+def _style(props):
+    style = {}
+    for prop in props.split(','):
+        key, _, value = prop.partition(':')
+        key, value = key.strip(), value.strip()
+        if key == 'fill':
+            style['facecolor'] = value
+        elif key == 'stroke':
+            style['edgecolor'] = value
+        elif key == 'color':
+            style['textcolor'] = value
+        elif key == 'stroke-width':
+            style['linewidth'] = float(re.sub(r'[a-z]+$', '', value) or 1)
+    return style
+
+# Flowcharts
+
+class Flowchart:
+    """Parsed graph/flowchart block"""
+
+    def __init__(self, source):
+        self.theme, statements = _statements(source)
+        header = statements[0].split()
+        if header[0] not in ('graph', 'flowchart'):
+            raise MermaidError(f'not a flowchart: {header[0]}')
+        self.direction = header[1].upper() if len(header) > 1 else 'TB'
+        if self.direction == 'TD':
+            self.direction = 'TB'
+        self.nodes = {}  # id -> {'text', 'boxstyle', 'subgraph'}
+        self.edges = []  # (source, target, label, link)
+        self.subgraphs = []  # {'id', 'title', 'parent'}
+        self.styles = defaultdict(dict)
+        self.classes = {}
+        self._stack = []
+        for statement in statements[1:]:
+            self._parse_statement(statement)
+
+    def _parse_statement(self, statement):
+        keyword = statement.split()[0]
+        if keyword == 'subgraph':
+            rest = statement[len('subgraph'):].strip()
+            match = re.match(r'([\w-]+)\s*\[(.*)\]$', rest)
+            subgraph_id, title = (match.group(1), match.group(2)) if match else (rest, rest)
+            self.subgraphs.append({'id': subgraph_id, 'title': _label(title),
+                                   'parent': self._stack[-1] if self._stack else None})
+            self._stack.append(len(self.subgraphs) - 1)
+        elif keyword == 'end':
+            if self._stack:
+                self._stack.pop()
+        elif keyword == 'style':
+            _, node_id, props = statement.split(None, 2)
+            self.styles[node_id].update(_style(props))
+        elif keyword == 'classDef':
+            _, names, props = statement.split(None, 2)
+            for name in names.split(','):
+                self.classes[name] = _style(props)
+        elif keyword == 'class':
+            _, node_ids, name = statement.split(None, 2)
+            for node_id in node_ids.split(','):
+                self.styles[node_id.strip()].update(self.classes.get(name.strip(), {}))
+        elif keyword in ('direction', 'linkStyle', 'click'):
+            return
+        else:
+            self._parse_chain(statement)
+
+    def _parse_node(self, text, position):
+        """Parses one node reference at position, returns (id, position after it)"""
+        match = NODE_ID.match(text, position)
+        if not match:
+            raise MermaidError(f'expected a node at {text[position:]!r}')
+        node_id, position = match.group(1), match.end()
+        shape = None
+        for opening, closing, boxstyle in SHAPES:
+            if text.startswith(opening, position):
+                end = text.find(closing, position + len(opening))
+                if end < 0:
+                    raise MermaidError(f'unclosed {opening!r} in {text!r}')
+                shape = (text[position + len(opening):end], boxstyle)
+                position = end + len(closing)
+                break
+        class_match = re.match(r':::([\w-]+)', text[position:])
+        if class_match:
+            self.styles[node_id].update(self.classes.get(class_match.group(1), {}))
+            position += class_match.end()
+        node = self.nodes.setdefault(node_id, {'text': node_id, 'boxstyle': SHAPES[5][2],
+                                               'subgraph': self._stack[-1] if self._stack else None})
+        if shape:
+            node['text'], node['boxstyle'] = _label(shape[0]), shape[1]
+        return node_id, position
+
+    def _parse_group(self, text, position):
+        """Parses 'A & B & C', returns (ids, position)"""
+        ids = []
+        while True:
+            node_id, position = self._parse_node(text, position)
+            ids.append(node_id)
+            ampersand = re.match(r'\s*&', text[position:])
+            if not ampersand:
+                return ids, position
+            position += ampersand.end()
+
+    def _parse_chain(self, statement):
+        sources, position = self._parse_group(statement, 0)
+        while position < len(statement.rstrip()):
+            text_link = TEXT_LINK.match(statement, position)
+            link = LINK.match(statement, position)
+            if text_link:
+                label, arrow, position = text_link.group(2), text_link.group(1) + text_link.group(3), text_link.end()
+            elif link:
+                label, arrow, position = link.group(3), link.group(1) + link.group(2), link.end()
+            else:
+                raise MermaidError(f'cannot parse link in {statement!r}')
+            targets, position = self._parse_group(statement, position)
+            for source in sources:
+                for target in targets:
+                    self.edges.append((source, target, _label(label) if label else '', arrow))
+            sources = targets
+
+    # Layout
+
+    def _subgraph_path_of(self, index):
+        """Subgraph index and its ancestors, innermost first"""
+        path = []
+        while index is not None:
+            path.append(index)
+            index = self.subgraphs[index]['parent']
+        return path
+
+    def _ranks(self):
+        """Longest-path layering over the graph with back edges ignored"""
+        successors = defaultdict(list)
+        for source, target, _, _ in self.edges:
+            successors[source].append(target)
+        state, order, back = {}, [], set()
+
+        def visit(node_id):
+            state[node_id] = 'open'
+            for target in successors[node_id]:
+                if state.get(target) == 'open':
+                    back.add((node_id, target))
+                elif target not in state:
+                    visit(target)
+            state[node_id] = 'done'
+            order.append(node_id)
+
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * len(self.nodes) + 100))
+        for node_id in self.nodes:
+            if node_id not in state:
+                visit(node_id)
+        rank = dict.fromkeys(self.nodes, 0)
+        for node_id in reversed(order):  # topological order
+            for target in successors[node_id]:
+                if (node_id, target) not in back:
+                    rank[target] = max(rank[target], rank[node_id] + 1)
+        return rank, back
+
+    def _subgraph_path(self, node_id):
+        """Subgraph indexes enclosing a node, outermost first"""
+        return self._subgraph_path_of(self.nodes[node_id]['subgraph'])[::-1]
+
+    def _order(self, rank):
+        """Orders nodes within ranks: barycenter sweeps, nodes kept together by subgraph"""
+        layers = defaultdict(list)
+        for node_id in self.nodes:
+            layers[rank[node_id]].append(node_id)
+        neighbours = defaultdict(list)
+        for source, target, _, _ in self.edges:
+            neighbours[target].append(source)
+            neighbours[source].append(target)
+        position = {node_id: i for layer in layers.values() for i, node_id in enumerate(layer)}
+        for _ in range(4):
+            for r in sorted(layers):
+                def barycenter(node_id):
+                    others = [position[n] for n in neighbours[node_id] if rank[n] != r]
+                    return sum(others) / len(others) if others else position[node_id]
+                centers = {node_id: barycenter(node_id) for node_id in layers[r]}
+                groups = defaultdict(list)
+                for node_id in layers[r]:
+                    groups[tuple(self._subgraph_path(node_id))].append(centers[node_id])
+                group_center = {group: sum(values) / len(values) for group, values in groups.items()}
+                layers[r].sort(key=lambda n: (group_center[tuple(self._subgraph_path(n))], centers[n]))
+                position.update({node_id: i for i, node_id in enumerate(layers[r])})
+        return [layers[r] for r in sorted(layers)]
+
+    def _spans(self, rank):
+        """{subgraph index: (first rank, last rank)} over the nodes inside it, nested ones included"""
+        spans = {}
+        for node_id in self.nodes:
+            for index in self._subgraph_path(node_id):
+                first, last = spans.get(index, (rank[node_id], rank[node_id]))
+                spans[index] = (min(first, rank[node_id]), max(last, rank[node_id]))
+        return spans
+
+    def _columns(self, group, rank, layers, sizes, horizontal):
+        """Cross-axis centers of the nodes in a subgraph (None: the whole chart), and their (low, high) extent
+
+        Child subgraphs whose rank spans overlap get contiguous, disjoint
+        columns side by side, so their frames cannot intersect; children on
+        separate ranks stack and may share columns. The group's own nodes
+        are centered on their rank, or set beside the columns of children
+        occupying that rank.
+        """
+        spans = self._spans(rank)
+        extent = 1 if horizontal else 0
+        # Relative place of each node in its rank after the barycenter ordering, 0..1
+        place = {node_id: (i + 0.5) / len(layer) for layer in layers for i, node_id in enumerate(layer)}
+
+        def key(index):
+            members = [n for n in self.nodes if index in self._subgraph_path(n)]
+            return sum(place[n] for n in members) / len(members)
+
+        # Frame sides across the ranks; the title is across them in LR/RL charts
+        pads = (SUBGRAPH_PAD + SUBGRAPH_TITLE, SUBGRAPH_PAD) if horizontal else (SUBGRAPH_PAD, SUBGRAPH_PAD)
+        children = sorted((i for i in spans if self.subgraphs[i]['parent'] == group), key=lambda i: spans[i])
+        components = []  # [first rank, last rank, [child indexes]]
+        for index in children:
+            first, last = spans[index]
+            if components and first <= components[-1][1]:
+                components[-1][1] = max(components[-1][1], last)
+                components[-1][2].append(index)
+            else:
+                components.append([first, last, [index]])
+
+        across, low, high = {}, 0.0, 0.0
+        blocks = {}  # rank -> (half width, mean place) of the child columns occupying it
+        for first, last, indexes in components:
+            laid_out = {index: self._columns(index, rank, layers, sizes, horizontal) for index in indexes}
+            widths = {}
+            for index, (_, (child_low, child_high)) in laid_out.items():
+                widths[index] = child_high - child_low + sum(pads)
+                if not horizontal:  # wide enough for the title
+                    title = len(self.subgraphs[index]['title']) * CHAR_WIDTH + 2 * SUBGRAPH_PAD
+                    widths[index] = max(widths[index], title)
+            indexes.sort(key=key)
+            total = sum(widths.values()) + NODE_GAP * (len(indexes) - 1)
+            left = -total / 2
+            for index in indexes:
+                child_across, (child_low, child_high) = laid_out[index]
+                # Center the child's content in its column
+                shift = left + pads[0] + (widths[index] - sum(pads) - (child_high - child_low)) / 2 - child_low
+                across.update({node_id: value + shift for node_id, value in child_across.items()})
+                left += widths[index] + NODE_GAP
+            low, high = min(low, -total / 2), max(high, total / 2)
+            mean = sum(key(index) for index in indexes) / len(indexes)
+            for r in range(first, last + 1):
+                blocks[r] = (total / 2, mean)
+        for r, layer in enumerate(layers):
+            own = [n for n in layer if self.nodes[n]['subgraph'] == group]
+            if not own:
+                continue
+            if r not in blocks:
+                cross = -(sum(sizes[n][extent] for n in own) + NODE_GAP * (len(own) - 1)) / 2
+                row = [(own, cross, 1)]
+            else:
+                half, mean = blocks[r]
+                row = [([n for n in own if place[n] < mean][::-1], -half - NODE_GAP, -1),
+                       ([n for n in own if place[n] >= mean], half + NODE_GAP, 1)]
+            for nodes, cross, step in row:
+                for node_id in nodes:
+                    size = sizes[node_id][extent]
+                    across[node_id] = cross + step * size / 2
+                    cross += step * (size + NODE_GAP)
+                    low, high = min(low, across[node_id] - size / 2), max(high, across[node_id] + size / 2)
+        return across, (low, high)
+
+    def to_spec(self, name):
+        """Lays the flowchart out as a diagram spec"""
+        sizes = {}
+        for node_id, node in self.nodes.items():
+            lines = node['text'].split('\n')
+            width = max(NODE_MIN_WIDTH, max(len(line) for line in lines) * CHAR_WIDTH + 0.3)
+            sizes[node_id] = (width, 0.3 + LINE_HEIGHT * len(lines))
+        horizontal = self.direction in ('LR', 'RL')
+        rank, _ = self._ranks()
+        layers = self._order(rank)
+
+        # Main axis advances per rank, cross axis spreads a rank's nodes
+        crosses = self._columns(None, rank, layers, sizes, horizontal)[0]
+        spans = self._spans(rank)
+        # Frame sides (title included) before and after the nodes, on each axis
+        main_pads = (SUBGRAPH_PAD, SUBGRAPH_PAD)
+        if not horizontal:
+            titled = (SUBGRAPH_PAD + SUBGRAPH_TITLE, SUBGRAPH_PAD)
+            main_pads = titled if self.direction == 'TB' else titled[::-1]
+        centers = {}
+        main = 0.0
+        for r, layer in enumerate(layers):
+            depth = max(sizes[n][0 if horizontal else 1] for n in layer)
+            for node_id in layer:
+                centers[node_id] = (main + depth / 2, crosses[node_id])
+            if r + 1 < len(layers):
+                # Leave room for the frames that close after this rank and open before the next
+                closing = max(sum(spans[i][1] == r for i in self._subgraph_path(n)) for n in layer)
+                opening = max(sum(spans[i][0] == r + 1 for i in self._subgraph_path(n)) for n in layers[r + 1])
+                main += depth + max(RANK_GAP, closing * main_pads[1] + opening * main_pads[0] + 2 * SUBGRAPH_PAD)
+        boxes = {}
+        for node_id, (along, across) in centers.items():
+            if self.direction == 'BT':
+                along = -along
+            x, y = (along, -across) if horizontal else (across, -along)
+            if self.direction == 'RL':
+                x = -x
+            width, height = sizes[node_id]
+            boxes[node_id] = [x - width / 2, y - height / 2, width, height]
+
+        # Subgraph frames, innermost first so parents can wrap their children
+        frames = {}
+        for index in sorted(range(len(self.subgraphs)), key=lambda i: -len(self._subgraph_path_of(i))):
+            members = [boxes[n] for n in self.nodes if index in self._subgraph_path(n)]
+            members += [frames[i] for i in frames if self.subgraphs[i]['parent'] == index]
+            if not members:
+                continue
+            x0 = min(box[0] for box in members) - SUBGRAPH_PAD
+            y0 = min(box[1] for box in members) - SUBGRAPH_PAD
+            x1 = max(box[0] + box[2] for box in members) + SUBGRAPH_PAD
+            y1 = max(box[1] + box[3] for box in members) + SUBGRAPH_PAD + SUBGRAPH_TITLE
+            frames[index] = [x0, y0, x1 - x0, y1 - y0]
+
+        everything = list(boxes.values()) + list(frames.values())
+        x_min = min(box[0] for box in everything) - MARGIN
+        y_min = min(box[1] for box in everything) - MARGIN
+        width = max(box[0] + box[2] for box in everything) + MARGIN - x_min
+        height = max(box[1] + box[3] for box in everything) + MARGIN - y_min
+
+        def place(box):
+            return [round(box[0] - x_min, 3), round(box[1] - y_min, 3), round(box[2], 3), round(box[3], 3)]
+
+        theme = self.theme
+        spec = {
+            'name': name,
+            'output': name + '.png',
+            'figure': {'size': [round(width, 3), round(height, 3)]},
+            'colors': {},
+            'texts': [],
+            'nodes': [],
+            'edges': [],
+        }
+        for index in sorted(frames, key=lambda i: len(self._subgraph_path_of(i))):
+            x, y, w, h = place(frames[index])
+            spec['nodes'].append({
+                'id': f'subgraph_{index}', 'box': [x, y, w, h], 'boxstyle': 'round,pad=0.02,rounding_size=0.08',
+                'facecolor': '#F7F7F7' if len(self._subgraph_path_of(index)) % 2 else '#EEEEEE',
+                'edgecolor': '#AAAAAA', 'linewidth': 1,
+                'labels': [{'x': round(x + w / 2, 3), 'y': round(y + h - SUBGRAPH_TITLE / 2 - 0.04, 3),
+                            'text': self.subgraphs[index]['title'], 'fontsize': FONT_SIZE,
+                            'fontweight': 'bold', 'va': 'center', 'color': '#555555'}],
+            })
+        for node_id, node in self.nodes.items():
+            x, y, w, h = place(boxes[node_id])
+            style = self.styles.get(node_id, {})
+            spec['nodes'].append({
+                'id': f'node_{node_id}',
+                'box': [x + BOX_PAD, y + BOX_PAD, w - 2 * BOX_PAD, h - 2 * BOX_PAD],
+                'boxstyle': node['boxstyle'],
+                'facecolor': style.get('facecolor', theme['primaryColor']),
+                'edgecolor': style.get('edgecolor', theme['primaryBorderColor']),
+                'linewidth': style.get('linewidth', 1.2),
+                'textcolor': style.get('textcolor', theme['primaryTextColor']),
+                'labels': [{'x': round(x + w / 2, 3), 'y': round(y + h / 2, 3), 'text': node['text'],
+                            'fontsize': FONT_SIZE, 'va': 'center'}],
+            })
+        for source, target, label, arrow in self.edges:
+            style = self._edge_style(arrow)
+            text = {'text': label, 'fontsize': FONT_SIZE - 2, 'style': 'italic', 'color': '#555555'}
+            if source == target:
+                # A self-loop: a fixed curve from the right side over the top right corner
+                x, y, w, h = place(boxes[source])
+                spec['edges'].append({'kind': 'curve', 'from': [round(x + w, 3), round(y + h * 0.75, 3)],
+                                      'to': [round(x + w * 0.75, 3), round(y + h, 3)], 'rad': 1.5, **style})
+                if label:
+                    spec['texts'].append({'x': round(x + w + 0.1, 3), 'y': round(y + h + 0.1, 3), 'ha': 'left',
+                                          'va': 'center', **text})
+                continue
+            edge = {'kind': 'route', 'source': f'node_{source}', 'target': f'node_{target}', **style}
+            if label:
+                edge['label'] = text
+            spec['edges'].append(edge)
+        return spec
+
+    def _edge_style(self, arrow):
+        """Color, width, dashes and heads of an edge drawn with the given mermaid link"""
+        style = {'color': self.theme['lineColor'], 'linewidth': 1.2, 'arrowstyle': '->'}
+        if '.' in arrow:
+            style['linestyle'] = 'dashed'
+        if '=' in arrow:
+            style['linewidth'] = 2.4
+        if not arrow.rstrip('ox').endswith('>'):
+            style['arrowstyle'] = '-'
+        elif arrow.startswith('<'):
+            style['arrowstyle'] = '<->'
+        return style
+
+# Gantt charts
+
+UNITS = {'ms': 1, 's': 1000, 'm': 60000, 'h': 3600000}
+
+def _duration(value):
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*(ms|s|m|h)?', value.strip())
+    if not match:
+        raise MermaidError(f'unsupported gantt time {value!r} (use numbers with ms/s/m/h)')
+    return float(match.group(1)) * UNITS[match.group(2) or 'ms']
+
+class Gantt:
+    """Parsed gantt block; task times are start, end in ms"""
+
+    def __init__(self, source):
+        self.theme, statements = _statements(source)
+        if statements[0].split()[0] != 'gantt':
+            raise MermaidError(f'not a gantt chart: {statements[0]}')
+        self.title = ''
+        self.sections = []  # (name, [(task, start, end, critical)])
+        ends = {}
+        for statement in statements[1:]:
+            keyword = statement.split()[0]
+            if keyword == 'title':
+                self.title = _label(statement[len('title'):])
+            elif keyword == 'section':
+                self.sections.append((_label(statement[len('section'):]), []))
+            elif keyword in ('dateFormat', 'axisFormat', 'excludes', 'todayMarker', 'tickInterval'):
+                continue
+            else:
+                name, _, spec = statement.partition(':')
+                if not spec:
+                    raise MermaidError(f'cannot parse gantt task {statement!r}')
+                parts = [part.strip() for part in spec.split(',')]
+                tags = [part for part in parts if part in ('crit', 'done', 'active', 'milestone')]
+                parts = [part for part in parts if part not in tags]
+                task_id = parts.pop(0) if len(parts) == 3 else None
+                start = ends[parts[0][len('after '):].strip()] if parts[0].startswith('after ') else _duration(parts[0])
+                end = _duration(parts[1]) if len(parts) > 1 else start
+                if not self.sections:
+                    self.sections.append(('', []))
+                self.sections[-1][1].append((_label(name), start, end, 'crit' in tags))
+                if task_id:
+                    ends[task_id] = end
+
+    def to_spec(self, name):
+        tasks = [task for _, section in self.sections for task in section]
+        if not tasks:
+            raise MermaidError('gantt chart has no tasks')
+        start = min(task[1] for task in tasks)
+        span = max(task[2] for task in tasks) - start or 1
+        label_width = max(len(task[0]) for task in tasks) * CHAR_WIDTH + 0.3
+        section_width = max((len(section) for section, _ in self.sections), default=0) * CHAR_WIDTH + 0.3
+        chart_x, chart_width, row = MARGIN + section_width + label_width, 8.0, 0.35
+        height = 2 * MARGIN + 0.5 + 0.4 + row * len(tasks)
+        width = chart_x + chart_width + MARGIN
+        top = height - MARGIN - 0.5
+
+        def x_of(ms):
+            return round(chart_x + (ms - start) / span * chart_width, 3)
+
+        theme = self.theme
+        spec = {'name': name, 'output': name + '.png', 'figure': {'size': [round(width, 3), round(height, 3)]},
+                'colors': {}, 'texts': [], 'nodes': [], 'edges': []}
+        if self.title:
+            spec['texts'].append({'x': round(width / 2, 3), 'y': round(height - MARGIN - 0.15, 3),
+                                  'text': self.title, 'fontsize': FONT_SIZE + 3, 'fontweight': 'bold',
+                                  'va': 'center'})
+        y = top
+        for index, (section, section_tasks) in enumerate(self.sections):
+            band = row * len(section_tasks)
+            spec['nodes'].append({
+                'id': f'section_{index}', 'box': [MARGIN, round(y - band, 3), round(width - 2 * MARGIN, 3), band],
+                'boxstyle': 'square,pad=0', 'linewidth': 0, 'edgecolor': 'none',
+                'facecolor': theme['sectionBkgColor'] if index % 2 == 0 else theme['altSectionBkgColor'],
+                'labels': [{'x': MARGIN + 0.1, 'y': round(y - band / 2, 3), 'text': section, 'ha': 'left',
+                            'va': 'center', 'fontsize': FONT_SIZE, 'fontweight': 'bold', 'color': '#333333'}],
+            })
+            for task, task_start, task_end, critical in section_tasks:
+                center = round(y - row / 2, 3)
+                spec['texts'].append({'x': round(chart_x - 0.1, 3), 'y': center, 'text': task, 'ha': 'right',
+                                      'va': 'center', 'fontsize': FONT_SIZE})
+                x0 = x_of(task_start)
+                spec['nodes'].append({
+                    'id': f'task_{len(spec["nodes"])}',
+                    'box': [x0, round(y - row + 0.07, 3), max(0.02, round(x_of(task_end) - x0, 3)), row - 0.14],
+                    'boxstyle': 'round,pad=0,rounding_size=0.04', 'linewidth': 1,
+                    'facecolor': theme['critColor'] if critical else theme['taskColor'],
+                    'edgecolor': theme.get('primaryBorderColor', '#534FBC'),
+                })
+                y -= row
+        for tick in _ticks(start, start + span):
+            x = x_of(tick)
+            spec['edges'].append({'kind': 'curve', 'from': [x, round(y, 3)], 'to': [x, round(top, 3)],
+                                  'arrowstyle': '-', 'linewidth': 0.6, 'color': theme['gridColor']})
+            spec['texts'].append({'x': x, 'y': round(y - 0.2, 3), 'text': _format_ms(tick), 'fontsize': FONT_SIZE - 1,
+                                  'va': 'center'})
+        return spec
+
+def _ticks(low, high, count=6):
+    step = (high - low) / count
+    magnitude = 10 ** len(str(int(step))) / 10 if step >= 1 else 1
+    step = min((m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= step), default=step)
+    first = -(-low // step) * step
+    return [first + i * step for i in range(int((high - first) / step) + 1)]
+
+def _format_ms(ms):
+    return f'{ms / 1000:g}s' if ms >= 1000 and ms % 100 == 0 else f'{ms:g}ms'
+
+# Rendering
+
+PARSERS = {'graph': Flowchart, 'flowchart': Flowchart, 'gantt': Gantt}
+
+def block_spec(source, name):
+    """Parses a mermaid block into a validated diagram spec"""
+    kind = diagram_type(source)
+    if kind not in PARSERS:
+        raise MermaidError(f'unsupported mermaid diagram type {kind!r}')
+    return validate_spec(PARSERS[kind](source).to_spec(name), source=name)
+
+def block_name(doc, index):
+    return f'{os.path.splitext(os.path.basename(doc))[0]}-mermaid-{index:02d}'
+
+def collect_blocks(docs):
+    """Returns [(doc, index, line, name, source)] for the renderable blocks, and the skipped ones"""
+    renderable, skipped = [], []
+    for doc in docs:
+        for index, line, source in extract_blocks(doc):
+            entry = (doc, index, line, block_name(doc, index), source)
+            (renderable if diagram_type(source) in PARSERS else skipped).append(entry)
+    return renderable, skipped
+
+def _init_worker():
+    set_headless(True)
+
+def _render_block(name, source, output_dir, format, dpi):
+    start = time.perf_counter()
+    path = render_spec(block_spec(source, name), output_dir, format, dpi)
+    return name, path, time.perf_counter() - start
+
+def render_blocks(blocks, output_dir, jobs=None, format='png', dpi=200, use_cache=True):
+    """Renders blocks in parallel, returns {name: path} of the blocks that were drawn
+
+    Blocks whose key is in the cache manifest are skipped; a block whose key
+    was recorded under another name (it moved in its document) is copied
+    from that image instead of being drawn again.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache = BuildCache(output_dir)
+    settings = {'format': format, 'dpi': dpi}
+    keys = {name: cache_key(source, settings, dependencies=RENDERER_FILES) for _, _, _, name, source in blocks}
+    if use_cache:
+        blocks = [block for block in blocks if not cache.is_fresh(block[3], keys[block[3]])]
+        intact = cache.intact_outputs()
+        moved = {}
+        for block in blocks:
+            paths = intact.get(keys[block[3]], [])
+            if len(paths) == 1 and keys[block[3]] not in moved:
+                with open(paths[0], 'rb') as f:
+                    moved[keys[block[3]]] = f.read()
+        reused = [block for block in blocks if keys[block[3]] in moved]
+        for _, _, _, name, _ in reused:
+            path = os.path.join(output_dir, f'{name}.{format}')
+            with open(path, 'wb') as f:
+                f.write(moved[keys[name]])
+            cache.record(name, keys[name], [path])
+            print(f'  {name:<44}  reused')
+        blocks = [block for block in blocks if block not in reused]
+
+    results = {}
+    if blocks:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+            futures = [pool.submit(_render_block, name, source, output_dir, format, dpi)
+                       for _, _, _, name, source in blocks]
+            for future in as_completed(futures):
+                name, path, elapsed = future.result()
+                results[name] = path
+                cache.record(name, keys[name], [path])
+                print(f'  {name:<44} {elapsed:6.2f}s  {path}')
+    cache.save()
+    if use_cache:
+        cache.report()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the mermaid blocks of the markdown docs')
+    parser.add_argument('docs', nargs='*', default=[os.path.join(ROOT_DIR, doc) for doc in DEFAULT_DOCS])
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help='directory for the images (default: mermaid/ under $DIAGRAM_OUTPUT_DIR '
+                             'or the repository root)')
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('--format', default='png')
+    parser.add_argument('--dpi', type=int, default=200)
+    parser.add_argument('--force', action='store_true', help='re-render blocks with fresh cache entries')
+    parser.add_argument('--list', action='store_true', help='list the blocks and exit')
+    args = parser.parse_args(argv)
+
+    renderable, skipped = collect_blocks(args.docs)
+    if args.list:
+        for doc, index, line, name, source in renderable + skipped:
+            status = 'render' if diagram_type(source) in PARSERS else 'skip'
+            print(f'{os.path.basename(doc)}:{line}  #{index:<3} {diagram_type(source):<16} {status:<6} {name}')
+        return 0
+    for doc, _, line, _, source in skipped:
+        print(f'  skipping {os.path.basename(doc)}:{line} ({diagram_type(source)} is not supported)')
+
+    output_dir = args.output_dir or os.path.join(default_output_dir(), 'mermaid')
+    print(f'Rendering {len(renderable)} mermaid blocks from {len(args.docs)} docs...')
+    start = time.perf_counter()
+    results = render_blocks(renderable, output_dir, args.jobs, args.format, args.dpi, use_cache=not args.force)
+    print(f'Rendered {len(results)} blocks in {time.perf_counter() - start:.2f}s')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
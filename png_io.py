@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Streaming PNG Writer for AdTech Teaching Assistant Diagrams
+Encodes images band by band, so no full-size pixel buffer is ever needed
+
+PNG stores scanlines top to bottom, each prefixed with a filter byte, in
+zlib-compressed IDAT chunks. PNGWriter takes rows in bands of any height as
+uint8 NumPy arrays, filters them, feeds them to one zlib stream and writes
+an IDAT chunk whenever IDAT_BYTES of compressed data have accumulated.
+Memory is one band plus the previous row.
+
+The filter is one of PNG's five per-row predictors, applied to a whole band
+at once, or 'adaptive': every row gets the predictor whose output has the
+smallest sum of absolute (signed) bytes, the heuristic libpng uses. The
+default "Up" filter (each row minus the one above it) turns the flat fills
+of diagrams into zeros. Palette images take (rows, width) indices and a
+(colors, 3|4) palette; a fourth palette column becomes a tRNS chunk. No
+text or time chunks are written, only pHYs when a dpi is given.
+
+Usage:
+    from png_io import PNGWriter, write_png
+    with PNGWriter('poster.png', width, height) as writer:
+        for band in bands:             # (rows, width, 3) uint8
+            writer.write_rows(band)
+    write_png('small.png', pixels)     # whole (height, width, 3|4) array
+    write_png('small.png', indices, palette=palette, filter=FILTER_NONE, level=9)
+"""
+
+import struct
+import zlib
+
+SIGNATURE = b'\x89PNG\r\n\x1a\n'
+COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}  # channels -> gray, gray+alpha, RGB, RGBA
+IDAT_BYTES = 256 * 1024
+FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH = range(5)
+ADAPTIVE = 'adaptive'
+BAND_ROWS = 256  # rows write_png filters at once
+PALETTE_TYPE = 3
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+def _predict(kind, rows, above, bpp):
+    """The filtered bytes of rows for one filter type; above holds each row's upper neighbour"""
+    import numpy as np
+
+    if kind == FILTER_NONE:
+        return rows
+    left = np.zeros_like(rows)
+    left[:, bpp:] = rows[:, :-bpp]
+    if kind == FILTER_SUB:
+        return rows - left  # uint8 arithmetic wraps modulo 256, as the filters require
+    if kind == FILTER_UP:
+        return rows - above
+    if kind == FILTER_AVERAGE:
+        return rows - ((left.astype(np.uint16) + above) >> 1).astype(np.uint8)
+    upper_left = np.zeros_like(rows)
+    upper_left[:, bpp:] = above[:, :-bpp]
+    a, b, c = (v.astype(np.int16) for v in (left, above, upper_left))
+    estimate = a + b - c
+    pa, pb, pc = np.abs(estimate - a), np.abs(estimate - b), np.abs(estimate - c)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, above, upper_left))
+    return rows - paeth
+
+def _filter_rows(rows, above, bpp, filter):
+    """Returns the (rows, stride + 1) filtered scanlines, filter byte first"""
+    import numpy as np
+
+    filtered = np.empty((len(rows), rows.shape[1] + 1), dtype=np.uint8)
+    if filter != ADAPTIVE:
+        filtered[:, 0] = filter
+        filtered[:, 1:] = _predict(filter, rows, above, bpp)
+        return filtered
+    candidates = np.stack([_predict(kind, rows, above, bpp) for kind in range(5)])
+    signed = candidates.view(np.int8).astype(np.int16)
+    choice = np.abs(signed).sum(axis=2, dtype=np.int64).argmin(axis=0)
+    filtered[:, 0] = choice
+    filtered[:, 1:] = candidates[choice, np.arange(len(rows))]
+    return filtered
+
+class PNGWriter:
+    """Writes a PNG of known size from bands of rows, top to bottom"""
+
+    def __init__(self, file, width, height, channels=3, level=6, palette=None, filter=FILTER_UP,
+                 strategy=zlib.Z_DEFAULT_STRATEGY, dpi=None):
+        if channels not in COLOR_TYPES:
+            raise ValueError(f'channels must be one of {sorted(COLOR_TYPES)}, got {channels}')
+        if palette is not None and (channels != 1 or not 1 <= len(palette) <= 256):
+            raise ValueError('palette images take one channel of indices and 1 to 256 colors')
+        if filter != ADAPTIVE and filter not in range(5):
+            raise ValueError(f'filter must be 0-4 or {ADAPTIVE!r}, got {filter!r}')
+        self._file = open(file, 'wb') if isinstance(file, str) else file
+        self._owns_file = isinstance(file, str)
+        self.width, self.height, self.channels = width, height, channels
+        self.filter = filter
+        self.rows_written = 0
+        self._previous = None
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+        self._pending = []
+        self._pending_bytes = 0
+        color_type = COLOR_TYPES[channels] if palette is None else PALETTE_TYPE
+        self._file.write(SIGNATURE)
+        self._file.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)))
+        if dpi:
+            per_meter = round(dpi / 0.0254)
+            self._file.write(_chunk(b'pHYs', struct.pack('>IIB', per_meter, per_meter, 1)))
+        if palette is not None:
+            import numpy as np
+
+            palette = np.asarray(palette, dtype=np.uint8)
+            self._file.write(_chunk(b'PLTE', palette[:, :3].tobytes()))
+            if palette.shape[1] == 4 and (palette[:, 3] < 255).any():
+                alpha = palette[:, 3]
+                self._file.write(_chunk(b'tRNS', alpha[:np.flatnonzero(alpha < 255)[-1] + 1].tobytes()))
+
+    def write_rows(self, rows):
+        """Appends a (rows, width, channels) uint8 array ((rows, width) of indices for palettes)"""
+        import numpy as np
+
+        rows = np.ascontiguousarray(rows, dtype=np.uint8).reshape(len(rows), self.width * self.channels)
+        if self.rows_written + len(rows) > self.height:
+            raise ValueError(f'{self.rows_written + len(rows)} rows written to a {self.height}-row PNG')
+        above = np.empty_like(rows)
+        above[0] = 0 if self._previous is None else self._previous
+        above[1:] = rows[:-1]
+        filtered = _filter_rows(rows, above, self.channels, self.filter)
+        self._previous = rows[-1].copy()
+        self.rows_written += len(rows)
+        self._queue(self._compressor.compress(filtered.tobytes()))
+
+    def _queue(self, data):
+        if data:
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+        if self._pending_bytes >= IDAT_BYTES:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._file.write(_chunk(b'IDAT', b''.join(self._pending)))
+            self._pending, self._pending_bytes = [], 0
+
+    def close(self):
+        if self._compressor is None:
+            return
+        if self.rows_written != self.height:
+            raise ValueError(f'PNG needs {self.height} rows, {self.rows_written} were written')
+        self._queue(self._compressor.flush())
+        self._compressor = None
+        self._flush()
+        self._file.write(_chunk(b'IEND', b''))
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        if kind is None:
+            self.close()
+        elif self._owns_file:
+            self._file.close()
+
+def write_png(file, pixels, level=6, palette=None, filter=FILTER_UP, strategy=zlib.Z_DEFAULT_STRATEGY, dpi=None):
+    """Writes a whole (height, width[, channels]) uint8 array as a PNG, BAND_ROWS rows at a time"""
+    height, width = pixels.shape[:2]
+    channels = pixels.shape[2] if pixels.ndim == 3 else 1
+    with PNGWriter(file, width, height, channels, level, palette, filter, strategy, dpi) as writer:
+        for y in range(0, height, BAND_ROWS):
+            writer.write_rows(pixels[y:y + BAND_ROWS].reshape(-1, width, channels))
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+PNG Size Optimizer for AdTech Teaching Assistant Diagrams
+Re-encodes rendered PNGs as small palette images and enforces size budgets
+
+savefig writes 8-bit RGBA with zlib level 6 and the Up filter on every
+row, plus a Software text chunk. The diagrams are flat fills with a few
+thousand distinct colors, nearly all of them antialiasing blends along
+edges; the 256 most frequent colors cover over 99% of the pixels. Each
+image is re-encoded as:
+
+    palette     when it has at most --colors colors, an exact (lossless)
+                palette; otherwise a weighted k-means over the distinct
+                colors (not the pixels), seeded with the most frequent
+                ones. Colors covering PIN_SHARE of the image or more stay
+                fixed, so fills and text keep their exact values and only
+                blends move to the nearest palette entry
+    RGB         the alpha channel is dropped when every pixel is opaque
+    zlib        level 9 with each of CANDIDATES (filter, strategy) pairs,
+                keeping the smallest; the winner is picked on a sample of
+                bands, then the whole image is encoded once
+    metadata    only IHDR, pHYs (the dpi, so print sizes keep), PLTE, tRNS,
+                IDAT and IEND are written
+
+The result replaces the file only when it is smaller. Counting and mapping
+colors use a 2^24-entry bincount and lookup table for opaque images, so
+nothing is sorted per pixel.
+
+Size budgets are read from size-budgets.json: a default and per-file
+limits in KB (null: no limit). check_budgets lists every output over its
+budget; the CLI and render_all.py --optimize exit with status 1 when any
+is, failing the build.
+
+Usage:
+    python png_optimize.py                       # the committed diagrams
+    python png_optimize.py out/*.png --lossless  # exact palettes only
+    python png_optimize.py --check               # budgets only, no re-encoding
+    python render_all.py --optimize              # optimize while rendering
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import zlib
+
+from png_io import ADAPTIVE, FILTER_NONE, FILTER_UP, write_png
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BUDGET_FILE = os.path.join(ROOT_DIR, 'size-budgets.json')
+MAX_COLORS = 256
+PIN_SHARE = 0.001  # colors on at least 0.1% of the pixels are kept exactly
+KMEANS_ITERATIONS = 8
+LEVEL = 9
+CANDIDATES = [
+    (FILTER_NONE, zlib.Z_DEFAULT_STRATEGY),
+    (FILTER_NONE, zlib.Z_FILTERED),
+    (FILTER_UP, zlib.Z_DEFAULT_STRATEGY),
+    (ADAPTIVE, zlib.Z_DEFAULT_STRATEGY),
+    (ADAPTIVE, zlib.Z_FILTERED),
+]
+SAMPLE_BANDS = 8
+SAMPLE_ROWS = 64
+OPTIMIZE_SETTINGS = {'colors': MAX_COLORS, 'pin_share': PIN_SHARE, 'level': LEVEL}  # part of render_all's cache keys
+
+def read_png(path):
+    """Returns (height, width, 3|4) uint8 pixels and the dpi (None when the file has none)"""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as image:
+        dpi = image.info.get('dpi', (None,))[0]
+        pixels = np.asarray(image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info
+                                          else 'RGB'))
+    if pixels.shape[2] == 4 and (pixels[..., 3] == 255).all():
+        pixels = np.ascontiguousarray(pixels[..., :3])
+    return pixels, dpi and round(dpi)
+
+def _color_counts(pixels):
+    """Returns (distinct colors (n, channels), pixel counts, per-pixel index into colors)"""
+    import numpy as np
+
+    channels = pixels.shape[2]
+    if channels == 3:
+        packed = (pixels[..., 0].astype(np.uint32) << 16) | (pixels[..., 1].astype(np.uint32) << 8) | pixels[..., 2]
+        counts = np.bincount(packed.ravel(), minlength=1 << 24)
+        present = np.flatnonzero(counts)
+        lookup = np.zeros(1 << 24, dtype=np.int32)
+        lookup[present] = np.arange(len(present), dtype=np.int32)
+        colors = np.stack([present >> 16, (present >> 8) & 255, present & 255], axis=1).astype(np.uint8)
+        return colors, counts[present], lookup[packed]
+    packed = np.ascontiguousarray(pixels).view(np.uint32)[..., 0]
+    unique, inverse, counts = np.unique(packed.ravel(), return_inverse=True, return_counts=True)
+    colors = unique.view(np.uint8).reshape(-1, 4)
+    return colors, counts, inverse.reshape(packed.shape).astype(np.int32)
+
+def _nearest(colors, palette):
+    """Index of the nearest palette entry for every color (squared Euclidean distance)"""
+    import numpy as np
+
+    colors, palette = colors.astype(np.float32), palette.astype(np.float32)
+    distances = (colors ** 2).sum(1)[:, None] - 2 * colors @ palette.T + (palette ** 2).sum(1)[None, :]
+    return distances.argmin(axis=1)
+
+def quantize(pixels, max_colors=MAX_COLORS, lossless=False):
+    """Returns ((height, width) uint8 indices, (colors, channels) uint8 palette, exact)
+
+    exact is False when colors were merged; lossless then raises ValueError instead.
+    """
+    import numpy as np
+
+    colors, counts, index = _color_counts(pixels)
+    if len(colors) <= max_colors:
+        return index.astype(np.uint8), colors, True
+    if lossless:
+        raise ValueError(f'{len(colors)} colors do not fit a {max_colors}-color palette')
+    order = np.argsort(counts)[::-1]
+    palette = colors[order[:max_colors]].astype(np.float64)
+    pinned = counts[order[:max_colors]] >= PIN_SHARE * counts.sum()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = _nearest(colors, palette)
+        weight = np.bincount(assignment, weights=counts, minlength=max_colors)
+        for channel in range(colors.shape[1]):
+            total = np.bincount(assignment, weights=counts * colors[:, channel], minlength=max_colors)
+            moved = (weight > 0) & ~pinned
+            palette[moved, channel] = total[moved] / weight[moved]
+    palette = np.rint(palette).astype(np.uint8)
+    assignment = _nearest(colors, palette).astype(np.uint8)
+    return assignment[index], palette, False
+
+def _encoded_size(indices, palette, filter, strategy):
+    import io
+
+    buffer = io.BytesIO()
+    write_png(buffer, indices, LEVEL, palette, filter, strategy)
+    return buffer.tell()
+
+def best_encoding(indices, palette):
+    """Picks the (filter, strategy) candidate that compresses a sample of bands the best"""
+    import numpy as np
+
+    height = len(indices)
+    starts = np.linspace(0, max(0, height - SAMPLE_ROWS), min(SAMPLE_BANDS, max(1, height // SAMPLE_ROWS)))
+    sample = np.concatenate([indices[int(y):int(y) + SAMPLE_ROWS] for y in starts])
+    return min(CANDIDATES, key=lambda candidate: _encoded_size(sample, palette, *candidate))
+
+def optimize_png(path, output=None, max_colors=MAX_COLORS, lossless=False):
+    """Re-encodes a PNG as a palette image, returns (bytes before, bytes after, exact palette)
+
+    The original is kept (and reported as the result) when it is already smaller.
+    """
+    output = output or path
+    before = os.path.getsize(path)
+    pixels, dpi = read_png(path)
+    indices, palette, exact = quantize(pixels, max_colors, lossless)
+    filter, strategy = best_encoding(indices, palette)
+    temporary = output + '.tmp'
+    write_png(temporary, indices, LEVEL, palette, filter, strategy, dpi)
+    after = os.path.getsize(temporary)
+    if after < before:
+        os.replace(temporary, output)
+        return before, after, exact
+    os.remove(temporary)
+    if output != path:
+        with open(path, 'rb') as source, open(output, 'wb') as target:
+            target.write(source.read())
+    return before, before, True
+
+def load_budgets(path=BUDGET_FILE):
+    """Reads {'default_kb': n, 'assets': {file name: n}}; a missing file means no budgets"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def budget_bytes(budgets, path):
+    """The size limit for one output in bytes, or None"""
+    limit = budgets.get('assets', {}).get(os.path.basename(path), budgets.get('default_kb'))
+    return None if limit is None else limit * 1024
+
+def check_budgets(paths, budgets):
+    """Returns (path, size, budget) for every output over its budget"""
+    over = []
+    for path in paths:
+        limit = budget_bytes(budgets, path)
+        size = os.path.getsize(path)
+        if limit is not None and size > limit:
+            over.append((path, size, limit))
+    return over
+
+def report_budgets(over):
+    """Prints the over-budget outputs, returns the exit status (1 when any)"""
+    for path, size, limit in over:
+        print(f'  OVER BUDGET {os.path.basename(path)}: {size / 1024:.0f} KB > {limit / 1024:.0f} KB')
+    return 1 if over else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Shrink rendered PNGs to palette images and check size budgets')
+    parser.add_argument('paths', nargs='*', help='PNG files (default: the PNGs in the repository root)')
+    parser.add_argument('--colors', type=int, default=MAX_COLORS, help='palette size (at most 256)')
+    parser.add_argument('--lossless', action='store_true', help='fail rather than merge colors')
+    parser.add_argument('--budgets', default=BUDGET_FILE, help='size budget file')
+    parser.add_argument('--check', action='store_true', help='only check the size budgets')
+    args = parser.parse_args(argv)
+    if not 1 <= args.colors <= 256:
+        parser.error('--colors must be between 1 and 256')
+    paths = args.paths or sorted(glob.glob(os.path.join(ROOT_DIR, '*.png')))
+
+    failed = []
+    if not args.check:
+        for path in paths:
+            start = time.perf_counter()
+            try:
+                before, after, exact = optimize_png(path, max_colors=args.colors, lossless=args.lossless)
+            except ValueError as error:  # --lossless with more colors than the palette holds
+                print(f'  {os.path.basename(path):<40} left unchanged: {error}')
+                failed.append(path)
+                continue
+            print(f'  {os.path.basename(path):<40} {before / 1024:7.0f} KB -> {after / 1024:5.0f} KB '
+                  f'({1 - after / before:4.0%} smaller, {"exact" if exact else "quantized"}) '
+                  f'{time.perf_counter() - start:5.2f}s')
+    status = report_budgets(check_budgets(paths, load_budgets(args.budgets)))
+    return 1 if failed else status
+
+if __name__ == "__main__":
+    sys.exit(main())
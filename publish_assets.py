@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Publishing for AdTech Teaching Assistant Diagrams
+Copies diagrams to hash-named files, writes a manifest and rewrites the docs
+
+Diagrams are saved byte-reproducibly (diagram_engine.save_figure), so a
+file's content hash changes only when the picture does. Each image is
+published as <stem>.<hash>.<ext>, where hash is the first HASH_LENGTH hex
+digits of its SHA-256: the name is then valid forever, the CDN can cache it
+with an immutable, year-long TTL, and an upload step can skip every file
+that already exists at the destination. asset-manifest.json maps each
+logical name to its hashed one, and the markdown docs are copied with
+their image and link targets rewritten to the hashed names (targets that
+already carry an older hash are rewritten too, so the rewrite can be
+re-run on its own output).
+
+Files already in the output directory are left alone, so their
+timestamps only change with their content. --prune removes hashed files
+the new manifest no longer references.
+
+Usage:
+    python publish_assets.py                      # committed PNGs + docs -> dist/
+    python publish_assets.py out/*.png -o site/ --docs blog_post.md
+    python publish_assets.py --prune
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCS = ['enhanced-blog-with-diagrams.md', 'blog_post.md']
+MANIFEST_NAME = 'asset-manifest.json'
+HASH_LENGTH = 12
+# Markdown ![alt](target "title") / [text](target) and HTML src="" / href="" targets
+LINK_TARGET = re.compile(r'(\]\(\s*<?|\b(?:src|href)\s*=\s*["\'])([^)"\'\s>]+)')
+
+def content_hash(path):
+    """First HASH_LENGTH hex digits of a file's SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+def hashed_filename(filename, digest):
+    """concept-explanation-workflow.png -> concept-explanation-workflow.<digest>.png"""
+    stem, extension = os.path.splitext(filename)
+    return f'{stem}.{digest}{extension}'
+
+def logical_filename(filename):
+    """The inverse of hashed_filename; names without a hash are returned unchanged"""
+    return re.sub(rf'\.[0-9a-f]{{{HASH_LENGTH}}}(\.[^.]+)$', r'\1', filename)
+
+def publish(paths, output_dir):
+    """Copies each file to output_dir under its hashed name, returns (manifest, newly written names)"""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest, written = {}, []
+    for path in paths:
+        filename = os.path.basename(path)
+        if filename in manifest:
+            raise ValueError(f'two assets are named {filename}')
+        hashed = hashed_filename(filename, content_hash(path))
+        manifest[filename] = hashed
+        target = os.path.join(output_dir, hashed)
+        if not os.path.exists(target):
+            shutil.copyfile(path, target + '.tmp')
+            os.replace(target + '.tmp', target)
+            written.append(hashed)
+    return manifest, written
+
+def write_manifest(manifest, output_dir):
+    """Writes the manifest with sorted keys, so unchanged assets give an unchanged file"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return path
+
+def rewrite_links(text, manifest):
+    """Points every link or image target naming a manifest asset at its hashed file"""
+    def replace(match):
+        prefix, target = match.groups()
+        directory, filename = os.path.split(target)
+        hashed = manifest.get(logical_filename(filename))
+        if hashed is None:
+            return match.group(0)
+        return prefix + (f'{directory}/{hashed}' if directory else hashed)
+
+    return LINK_TARGET.sub(replace, text)
+
+def rewrite_doc(path, manifest, output_dir):
+    """Writes a copy of a markdown file with rewritten targets to output_dir, returns (path, links rewritten)"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    rewritten = rewrite_links(text, manifest)
+    changed = sum(a != b for a, b in zip(LINK_TARGET.findall(text), LINK_TARGET.findall(rewritten)))
+    output_path = os.path.join(output_dir, os.path.basename(path))
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(rewritten)
+    return output_path, changed
+
+def prune(manifest, output_dir):
+    """Removes hashed files in output_dir that the manifest does not reference, returns their names"""
+    keep = set(manifest.values())
+    removed = []
+    for filename in sorted(os.listdir(output_dir)):
+        if logical_filename(filename) != filename and filename not in keep:
+            os.remove(os.path.join(output_dir, filename))
+            removed.append(filename)
+    return removed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Publish diagrams under content-hashed names')
+    parser.add_argument('paths', nargs='*', help='assets to publish (default: the PNGs in the repository root)')
+    parser.add_argument('-o', '--output-dir', default=os.path.join(ROOT_DIR, 'dist'))
+    parser.add_argument('--docs', nargs='*', default=[os.path.join(ROOT_DIR, name) for name in DOCS],
+                        help='markdown files to copy with rewritten image links')
+    parser.add_argument('--prune', action='store_true', help='remove hashed files no longer in the manifest')
+    args = parser.parse_args(argv)
+    paths = args.paths or sorted(glob.glob(os.path.join(ROOT_DIR, '*.png')))
+
+    manifest, written = publish(paths, args.output_dir)
+    for filename, hashed in sorted(manifest.items()):
+        print(f'  {filename:<40} {hashed:<55} {"new" if hashed in written else "unchanged"}')
+    print(f'Manifest: {write_manifest(manifest, args.output_dir)}')
+    for doc in args.docs:
+        output_path, changed = rewrite_doc(doc, manifest, args.output_dir)
+        print(f'  {changed} links rewritten: {output_path}')
+    if args.prune:
+        for filename in prune(manifest, args.output_dir):
+            print(f'  removed {filename}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
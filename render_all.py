@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Batch Renderer for AdTech Teaching Assistant Diagrams
+Discovers every create_* generator and renders them in a process pool
+
+Usage:
+    python render_all.py                  # render everything, one job per core
+    python render_all.py --jobs 2         # limit the pool size
+    python render_all.py --list           # show the discovered generators
+    python render_all.py --force          # ignore the build cache
+    python render_all.py create_learning_path_diagram
+    python render_all.py --watch          # re-render on every edit (see diagram_watch.py)
+    python render_all.py --optimize       # shrink PNGs, fail over size budgets (see png_optimize.py)
+"""
+
+import argparse
+import ast
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from build_cache import DEFAULT_OUTPUT_SETTINGS, BuildCache, cache_key
+from diagram_engine import default_output_dir, set_headless, spec_path
+from png_optimize import OPTIMIZE_SETTINGS, check_budgets, load_budgets, optimize_png, report_budgets
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scripts that contain create_* diagram generators, in render order
+GENERATOR_SCRIPTS = [
+    'aws-architecture-diagram.py',
+    'workflow_diagrams.py',
+    'conversation_flow_diagram.py',
+    'latency_waterfall.py',
+    'knowledge_graph.py',
+]
+
+_loaded_scripts = {}
+
+def load_script(script):
+    """Imports a generator script by file name (some names are not valid module names)"""
+    if script not in _loaded_scripts:
+        module_name = os.path.splitext(script)[0].replace('-', '_')
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT_DIR, script))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded_scripts[script] = module
+    return _loaded_scripts[script]
+
+def _is_generator(node):
+    return isinstance(node, ast.FunctionDef) and node.name.startswith('create_')
+
+def generator_sources(script):
+    """Returns {name: source} for the create_* functions of a script, without importing it
+
+    Each source is the function itself plus the script's shared module-level
+    code (imports, constants, helpers), which the function may depend on.
+    """
+    with open(os.path.join(ROOT_DIR, script), encoding='utf-8') as f:
+        code = f.read()
+    body = ast.parse(code).body
+    shared = '\n'.join(ast.get_source_segment(code, node) for node in body
+                       if not _is_generator(node) and not isinstance(node, ast.If))
+    return {node.name: shared + '\n' + ast.get_source_segment(code, node)
+            for node in body if _is_generator(node)}
+
+def discover_generators(scripts=GENERATOR_SCRIPTS):
+    """Returns (script, function name) pairs for every create_* function
+
+    Scripts are parsed rather than imported, so discovery never loads matplotlib.
+    """
+    return [(script, name) for script in scripts for name in generator_sources(script)]
+
+def local_imports(path):
+    """Module names of the repository's own modules a file imports, anywhere in it"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    return {name for name in names if os.path.exists(module_path(name))}
+
+def module_path(name):
+    return os.path.join(ROOT_DIR, name + '.py')
+
+def imported_modules(script):
+    """Paths of the local modules a script imports, directly or through other local modules"""
+    seen = set()
+    pending = list(local_imports(os.path.join(ROOT_DIR, script)))
+    while pending:
+        name = pending.pop()
+        if name not in seen:
+            seen.add(name)
+            pending.extend(local_imports(module_path(name)))
+    return sorted(module_path(name) for name in seen)
+
+def loaded_specs(script, name):
+    """Names of the specs a generator loads with literal load_spec('<name>') calls
+
+    Calls in the generator itself and in the script's functions it calls
+    (transitively) count; those in the rest of the script do not.
+    """
+    with open(os.path.join(ROOT_DIR, script), encoding='utf-8') as f:
+        functions = {node.name: node for node in ast.parse(f.read()).body if isinstance(node, ast.FunctionDef)}
+    specs, visited, pending = [], set(), [name]
+    while pending:
+        function = pending.pop()
+        if function in visited:
+            continue
+        visited.add(function)
+        for node in ast.walk(functions[function]):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)):
+                continue
+            argument = node.args[0] if node.args else None
+            if node.func.id == 'load_spec' and isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+                specs.append(argument.value)
+            elif node.func.id in functions:
+                pending.append(node.func.id)
+    return list(dict.fromkeys(specs))
+
+def generator_dependencies(script, name):
+    """Returns the local modules and spec files a generator renders from"""
+    return imported_modules(script) + [spec_path(spec) for spec in loaded_specs(script, name)]
+
+def generator_keys(generators, output_settings=DEFAULT_OUTPUT_SETTINGS):
+    """Returns {name: build cache key} for (script, function name) pairs"""
+    keys = {}
+    for script, name in generators:
+        keys[name] = cache_key(generator_sources(script)[name], output_settings=output_settings,
+                               dependencies=generator_dependencies(script, name))
+    return keys
+
+def _init_worker():
+    # Workers never display figures, so draw on a bare Agg canvas
+    set_headless(True)
+
+def _render_one(script, name, output_dir, optimize=False):
+    """Runs a single generator in a worker and reports its wall-clock time"""
+    start = time.perf_counter()
+    output_path = getattr(load_script(script), name)(output_dir=output_dir)
+    if optimize and output_path.endswith('.png'):
+        optimize_png(output_path)
+    elapsed = time.perf_counter() - start
+    return name, output_path, elapsed
+
+def render_all(generators, jobs=None, output_dir=None, use_cache=True, optimize=False):
+    """Renders the given generators in parallel, returns {name: (output path, seconds)}
+
+    Generators whose cache key matches the manifest in output_dir are skipped.
+    optimize re-encodes PNG outputs with png_optimize in the workers.
+    """
+    output_dir = output_dir or default_output_dir()
+    os.makedirs(output_dir, exist_ok=True)
+    cache = BuildCache(output_dir)
+    settings = dict(DEFAULT_OUTPUT_SETTINGS, optimize=OPTIMIZE_SETTINGS) if optimize else DEFAULT_OUTPUT_SETTINGS
+    keys = generator_keys(generators, settings)
+    if use_cache:
+        generators = [(script, name) for script, name in generators if not cache.is_fresh(name, keys[name])]
+    results = {}
+    if generators:
+        try:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+                futures = [pool.submit(_render_one, script, name, output_dir, optimize)
+                           for script, name in generators]
+                for future in as_completed(futures):
+                    name, output_path, elapsed = future.result()
+                    results[name] = (output_path, elapsed)
+                    cache.record(name, keys[name], [output_path])
+                    print(f'  {name:<40} {elapsed:6.2f}s  {output_path}')
+        finally:
+            # A failed render must not discard the entries of the finished ones
+            cache.save()
+    if use_cache:
+        cache.report()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render every diagram generator in parallel')
+    parser.add_argument('names', nargs='*', help='only render these create_* functions')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes (default: number of CPUs)')
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help='directory for the rendered images (default: $DIAGRAM_OUTPUT_DIR '
+                             'or the repository root)')
+    parser.add_argument('--force', action='store_true',
+                        help='re-render every diagram even when its cache entry is fresh')
+    parser.add_argument('--optimize', action='store_true',
+                        help='shrink PNG outputs to palette images and fail when one is over its size budget')
+    parser.add_argument('--list', action='store_true', help='list generators and exit')
+    parser.add_argument('--watch', action='store_true',
+                        help='stay running and re-render the diagrams each edit affects')
+    parser.add_argument('--preview-dpi', type=int, default=72,
+                        help='dpi of the quick first render in watch mode (default: 72)')
+    parser.add_argument('--dpi', type=int, default=300, help='dpi of the final render in watch mode (default: 300)')
+    args = parser.parse_args(argv)
+
+    generators = discover_generators()
+    if args.names:
+        unknown = set(args.names) - {name for _, name in generators}
+        if unknown:
+            parser.error('unknown generator(s): ' + ', '.join(sorted(unknown)))
+        generators = [(script, name) for script, name in generators if name in args.names]
+
+    if args.list:
+        for script, name in generators:
+            print(f'{script}: {name}')
+        return 0
+
+    if args.watch:
+        from diagram_watch import watch
+
+        return watch(generators, output_dir=args.output_dir, preview_dpi=args.preview_dpi, final_dpi=args.dpi)
+
+    print(f'Building {len(generators)} diagrams with {args.jobs or os.cpu_count()} jobs...')
+    start = time.perf_counter()
+    results = render_all(generators, jobs=args.jobs, output_dir=args.output_dir,
+                         use_cache=not args.force, optimize=args.optimize)
+    wall = time.perf_counter() - start
+
+    serial = sum(elapsed for _, elapsed in results.values())
+    print(f'Rendered {len(results)} diagrams in {wall:.2f}s wall clock '
+          f'({serial:.2f}s of rendering, {serial / wall if wall else 0:.1f}x speedup)')
+    if args.optimize:
+        output_dir = args.output_dir or default_output_dir()
+        entries = BuildCache(output_dir).entries
+        outputs = [os.path.join(output_dir, filename) for _, name in generators
+                   for filename in entries.get(name, {}).get('outputs', ())]
+        return report_budgets(check_budgets(outputs, load_budgets()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
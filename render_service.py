@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Local Render Service for AdTech Teaching Assistant Diagrams
+Serves diagrams over HTTP from warm worker processes with an LRU result cache
+
+A fresh process pays for the matplotlib import and the font cache before
+its first diagram. The service pays that once per worker: a pool of
+--jobs processes is started and warmed up (matplotlib loaded, specs read,
+a diagram drawn) before the port opens. The asyncio front end then:
+
+    1. reduces each request to a canonical form: defaults filled in, keys
+       sorted, equivalent values normalized (level names are
+       case-insensitive, completed concepts are a set), so requests that
+       draw the same picture share one cache key
+    2. answers from the LRU cache, which is bounded by total image bytes
+    3. otherwise joins the identical request already being rendered, if
+       there is one, or sends it to a worker
+
+Learning path PNGs are drawn like learning_path_batch.py draws them: each
+worker keeps LayeredRenderers for its last LAYERED_DPIS dpis, which draw
+the static part of the diagram once and only overlay the learner's labels.
+
+API (JSON in, image out; keep-alive connections):
+
+    POST /render   {"diagram": "learning-path", "record": {user progress record}}
+                   {"diagram": "conversation-flow", "turns": [...], "title": ..., "subtitle": ...}
+                   {"diagram": "<any spec name>"}
+                   optional "format" (png, svg, pdf) and "dpi" (DPI_RANGE)
+    GET  /stats    cache and request counters as JSON
+
+Image responses carry an ETag (the SHA-256 of the bytes) and an X-Cache
+header: hit, miss, or shared when an identical request was in flight.
+Invalid requests get 400 with {"error": ...}. benchmark_render_service.py
+load tests the service.
+
+Usage:
+    python render_service.py --port 8765 --jobs 4 --cache-mb 256
+    curl -X POST localhost:8765/render -d '{"diagram": "learning-path", "record":
+         {"name": "Sarah", "current_level": "Intermediate", "next_concept": "RTB Process"}}' -o path.png
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from conversation_flow_diagram import LEVELS
+from conversation_transcript import COLUMNS
+from diagram_engine import SPEC_DIR, SPEC_EXTENSIONS
+
+DEFAULT_PORT = 8765
+DEFAULT_DPI = 150
+DPI_RANGE = (30, 600)
+CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml', 'pdf': 'application/pdf'}
+RECORD_KEYS = {'name', 'role', 'current_level', 'completed', 'next_concept', 'focus'}
+TURN_KEYS = set(COLUMNS) | {'topic', 'level', 'suggestions'}
+MAX_BODY_BYTES = 1024 * 1024
+MAX_TURNS = 200
+LAYERED_DPIS = 4  # LayeredRenderers (one per dpi) each worker keeps
+WARM_UP_SECONDS = 0.05
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class RequestError(ValueError):
+    """A render request the service cannot serve (answered with 400)"""
+
+def _text(value, where):
+    if not isinstance(value, str) or not value.strip():
+        raise RequestError(f'{where} must be a non-empty string')
+    return value.strip()
+
+def _static_diagrams():
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(SPEC_DIR) if name.endswith(SPEC_EXTENSIONS))
+
+def canonical_request(payload):
+    """Validates a render request, returns it with defaults filled in and values normalized"""
+    if not isinstance(payload, dict):
+        raise RequestError('the request body must be a JSON object')
+    diagram = payload.get('diagram')
+    request = {'diagram': diagram, 'format': payload.get('format', 'png'), 'dpi': payload.get('dpi', DEFAULT_DPI)}
+    if request['format'] not in CONTENT_TYPES:
+        raise RequestError(f"format must be one of {sorted(CONTENT_TYPES)}, got {request['format']!r}")
+    if not isinstance(request['dpi'], int) or not DPI_RANGE[0] <= request['dpi'] <= DPI_RANGE[1]:
+        raise RequestError(f'dpi must be an integer from {DPI_RANGE[0]} to {DPI_RANGE[1]}')
+
+    if diagram == 'learning-path':
+        allowed = {'diagram', 'format', 'dpi', 'record'}
+        record = payload.get('record')
+        if not isinstance(record, dict) or set(record) - RECORD_KEYS:
+            raise RequestError(f'record must be an object with keys from {sorted(RECORD_KEYS)}')
+        level = _text(record.get('current_level'), 'record.current_level')
+        if level.lower() not in [name.lower() for name in LEVELS]:
+            raise RequestError(f'record.current_level must be one of {LEVELS}')
+        completed = record.get('completed', [])
+        if not isinstance(completed, list) or not all(isinstance(item, str) for item in completed):
+            raise RequestError('record.completed must be a list of concept names')
+        request['record'] = {
+            'name': _text(record.get('name'), 'record.name'),
+            'current_level': LEVELS[[name.lower() for name in LEVELS].index(level.lower())],
+            'next_concept': _text(record.get('next_concept'), 'record.next_concept'),
+            'completed': sorted(set(completed)),
+            **{key: _text(record[key], f'record.{key}') for key in ('role', 'focus') if record.get(key)},
+        }
+    elif diagram == 'conversation-flow':
+        allowed = {'diagram', 'format', 'dpi', 'turns', 'title', 'subtitle'}
+        turns = payload.get('turns')
+        if not isinstance(turns, list) or not 1 <= len(turns) <= MAX_TURNS:
+            raise RequestError(f'turns must be a list of 1 to {MAX_TURNS} turns')
+        for number, turn in enumerate(turns, 1):
+            if not isinstance(turn, dict) or set(turn) - TURN_KEYS or not {'user', 'agent'} <= set(turn):
+                optional = sorted(TURN_KEYS - {'user', 'agent'})
+                raise RequestError(f'turn {number} needs user and agent, and may have {optional}')
+            for key, value in turn.items():
+                if key == 'suggestions':
+                    if not (isinstance(value, str) or isinstance(value, list)
+                            and all(isinstance(item, str) for item in value)):
+                        raise RequestError(f'turn {number}.suggestions must be a string or a list of strings')
+                elif not isinstance(value, str):
+                    raise RequestError(f'turn {number}.{key} must be a string')
+        request['turns'] = turns
+        request.update({key: _text(payload[key], key) for key in ('title', 'subtitle') if payload.get(key)})
+    elif isinstance(diagram, str) and diagram in _static_diagrams():
+        allowed = {'diagram', 'format', 'dpi'}
+    else:
+        raise RequestError(f"diagram must be learning-path, conversation-flow or one of {_static_diagrams()}")
+    unknown = set(payload) - allowed
+    if unknown:
+        raise RequestError(f'unknown keys for {diagram}: {sorted(unknown)}')
+    return request
+
+def request_key(request):
+    """The cache key of a canonical request"""
+    return json.dumps(request, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+# Worker processes
+
+_base_specs = {}
+_variable_ids = []
+_layered = {}
+
+def _init_worker():
+    from conversation_flow_diagram import learning_path_texts
+    from diagram_engine import load_spec, render_to_bytes, set_headless
+    from layered_render import LayeredRenderer
+
+    set_headless(True)
+    _base_specs['learning-path'] = load_spec('learning-path-diagram')
+    variable_ids = learning_path_texts(_base_specs['learning-path'],
+                                       {'name': '', 'current_level': LEVELS[0], 'next_concept': ''})
+    _variable_ids.extend(variable_ids)
+    _layered[DEFAULT_DPI] = LayeredRenderer(_base_specs['learning-path'], _variable_ids, DEFAULT_DPI)
+    render_to_bytes(load_spec('conversation-flow-diagram'), 'png', 30)  # loads the fonts and mathtext
+
+def _warm():
+    time.sleep(WARM_UP_SECONDS)  # long enough that a worker cannot take every warm-up task by itself
+    return os.getpid()
+
+def _render(request):
+    """Renders a canonical request in a worker, returns (encoded image, seconds spent rendering)"""
+    start = time.perf_counter()
+    return bytes(_draw(request)), time.perf_counter() - start
+
+def _draw(request):
+    from conversation_flow_diagram import learning_path_texts, personalize_learning_path
+    from conversation_transcript import transcript_spec
+    from diagram_engine import load_spec, render_to_bytes
+    from layered_render import LayeredRenderer
+
+    diagram, format, dpi = request['diagram'], request['format'], request['dpi']
+    if diagram == 'learning-path':
+        base = _base_specs['learning-path']
+        if format == 'png':
+            if dpi not in _layered:
+                if len(_layered) >= LAYERED_DPIS:
+                    _layered.pop(next(iter(_layered))).close()
+                _layered[dpi] = LayeredRenderer(base, _variable_ids, dpi)
+            return _layered[dpi].render(learning_path_texts(base, request['record']))
+        spec = personalize_learning_path(base, request['record'])
+    elif diagram == 'conversation-flow':
+        spec = transcript_spec(request['turns'], request.get('title'), request.get('subtitle'))
+    else:
+        spec = load_spec(diagram)
+    return render_to_bytes(spec, format, dpi)
+
+# Front end
+
+class LRUCache:
+    """Least recently used images, bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= len(self.entries.pop(key)[0])
+        self.entries[key] = entry
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (data, _) = self.entries.popitem(last=False)
+            self.bytes -= len(data)
+            self.evictions += 1
+
+class RenderService:
+    """Canonicalizes, deduplicates, caches and dispatches render requests"""
+
+    def __init__(self, jobs=None, cache_bytes=256 * 1024 * 1024):
+        self.jobs = jobs or os.cpu_count()
+        self.cache = LRUCache(cache_bytes)
+        self.in_flight = {}
+        self.pool = None
+        self.requests = self.renders = self.shared = self.errors = 0
+        self.render_seconds = 0.0
+
+    async def start(self):
+        """Starts and warms up every worker process"""
+        loop = asyncio.get_running_loop()
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker)
+        # Each new process runs _init_worker before its first task; a worker that finished early may
+        # take several, so tasks are resubmitted until every process has answered one
+        pids = set()
+        while len(pids) < self.jobs:
+            pids.update(await asyncio.gather(*(loop.run_in_executor(self.pool, _warm)
+                                               for _ in range(self.jobs - len(pids)))))
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def render(self, payload):
+        """Returns (image bytes, etag, cache status) for a request payload"""
+        self.requests += 1
+        request = canonical_request(payload)
+        key = request_key(request)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry + ('hit',)
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future) + ('shared',)
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            data, seconds = await asyncio.get_running_loop().run_in_executor(self.pool, _render, request)
+            self.renders += 1
+            self.render_seconds += seconds
+            entry = (data, hashlib.sha256(data).hexdigest())
+            self.cache.put(key, entry)
+            future.set_result(entry)
+            return entry + ('miss',)
+        except BaseException as error:
+            self.errors += 1
+            future.set_exception(error)
+            future.exception()  # retrieved here, so an unshared failure is not logged as unhandled
+            raise
+        finally:
+            del self.in_flight[key]
+
+    def stats(self):
+        cache = self.cache
+        return {
+            'requests': self.requests, 'renders': self.renders, 'shared': self.shared, 'errors': self.errors,
+            'mean_render_ms': round(self.render_seconds / self.renders * 1000, 2) if self.renders else None,
+            'cache': {'entries': len(cache.entries), 'bytes': cache.bytes, 'max_bytes': cache.max_bytes,
+                      'hits': cache.hits, 'misses': cache.misses, 'evictions': cache.evictions},
+            'workers': self.jobs,
+        }
+
+    async def handle(self, method, path, body):
+        """Returns (status, content type, body, extra headers) for one HTTP request"""
+        if path == '/stats':
+            return 200, 'application/json', json.dumps(self.stats()).encode(), {}
+        if path != '/render':
+            return 404, 'application/json', b'{"error": "not found"}', {}
+        if method != 'POST':
+            return 405, 'application/json', b'{"error": "POST a JSON render request"}', {'Allow': 'POST'}
+        try:
+            payload = json.loads(body)
+            data, etag, status = await self.render(payload)
+        except (ValueError, KeyError) as error:  # RequestError, bad JSON, or a spec the request breaks
+            return 400, 'application/json', json.dumps({'error': str(error)}).encode(), {}
+        except Exception as error:
+            return 500, 'application/json', json.dumps({'error': f'{type(error).__name__}: {error}'}).encode(), {}
+        return 200, CONTENT_TYPES[payload.get('format', 'png')], data, {'ETag': f'"{etag}"', 'X-Cache': status}
+
+    async def serve_connection(self, reader, writer):
+        """Answers HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, content_type, body, extra = 413, 'application/json', b'{"error": "body too large"}', {}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, content_type, body, extra = await self.handle(method, path.split('?')[0], body)
+                    keep_alive = (headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1')
+                head = [f'HTTP/1.1 {status} {STATUS_TEXT[status]}', f'Content-Type: {content_type}',
+                        f'Content-Length: {len(body)}', f'Connection: {"keep-alive" if keep_alive else "close"}']
+                head += [f'{name}: {value}' for name, value in extra.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # a client that hung up or sent garbage
+        finally:
+            writer.close()
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, jobs=None, cache_bytes=256 * 1024 * 1024, ready=None):
+    """Runs the service until cancelled; ready, if given, is called with the service once it listens"""
+    service = RenderService(jobs, cache_bytes)
+    await service.start()
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    try:
+        if ready:
+            ready(service, server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+async def post(reader, writer, payload, host='localhost'):
+    """Sends one render request on an open keep-alive connection, returns (status, headers, body)"""
+    body = json.dumps(payload).encode()
+    writer.write(f'POST /render HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return status, headers, await reader.readexactly(int(headers['content-length']))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve diagrams over HTTP from warm worker processes')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: number of CPUs)')
+    parser.add_argument('--cache-mb', type=float, default=256, help='LRU cache size in MB of images')
+    args = parser.parse_args(argv)
+
+    def ready(service, port):
+        print(f'Serving on http://{args.host}:{port} with {service.jobs} warm workers, '
+              f'{args.cache_mb:g} MB cache; Ctrl-C stops')
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.jobs, int(args.cache_mb * 1024 * 1024), ready))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
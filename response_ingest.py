@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Captured Response Ingestion for AdTech Teaching Assistant
+Streams large JSONL captures of handler responses into compact count summaries
+
+Each line is one Lambda response as in benchmark_test.json, whose payload is
+double-encoded: "body" is a JSON string inside the JSON record. Decoding both
+levels for every line is most of the cost of reading millions of captures,
+and the long "response" text is never needed, so each line is first scanned
+with one multiline bytes regex that picks the statusCode and the escaped body
+fields (type, user_id and the availability flags) out of a whole block of
+lines, and identical field tuples are counted in C before any per-record
+Python work. Only lines in another layout (key order, spacing, escapes
+inside a value, error bodies) are decoded in full with json.
+
+Files are memory-mapped and split into newline-aligned byte ranges that
+worker processes count independently; the per-range counters are then
+merged. The summary holds, ordered by count:
+
+    records, malformed         responses parsed and lines that were not responses
+    status                     {statusCode: count}
+    types                      {type: count}   ("error" for bodies without one)
+    flags                      {flag: {"true": n, "false": n}}
+    configurations             {"kb+bedrock+s3": count, ...} availability combinations
+    users                      distinct user count and the top users
+
+so the diagram generators can plot any of them directly, e.g.
+barh(*zip(*summary['types'].items())).
+
+Usage:
+    python response_ingest.py captures.jsonl -o summary.json
+    python response_ingest.py captures.jsonl --jobs 8 --top-users 50
+
+    python benchmark_handler.py --requests 100000 --captures captures.jsonl
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+FLAGS = ('knowledge_base_available', 'bedrock_available', 's3_documents_available')
+FLAG_NAMES = {'knowledge_base_available': 'kb', 'bedrock_available': 'bedrock', 's3_documents_available': 's3'}
+
+# Byte ranges are read in blocks of this size, extended to the next newline
+BLOCK_BYTES = 8 * 1024 * 1024
+# Files smaller than this are counted in-process; workers would only add start-up time
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+TOP_USERS = 20
+
+# One record as the handler writes it; the body keys appear with escaped
+# quotes, and the same text inside the response would be escaped twice, so the
+# lazy skip over the response cannot stop early. Any other non-blank line is
+# captured whole by the second branch and decoded with json.
+_RECORD = re.compile(
+    rb'^\{"statusCode": (\d+), "body": "\{\\"type\\": \\"([^"\\]*)\\", \\"response\\": \\".*?\\", '
+    rb'\\"user_id\\": \\"([^"\\]*)\\", \\"knowledge_base_available\\": (true|false), '
+    rb'\\"bedrock_available\\": (true|false), \\"s3_documents_available\\": (true|false)\}"\}\r?$'
+    rb'|^(.*\S.*)$', re.M)
+
+class ResponseCounts:
+    """Mergeable counters over captured responses"""
+
+    def __init__(self):
+        self.records = 0
+        self.malformed = 0
+        self.status = Counter()
+        self.types = Counter()
+        self.users = Counter()
+        self.flags = {flag: Counter() for flag in FLAGS}
+        self.configurations = Counter()
+
+    def add(self, status, body, count=1):
+        """Counts count identical responses given the statusCode and decoded body"""
+        self.records += count
+        self.status[status] += count
+        self.types[body.get('type', 'error')] += count
+        if 'user_id' in body:
+            self.users[body['user_id']] += count
+        for flag in FLAGS:
+            if flag in body:
+                self.flags[flag][body[flag]] += count
+        if any(flag in body for flag in FLAGS):
+            available = '+'.join(FLAG_NAMES[flag] for flag in FLAGS if body.get(flag) is True)
+            self.configurations[available or 'none'] += count
+
+    def add_line(self, line, count=1):
+        """Counts a raw JSONL line by decoding it in full"""
+        try:
+            record = json.loads(line)
+            body = record['body']
+            body = json.loads(body) if isinstance(body, (str, bytes)) else body
+            self.add(int(record['statusCode']), body if isinstance(body, dict) else {}, count)
+        except (ValueError, KeyError, TypeError):
+            self.malformed += count
+
+    def add_block(self, block):
+        """Counts every line of a bytes block of whole JSONL lines"""
+        # Identical field tuples are counted in C before any Python-level work
+        for (status, kind, user, *flags, other), count in Counter(_RECORD.findall(block)).items():
+            if other:
+                self.add_line(other, count)
+                continue
+            body = {'type': kind.decode(), 'user_id': user.decode()}
+            body.update((flag, value == b'true') for flag, value in zip(FLAGS, flags))
+            self.add(int(status), body, count)
+
+    def merge(self, other):
+        self.records += other.records
+        self.malformed += other.malformed
+        self.status.update(other.status)
+        self.types.update(other.types)
+        self.users.update(other.users)
+        for flag in FLAGS:
+            self.flags[flag].update(other.flags[flag])
+        self.configurations.update(other.configurations)
+        return self
+
+    def summary(self, top_users=TOP_USERS):
+        """Compact JSON-ready counts, each mapping ordered by count"""
+        def ordered(counter):
+            return {str(key).lower() if isinstance(key, bool) else str(key): count
+                    for key, count in counter.most_common()}
+
+        return {
+            'records': self.records,
+            'malformed': self.malformed,
+            'status': ordered(self.status),
+            'types': ordered(self.types),
+            'flags': {flag: ordered(counts) for flag, counts in self.flags.items()},
+            'configurations': ordered(self.configurations),
+            'users': {'distinct': len(self.users), 'top': dict(self.users.most_common(top_users))},
+        }
+
+# File ranges
+
+def split_ranges(path, parts):
+    """Splits path into at most parts newline-aligned (start, end) byte ranges"""
+    size = os.path.getsize(path)
+    if not size:
+        return []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bounds = [0]
+        for part in range(1, parts):
+            newline = data.find(b'\n', max(size * part // parts, bounds[-1]))
+            if newline < 0:
+                break
+            if newline + 1 > bounds[-1]:
+                bounds.append(newline + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def count_range(path, start, end):
+    """Counts the responses in one byte range of a memory-mapped capture file"""
+    counts = ResponseCounts()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = start
+        while position < end:
+            stop = min(end, position + BLOCK_BYTES)
+            if stop < end:
+                newline = data.find(b'\n', stop, end)
+                stop = end if newline < 0 else newline + 1
+            counts.add_block(data[position:stop])
+            position = stop
+    return counts
+
+def ingest(path, jobs=None):
+    """Counts every response in a JSONL capture file, in parallel when it is large"""
+    jobs = jobs or os.cpu_count()
+    if jobs == 1 or os.path.getsize(path) < PARALLEL_MIN_BYTES:
+        return _merge(count_range(path, start, end) for start, end in split_ranges(path, 1))
+    # Several ranges per worker even out lines of uneven length
+    ranges = split_ranges(path, jobs * 4)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return _merge(pool.map(count_range, *zip(*((path, start, end) for start, end in ranges))))
+
+def _merge(parts):
+    total = ResponseCounts()
+    for part in parts:
+        total.merge(part)
+    return total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count captured handler responses by type, user and flags')
+    parser.add_argument('captures', nargs='+', help='JSONL files of responses (benchmark_test.json format)')
+    parser.add_argument('-o', '--output', help='write the summary JSON here (default: stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--top-users', type=int, default=TOP_USERS, help='users listed in the summary')
+    args = parser.parse_args(argv)
+
+    counts = _merge(ingest(path, args.jobs) for path in args.captures)
+    summary = counts.summary(args.top_users)
+    if not args.output:
+        print(json.dumps(summary, indent=2))
+        return 0
+    with open(args.output, 'w') as f:
+        json.dump(summary, f, indent=2)
+        f.write('\n')
+    types = ', '.join(f'{kind} {count:,}' for kind, count in summary['types'].items())
+    print(f'{summary["records"]:,} responses ({summary["malformed"]:,} malformed): {types}')
+    print(f'Wrote {args.output}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
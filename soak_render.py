@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Rendering Soak Test for AdTech Teaching Assistant Diagrams
+Renders thousands of diagrams in one process and checks that RSS stays flat
+
+A long-running renderer (render_service.py workers, the watch mode, a bot)
+must not accumulate figures, canvases or caches. This renders --renders
+diagrams headless in one process, cycling through every render_* function
+and personalized learning paths with a different learner each time, and
+fails (exit status 1) when:
+
+    RSS         resident memory (sampled every --sample renders) grows by
+                more than --max-growth-mb between the end of the warm-up
+                (the first --warm-up renders: font, glyph and path caches
+                filling) and the end of the run
+    figures     more Figure objects are alive at the end than the figure
+                pool keeps idle, or pyplot was imported
+    bytes       a fixed diagram renders to different bytes than it did on
+                a fresh, unpooled figure before the run, which would mean
+                a reused figure carried state over from an earlier diagram
+
+--no-pool disables diagram_engine's FigurePool for comparison.
+
+Usage:
+    python soak_render.py                       # 10,000 renders at 40 dpi
+    python soak_render.py --renders 2000 --no-pool
+"""
+
+import argparse
+import gc
+import hashlib
+import os
+import resource
+import sys
+import time
+
+from diagram_engine import figure_pool, set_headless
+from render_all import load_script
+
+RENDERERS = [
+    ('aws-architecture-diagram.py', 'render_aws_architecture_diagram'),
+    ('workflow_diagrams.py', 'render_concept_explanation_workflow'),
+    ('workflow_diagrams.py', 'render_quiz_generation_workflow'),
+    ('conversation_flow_diagram.py', 'render_conversation_flow_diagram'),
+    ('conversation_flow_diagram.py', 'render_learning_path_diagram'),
+    ('latency_waterfall.py', 'render_latency_waterfall'),
+    ('knowledge_graph.py', 'render_knowledge_graph'),
+]
+PERSONALIZED = 'personalized learning path'
+CONCEPTS = ['DSP Basics', 'SSP Intro', 'Ad Exchanges', 'RTB Process', 'Header Bidding', 'Attribution']
+LEVELS = ['Beginner', 'Intermediate', 'Advanced', 'Expert']
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def jobs():
+    """The renders to cycle through: (label, callable returning encoded bytes)"""
+    functions = [(name, getattr(load_script(script), name)) for script, name in RENDERERS]
+    learning_path = functions[4][1]
+
+    def personalized(number, dpi):
+        record = {'name': f'Learner {number}', 'current_level': LEVELS[number % len(LEVELS)],
+                  'completed': CONCEPTS[:number % len(CONCEPTS)], 'next_concept': CONCEPTS[number % len(CONCEPTS)]}
+        return learning_path(dpi=dpi, record=record)
+
+    return functions, personalized
+
+def live_figures():
+    from matplotlib.figure import Figure
+
+    gc.collect()
+    return sum(isinstance(item, Figure) for item in gc.get_objects())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render many diagrams in one process and check RSS stays flat')
+    parser.add_argument('--renders', type=int, default=10000)
+    parser.add_argument('--dpi', type=int, default=40)
+    parser.add_argument('--warm-up', type=int, default=500, help='renders before the RSS baseline is taken')
+    parser.add_argument('--sample', type=int, default=500, help='renders between RSS samples')
+    parser.add_argument('--max-growth-mb', type=float, default=16.0)
+    parser.add_argument('--no-pool', action='store_true', help='allocate a new figure for every render')
+    args = parser.parse_args(argv)
+    if not 0 <= args.warm_up < args.renders:
+        parser.error(f'--warm-up ({args.warm_up}) must be at least 0 and below --renders ({args.renders})')
+    if args.sample < 1:
+        parser.error('--sample must be at least 1')
+    set_headless(True)
+    pool = figure_pool()
+
+    functions, personalized = jobs()
+    pool.max_idle, max_idle = 0, pool.max_idle
+    reference = {name: hashlib.sha256(function(dpi=args.dpi)).hexdigest() for name, function in functions}
+    pool.max_idle = 0 if args.no_pool else max_idle
+
+    cycle = functions + [(PERSONALIZED, None)]
+    mismatched = set()
+    samples = []
+    start = time.perf_counter()
+    for number in range(1, args.renders + 1):
+        name, function = cycle[number % len(cycle)]
+        if function is None:
+            personalized(number, args.dpi)
+        elif hashlib.sha256(function(dpi=args.dpi)).hexdigest() != reference[name]:
+            mismatched.add(name)
+        if number == args.warm_up or number % args.sample == 0 or number == args.renders:
+            samples.append((number, rss_mb()))
+            print(f'  {number:7,} renders  RSS {samples[-1][1]:7.1f} MB  {time.perf_counter() - start:7.1f}s',
+                  flush=True)
+    elapsed = time.perf_counter() - start
+
+    baseline = next(rss for number, rss in samples if number >= args.warm_up)
+    growth = samples[-1][1] - baseline
+    figures = live_figures()
+    failures = []
+    if growth > args.max_growth_mb:
+        failures.append(f'RSS grew {growth:.1f} MB after warm-up (limit {args.max_growth_mb:g} MB)')
+    if figures > pool.max_idle:
+        failures.append(f'{figures} figures alive, the pool keeps at most {pool.max_idle}')
+    if 'matplotlib.pyplot' in sys.modules:
+        failures.append('pyplot was imported')
+    if mismatched:
+        failures.append(f"different bytes from a fresh figure: {', '.join(sorted(mismatched))}")
+
+    print(f'{args.renders:,} renders in {elapsed:.1f}s ({args.renders / elapsed:.0f}/s) at {args.dpi} dpi, '
+          f'figures created {pool.created}, reused {pool.reused}')
+    print(f'RSS {baseline:.1f} MB after {args.warm_up:,} renders, {samples[-1][1]:.1f} MB at the end '
+          f'({growth:+.1f} MB); {figures} figures alive')
+    for failure in failures:
+        print(f'FAIL: {failure}')
+    if not failures:
+        print('OK: RSS flat, no figures leaked, pooled renders byte-identical')
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import os
+
+from diagram_engine import close_figure, layout_figure, load_spec, render_to_bytes, set_headless, validate_spec
+
+def test_eps_is_reproducible_without_leaking_source_date_epoch(monkeypatch):
+    monkeypatch.delenv('SOURCE_DATE_EPOCH', raising=False)
+    set_headless(True)
+    spec = load_spec('quiz-generation-workflow')
+    first = render_to_bytes(spec, 'eps', 20)
+    assert b'%%CreationDate: Thu Jan 01 00:00:00 1970' in first
+    assert 'SOURCE_DATE_EPOCH' not in os.environ
+    assert render_to_bytes(spec, 'eps', 20) == first
+
+def test_route_label_sits_at_the_middle_of_the_route():
+    set_headless(True)
+    spec = {'name': 'route-label', 'figure': {'size': [4, 2], 'xlim': [0, 4], 'ylim': [0, 2]},
+            'nodes': [{'id': 'a', 'box': [0, 0.5, 1, 1]}, {'id': 'b', 'box': [3, 0.5, 1, 1]}],
+            'edges': [{'kind': 'route', 'source': 'a', 'target': 'b', 'style': 'straight',
+                       'label': {'id': 'loop', 'text': 'Loop'}}]}
+    fig, artists = layout_figure(validate_spec(spec))
+    try:
+        assert artists['loop'].get_position() == (2, 1)
+    finally:
+        close_figure(fig)
+
+def test_batched_routes_with_arrowstyle_draw_over_filled_nodes():
+    from benchmark_batched import pixel_difference, time_mode
+
+    set_headless(True)
+    spec = {'name': 'framed-route', 'figure': {'size': [4, 3], 'xlim': [0, 4], 'ylim': [0, 3]},
+            'nodes': [{'id': 'frame', 'box': [0.2, 0.2, 3.6, 2.6], 'facecolor': '#EEEEEE'},
+                      {'id': 'a', 'box': [0.5, 1.8, 1, 0.6]}, {'id': 'b', 'box': [2.5, 0.5, 1, 0.6]}],
+            'edges': [{'kind': 'route', 'source': 'a', 'target': 'b', 'arrowstyle': '->', 'linestyle': 'dashed'}]}
+    validate_spec(spec)
+    batched, unbatched = (time_mode(spec, batched, 50, 1)[2] for batched in (True, False))
+    assert pixel_difference(batched, unbatched) == (0, 0)
@@ -0,0 +1,17 @@
+import numpy as np
+
+from knowledge_graph import depths, graph_arrays
+
+def test_repeated_prerequisite_is_not_a_cycle():
+    ids, _, edges = graph_arrays({'dsp': ('DSP', []), 'rtb': ('RTB', ['dsp', 'dsp']), 'bid': ('Bid', ['rtb'])})
+    assert edges.tolist() == [[0, 1], [1, 2]]
+    assert depths(len(ids), edges).tolist() == [0, 1, 2]
+
+def test_depths_count_duplicated_edges():
+    edges = np.array([[0, 1], [0, 1], [1, 2]])
+    assert depths(3, edges).tolist() == [0, 1, 2]
+
+def test_cycle_members_sit_below_their_parents():
+    edges = np.array([[0, 1], [1, 2], [2, 1], [2, 3]])
+    assert depths(4, edges).tolist() == [0, 1, 2, 3]
+    assert depths(2, np.array([[0, 1], [1, 0]])).tolist() == [0, 1]
@@ -0,0 +1,26 @@
+import json
+
+import numpy as np
+
+from latency_waterfall import BIN_MS, LatencyHistograms, collect, read_trace_chunks
+
+def test_negative_durations_count_as_zero():
+    histograms = LatencyHistograms(['a', 'b'])
+    histograms.add([[-2.0, 10.0], [5.0, -1.0]])
+    assert histograms.counts.sum(axis=1).tolist() == [2, 2, 2, 2, 2]
+    assert histograms.counts[0, 0] == 1
+    assert histograms.counts[1, 0] == 1
+    assert histograms.maxima.tolist() == [5.0, 10.0, 5.0, 10.0, 10.0]
+
+def test_jsonl_stage_first_seen_in_later_chunk(tmp_path):
+    trace = tmp_path / 'trace.jsonl'
+    records = [{'a': 1.0, 'c': 2.0}] * 3 + [{'a': 1.0, 'b': 4.0, 'c': 2.0}]
+    trace.write_text(''.join(json.dumps({'stages': stages}) + '\n' for stages in records))
+    histograms = collect(read_trace_chunks(str(trace), chunk_rows=2))
+    assert histograms.stages == ['a', 'b', 'c']
+    summary = histograms.summary()
+    assert [stage['duration']['count'] for stage in summary['stages']] == [4, 1, 4]
+    assert summary['stages'][1]['duration']['max'] == 4.0
+    # c ends at 3 ms without b and at 7 ms with it
+    assert np.flatnonzero(histograms.counts[5]).tolist() == [int(3 / BIN_MS), int(7 / BIN_MS)]
+    assert summary['total']['count'] == 4
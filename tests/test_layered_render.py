@@ -0,0 +1,41 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from conversation_flow_diagram import learning_path_texts, personalize_learning_path
+from diagram_engine import load_spec, render_to_bytes, set_headless
+from layered_render import LayeredRenderer
+
+RECORD = {'name': 'Ana', 'current_level': 'Intermediate', 'completed': ['DSP Basics', 'SSP Intro'],
+          'next_concept': 'Ad Exchanges'}
+
+def _pixels(png):
+    return np.asarray(Image.open(io.BytesIO(png)).convert('RGB')).astype(np.int16)
+
+def test_layered_render_matches_savefig():
+    set_headless(True)
+    spec = load_spec('learning-path-diagram')
+    texts = learning_path_texts(spec, RECORD)
+    renderer = LayeredRenderer(spec, list(texts), dpi=150)
+    try:
+        layered = _pixels(renderer.render(texts))
+        layered_again = _pixels(renderer.render(texts))  # pasted from the patch cache
+    finally:
+        renderer.close()
+    expected = _pixels(render_to_bytes(personalize_learning_path(spec, RECORD), 'png', 150))
+    assert layered.shape == expected.shape
+    for pixels in (layered, layered_again):
+        difference = np.abs(pixels - expected).max(axis=2)
+        assert (difference > 40).sum() <= 0.0005 * difference.size
+
+def test_matplotlib_is_a_version_whose_tight_bbox_helper_is_supported():
+    # LayeredRenderer calls matplotlib._tight_bbox.adjust_bbox, a private helper of savefig;
+    # check any new matplotlib version against test_layered_render_matches_savefig before widening this
+    import inspect
+
+    import matplotlib
+    from matplotlib._tight_bbox import adjust_bbox
+
+    assert (3, 8) <= tuple(int(part) for part in matplotlib.__version__.split('.')[:2]) < (3, 12)
+    assert list(inspect.signature(adjust_bbox).parameters) == ['fig', 'bbox_inches', 'renderer', 'fixed_dpi']
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from edge_router import Router
+from mermaid_diagrams import DEFAULT_DOCS, ROOT_DIR, Flowchart, collect_blocks, diagram_type
+
+SHARED_RANKS = '''graph TB
+    subgraph "Core"
+        A[Message Router] --> B[Intent Classifier]
+        B --> C[Context Manager]
+        F[Natural Language Understanding] --> B
+        G[Conversation Memory] --> C
+    end
+    subgraph "Specialization"
+        J[Intent Patterns]
+        K[Educational Context]
+    end
+    J --> F
+    K --> G
+    C --> N[Response]
+'''
+
+NESTED = '''flowchart LR
+    subgraph outer [Platform]
+        subgraph api [API]
+            A[Gateway] --> B[Router]
+        end
+        subgraph jobs [Workers]
+            C[Queue] --> D[Renderer]
+        end
+        E[Scheduler] --> C
+    end
+    subgraph store [Storage]
+        F[Cache] --> G[Bucket]
+    end
+    B --> D
+    F --> B
+    X[Client] --> A
+'''
+
+def _flowcharts():
+    blocks, _ = collect_blocks([os.path.join(ROOT_DIR, doc) for doc in DEFAULT_DOCS])
+    sources = [(name, source) for _, _, _, name, source in blocks if diagram_type(source) in ('graph', 'flowchart')]
+    bottom_up = SHARED_RANKS.replace('graph TB', 'graph BT')
+    return [('shared-ranks', SHARED_RANKS), ('shared-ranks-bt', bottom_up), ('nested', NESTED)] + sources
+
+FLOWCHARTS = _flowcharts()
+
+def _intersect(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+@pytest.mark.parametrize('name, source', FLOWCHARTS, ids=[name for name, _ in FLOWCHARTS])
+def test_subgraph_frames_are_disjoint(name, source):
+    flowchart = Flowchart(source)
+    boxes = {node['id']: node['box'] for node in flowchart.to_spec(name)['nodes']}
+    frames = {index: boxes[f'subgraph_{index}'] for index in range(len(flowchart.subgraphs))
+              if f'subgraph_{index}' in boxes}
+    for index, frame in frames.items():
+        parent = flowchart.subgraphs[index]['parent']
+        for other, other_frame in frames.items():
+            if other > index and flowchart.subgraphs[other]['parent'] == parent:
+                assert not _intersect(frame, other_frame), (flowchart.subgraphs[index]['title'],
+                                                            flowchart.subgraphs[other]['title'])
+        for node_id in flowchart.nodes:
+            if index not in flowchart._subgraph_path(node_id):
+                assert not _intersect(frame, boxes[f'node_{node_id}']), (flowchart.subgraphs[index]['title'], node_id)
+
+@pytest.mark.parametrize('name, source', FLOWCHARTS, ids=[name for name, _ in FLOWCHARTS])
+def test_edges_go_around_other_nodes(name, source):
+    spec = Flowchart(source).to_spec(name)
+    boxes = {node['id']: node['box'] for node in spec['nodes'] if node['id'].startswith('node_')}
+    router = Router(spec['nodes'])
+    for edge in spec['edges']:
+        points = router.orthogonal(edge['source'], edge['target'])
+        samples = [(p[0] + (q[0] - p[0]) * k / 20, p[1] + (q[1] - p[1]) * k / 20)
+                   for p, q in zip(points, points[1:]) for k in range(21)]
+        for node_id, box in boxes.items():
+            if node_id not in (edge['source'], edge['target']):
+                assert not any(_intersect((x, y, 0, 0), box) for x, y in samples), (edge, node_id)
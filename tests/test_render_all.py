@@ -0,0 +1,58 @@
+import glob
+import os
+import shutil
+
+import pytest
+
+import render_all
+from build_cache import BuildCache
+from diagram_engine import spec_path
+from diagram_watch import Watcher
+from render_all import discover_generators, generator_keys, loaded_specs
+
+def test_loaded_specs_follow_the_generator_not_the_script():
+    script = 'conversation_flow_diagram.py'
+    assert loaded_specs(script, 'create_conversation_flow_diagram') == ['conversation-flow-diagram']
+    # loaded through learning_path_spec, a helper in the same script
+    assert loaded_specs(script, 'create_learning_path_diagram') == ['learning-path-diagram']
+    assert loaded_specs('knowledge_graph.py', 'create_knowledge_graph') == []
+
+def test_spec_edit_rebuilds_only_the_generators_loading_it(tmp_path):
+    watcher = Watcher(discover_generators(), output_dir=str(tmp_path))
+    assert watcher.specs[spec_path('learning-path-diagram')] == {'create_learning_path_diagram'}
+
+def _edit_invalidates(tmp_path, monkeypatch, module, names):
+    """Records cache keys for the named generators in a copy of the tree, edits module, returns the misses"""
+    for path in glob.glob(os.path.join(render_all.ROOT_DIR, '*.py')):
+        shutil.copy(path, tmp_path)
+    monkeypatch.setattr(render_all, 'ROOT_DIR', str(tmp_path))
+    generators = [(script, name) for script, name in discover_generators() if name in names]
+    cache = BuildCache(str(tmp_path))
+    for name, key in generator_keys(generators).items():
+        cache.record(name, key, [])
+    with open(tmp_path / module, 'a', encoding='utf-8') as f:
+        f.write('\n# edited\n')
+    keys = generator_keys(generators)
+    return {name for name in names if not cache.is_fresh(name, keys[name])}
+
+def test_engine_edit_invalidates_generators_without_specs(tmp_path, monkeypatch):
+    names = {'create_knowledge_graph', 'create_latency_waterfall'}
+    assert _edit_invalidates(tmp_path, monkeypatch, 'diagram_engine.py', names) == names
+
+def test_text_fit_edit_invalidates_latency_waterfall(tmp_path, monkeypatch):
+    names = {'create_latency_waterfall'}
+    assert _edit_invalidates(tmp_path, monkeypatch, 'text_fit.py', names) == names
+
+def test_failed_render_keeps_finished_cache_entries(tmp_path, monkeypatch):
+    for path in glob.glob(os.path.join(render_all.ROOT_DIR, '*.py')):
+        shutil.copy(path, tmp_path)
+    (tmp_path / 'failing.py').write_text("def create_failing(output_dir=None):\n    raise RuntimeError('broken')\n")
+    monkeypatch.setattr(render_all, 'ROOT_DIR', str(tmp_path))
+    generators = [('knowledge_graph.py', 'create_knowledge_graph'), ('failing.py', 'create_failing')]
+    output_dir = str(tmp_path / 'out')
+    with pytest.raises(RuntimeError):
+        render_all.render_all(generators, jobs=1, output_dir=output_dir)
+    keys = generator_keys(generators)
+    cache = BuildCache(output_dir)
+    assert cache.is_fresh('create_knowledge_graph', keys['create_knowledge_graph'])
+    assert not cache.is_fresh('create_failing', keys['create_failing'])
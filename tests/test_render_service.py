@@ -0,0 +1,13 @@
+import pytest
+
+from render_service import RequestError, canonical_request
+
+@pytest.mark.parametrize('turn', [{'user': 1, 'agent': 'Hi'}, {'user': 'Hi', 'agent': None},
+                                  {'user': 'Hi', 'agent': 'Hi', 'suggestions': ['RTB', 2]}])
+def test_turn_values_must_be_strings(turn):
+    with pytest.raises(RequestError):
+        canonical_request({'diagram': 'conversation-flow', 'turns': [turn]})
+
+def test_suggestions_may_be_a_list_of_strings():
+    turn = {'user': 'Hi', 'agent': 'Hello', 'suggestions': ['RTB', 'DSP']}
+    assert canonical_request({'diagram': 'conversation-flow', 'turns': [turn]})['turns'] == [turn]
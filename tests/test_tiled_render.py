@@ -0,0 +1,23 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from diagram_engine import build_figure, close_figure, load_spec, render_to_bytes, set_headless
+from tiled_render import TiledRenderer
+
+def _pixels(source):
+    return np.asarray(Image.open(source).convert('RGB')).astype(np.int16)
+
+def test_tiled_render_matches_savefig(tmp_path):
+    set_headless(True)
+    spec = load_spec('aws-serverless-architecture')
+    fig = build_figure(spec)
+    try:
+        path = TiledRenderer(fig, 150).write_png(str(tmp_path / 'tiled.png'), band_rows=100)
+    finally:
+        close_figure(fig)
+    tiled = _pixels(path)
+    expected = _pixels(io.BytesIO(render_to_bytes(spec, 'png', 150)))
+    assert tiled.shape == expected.shape
+    assert np.abs(tiled - expected).max() <= 1
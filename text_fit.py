@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Text Fitting for AdTech Teaching Assistant Diagrams
+Wraps, shrinks and stacks node labels so they stay inside their boxes
+
+Strings are measured with matplotlib's Agg text metrics, in points, through
+a memoized text_extent: each (text, size, weight, style) combination is
+measured once per process, so bulk renders that lay out the same labels
+thousands of times only pay for the strings they have not seen yet.
+
+Two kinds of spec nodes are laid out here (see diagram_engine):
+
+    "lines": [{"text", ...text options}]   labels without coordinates; they are
+                                           stacked top to bottom, centered in
+                                           the box, wrapped and shrunk to fit
+    "fit": true                            hand-placed labels are kept as they
+                                           are while every line fits the box
+                                           width; otherwise they are re-stacked
+                                           as if they were "lines"
+
+Wrapping breaks at spaces; when the lines still do not fit, every label of
+the node shrinks by the same factor down to MIN_FONTSIZE, and lines that do
+not fit at that size are cut with an ellipsis.
+
+This module only imports matplotlib once something is measured.
+
+Usage:
+    from text_fit import fit_node, text_extent
+    labels = fit_node(node, points_per_unit=(55.8, 55.4))
+    width, height, descent = text_extent('Header Bidding', 10, 'bold')
+"""
+
+from functools import lru_cache
+
+DEFAULT_FONTSIZE = 10  # matplotlib's default font.size
+MIN_FONTSIZE = 6
+LINE_SPACING = 1.2  # matplotlib's default Text linespacing
+PADDING_PT = 4  # kept clear inside each side of a box
+ELLIPSIS = '…'
+DEFAULT_BOXSTYLE = 'round,pad=0.1'  # diagram_engine's node default
+
+@lru_cache(maxsize=None)
+def _renderer():
+    from matplotlib.backends.backend_agg import RendererAgg
+
+    return RendererAgg(1, 1, 72)  # 72 dpi: pixels are points
+
+@lru_cache(maxsize=None)
+def _font(fontsize, fontweight, style):
+    from matplotlib.font_manager import FontProperties
+
+    return FontProperties(size=fontsize, weight=fontweight, style=style)
+
+@lru_cache(maxsize=65536)
+def text_extent(text, fontsize=DEFAULT_FONTSIZE, fontweight='normal', style='normal'):
+    """Returns (width, height, descent) of one line of text in points"""
+    return _renderer().get_text_width_height_descent(text, _font(fontsize, fontweight, style), ismath=False)
+
+def text_width(text, fontsize=DEFAULT_FONTSIZE, fontweight='normal', style='normal'):
+    return text_extent(text, fontsize, fontweight, style)[0] if text else 0.0
+
+def wrap_text(text, width, fontsize=DEFAULT_FONTSIZE, fontweight='normal', style='normal'):
+    """Breaks text at spaces into lines at most width points wide
+
+    Explicit newlines are kept; a single word wider than width gets a line
+    of its own.
+    """
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ''
+        for word in paragraph.split(' '):
+            candidate = f'{line} {word}' if line else word
+            if line and text_width(candidate, fontsize, fontweight, style) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+def ellipsize(text, width, fontsize=DEFAULT_FONTSIZE, fontweight='normal', style='normal'):
+    """Cuts text to fit width points, ending it with an ellipsis"""
+    if text_width(text, fontsize, fontweight, style) <= width:
+        return text
+    low, high = 0, len(text)
+    while low < high:  # longest prefix that fits with the ellipsis
+        middle = (low + high + 1) // 2
+        if text_width(text[:middle].rstrip() + ELLIPSIS, fontsize, fontweight, style) <= width:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + ELLIPSIS
+
+def shrink_to_width(text, width, fontsize=DEFAULT_FONTSIZE, fontweight='normal', style='normal'):
+    """Returns (text, fontsize) keeping text on one line within width points"""
+    size = fontsize
+    while size > MIN_FONTSIZE and text_width(text, size, fontweight, style) > width:
+        size = max(MIN_FONTSIZE, size - 0.5)
+    return ellipsize(text, width, size, fontweight, style), size
+
+def _font_of(label):
+    return label.get('fontsize', DEFAULT_FONTSIZE), label.get('fontweight', 'normal'), label.get('style', 'normal')
+
+def box_extent(node):
+    """Returns the drawn (x, y, width, height) of a node, including its boxstyle pad"""
+    x, y, width, height = node['box']
+    style = node.get('boxstyle', DEFAULT_BOXSTYLE)
+    pad = float(style.partition('pad=')[2].split(',')[0]) if 'pad=' in style else 0.3  # matplotlib's default
+    return x - pad, y - pad, width + 2 * pad, height + 2 * pad
+
+def available_width(node, label, points_per_unit):
+    """Width in points a label has inside its node, given its x and alignment"""
+    x, _, width, _ = box_extent(node)
+    scale = points_per_unit[0]
+    left, right = x * scale + PADDING_PT, (x + width) * scale - PADDING_PT
+    if 'x' not in label:
+        return right - left
+    position = label['x'] * scale
+    ha = label.get('ha', 'center')
+    if ha == 'left':
+        return right - position
+    if ha == 'right':
+        return position - left
+    return 2 * min(position - left, right - position)
+
+def _fits_width(node, labels, points_per_unit):
+    for label in labels:
+        size, weight, style = _font_of(label)
+        width = available_width(node, label, points_per_unit)
+        if any(text_width(line, size, weight, style) > width for line in label['text'].split('\n')):
+            return False
+    return True
+
+def _wrap_all(labels, widths, scale):
+    blocks = []
+    for label, width in zip(labels, widths):
+        size, weight, style = _font_of(label)
+        size = max(MIN_FONTSIZE, round(size * scale * 2) / 2)  # half points keep the cache small
+        blocks.append((wrap_text(label['text'], width, size, weight, style), size))
+    return blocks
+
+def _fit_blocks(labels, widths, height):
+    """Wraps every label, shrinking them together until the stack fits height points"""
+    scale = 1.0
+    while True:
+        blocks = _wrap_all(labels, widths, scale)
+        total = sum(len(lines) * size * LINE_SPACING for lines, size in blocks)
+        too_wide = any(text_width(line, size, *_font_of(label)[1:]) > width
+                       for (lines, size), label, width in zip(blocks, labels, widths) for line in lines)
+        if (total <= height and not too_wide) or all(size <= MIN_FONTSIZE for _, size in blocks):
+            break
+        scale *= 0.9
+    # At the smallest size, cut what still overflows: long words, then surplus lines
+    blocks = [([ellipsize(line, width, size, *_font_of(label)[1:]) for line in lines], size)
+              for (lines, size), label, width in zip(blocks, labels, widths)]
+    while sum(len(lines) * size * LINE_SPACING for lines, size in blocks) > height:
+        index = max(i for i, (lines, _) in enumerate(blocks) if lines)
+        lines, size = blocks[index]
+        if len(lines) == 1 and index == 0:
+            break  # keep at least one line
+        label, width = labels[index], widths[index]
+        lines = lines[:-1]
+        if lines:
+            lines[-1] = ellipsize(lines[-1] + ' ' + ELLIPSIS, width, size, *_font_of(label)[1:])
+        blocks[index] = (lines, size)
+    return blocks
+
+def stack_labels(node, labels, points_per_unit):
+    """Wraps, shrinks and stacks labels top to bottom, centered in the node's box"""
+    x, y, width, height = box_extent(node)
+    x_scale, y_scale = points_per_unit
+    widths = [available_width(node, label, points_per_unit) for label in labels]
+    blocks = _fit_blocks(labels, widths, height * y_scale - 2 * PADDING_PT)
+
+    total = sum(len(lines) * size * LINE_SPACING for lines, size in blocks) / y_scale
+    top = y + (height + total) / 2
+    placed = []
+    for label, (lines, size) in zip(labels, blocks):
+        block_height = len(lines) * size * LINE_SPACING / y_scale
+        placed_label = dict(label, text='\n'.join(lines), fontsize=size, y=top - block_height / 2, va='center')
+        if 'x' not in label:
+            ha = label.get('ha', 'center')
+            padding = PADDING_PT / x_scale
+            placed_label['x'] = {'left': x + padding, 'right': x + width - padding}.get(ha, x + width / 2)
+        placed.append(placed_label)
+        top -= block_height
+    return placed
+
+def fit_node(node, points_per_unit):
+    """Returns the labels to draw for a node, laid out when it has lines or fit
+
+    points_per_unit is the (x, y) size of one data unit in points.
+    """
+    labels = node.get('labels', [])
+    if node.get('lines'):
+        return labels + stack_labels(node, node['lines'], points_per_unit)
+    if not node.get('fit') or not labels or _fits_width(node, labels, points_per_unit):
+        return labels
+    # Re-stack in reading order (top first), then return them in spec order
+    order = sorted(range(len(labels)), key=lambda i: -labels[i]['y'])
+    placed = stack_labels(node, [labels[i] for i in order], points_per_unit)
+    result = [None] * len(labels)
+    for i, label in zip(order, placed):
+        result[i] = label
+    return result
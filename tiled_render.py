@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tiled Rendering for AdTech Teaching Assistant Diagrams
+Rasterizes poster-size diagrams region by region with bounded memory
+
+savefig at 600 dpi allocates an RGBA buffer for the whole canvas (a 16x12
+inch diagram is 9600x7200 pixels, 276 MB) and the tight-bbox pass draws it
+once more. Here the figure is drawn into a small Agg renderer once per
+region instead: the figure's dpi transform is shifted by the region's
+offset, so every artist lands where it would on the full canvas and Agg
+clips everything else. Regions differ by whole pixels, so they join
+without seams, and the output has the size and sub-pixel placement of
+savefig's tight render, so its pixels match.
+
+Two outputs are built from regions:
+
+    PNG        bands of --band-rows full-width rows, streamed into png_io's
+               PNGWriter; memory is about width x band rows x 7 bytes
+    Deep Zoom  a DZI pyramid (OpenSeadragon and similar viewers) of --tile
+               square tiles; full-resolution tiles are drawn in blocks of
+               8x8 tiles, every lower level is averaged from the four
+               tiles below it, depth first, so memory is one block plus
+               a few tiles per level whatever the canvas size
+
+The crop box is the one savefig(bbox_inches='tight') would use, measured
+with a 1x1 pixel renderer at the target dpi; like savefig, its size is
+truncated to whole pixels and its corner keeps its fractional offset.
+Transparent areas are composited onto the facecolor.
+
+Usage:
+    python tiled_render.py aws-serverless-architecture --dpi 600 -o out/
+    python tiled_render.py aws-serverless-architecture --dpi 1200 --deep-zoom -o out/
+"""
+
+import argparse
+import math
+import os
+import resource
+import sys
+import time
+
+from diagram_engine import build_figure, close_figure, load_spec, output_filename, set_headless
+from png_io import PNGWriter, write_png
+
+BAND_ROWS = 256
+TILE_SIZE = 256
+BLOCK_LEVELS = 3  # deep zoom draws blocks of 2^3 x 2^3 tiles at once
+PAD_INCHES = 0.1  # savefig's default pad_inches
+
+class TiledRenderer:
+    """Draws any pixel region of a laid-out figure's tight crop at a given dpi"""
+
+    def __init__(self, fig, dpi, facecolor='white', pad_inches=PAD_INCHES):
+        import numpy as np
+        from matplotlib.backends.backend_agg import RendererAgg
+        from matplotlib.colors import to_rgb
+
+        self.fig, self.dpi = fig, dpi
+        fig.set_dpi(dpi)
+        fig.patch.set_facecolor(facecolor)
+        bbox = fig.get_tightbbox(RendererAgg(1, 1, dpi)).padded(pad_inches)
+        # As savefig: the figure moves by the box corner's (fractional) pixel offset, and the canvas
+        # is the box size truncated to whole pixels
+        self.left, self.bottom = bbox.x0 * dpi, bbox.y0 * dpi
+        self.width, self.height = int(bbox.width * dpi), int(bbox.height * dpi)
+        self._background = np.rint(np.array(to_rgb(facecolor)) * 255).astype(np.uint16)
+
+    def render(self, x, y, width, height):
+        """Returns the (height, width, 3) uint8 pixels whose top-left corner is (x, y) of the crop"""
+        import numpy as np
+        from matplotlib.backends.backend_agg import RendererAgg
+
+        renderer = RendererAgg(width, height, self.dpi)
+        # Shift the figure so the region's bottom-left pixel lands on the renderer's origin
+        shift_x = self.left + x
+        shift_y = self.bottom + self.height - y - height
+        self.fig.dpi_scale_trans.clear().scale(self.dpi).translate(-shift_x, -shift_y)
+        try:
+            self.fig.draw(renderer)
+        finally:
+            self.fig.dpi_scale_trans.clear().scale(self.dpi)
+        rgba = np.asarray(renderer.buffer_rgba()).astype(np.uint16)
+        alpha = rgba[..., 3:4]
+        return ((rgba[..., :3] * alpha + self._background * (255 - alpha) + 127) // 255).astype(np.uint8)
+
+    def write_png(self, path, band_rows=BAND_ROWS):
+        """Streams the whole crop into a PNG, band_rows full-width rows at a time"""
+        with PNGWriter(path, self.width, self.height) as writer:
+            for y in range(0, self.height, band_rows):
+                writer.write_rows(self.render(0, y, self.width, min(band_rows, self.height - y)))
+        return path
+
+    def write_deep_zoom(self, output_dir, stem, tile=TILE_SIZE):
+        """Writes stem.dzi and its stem_files/<level>/<column>_<row>.png pyramid, returns the .dzi path"""
+        top = max(0, math.ceil(math.log2(max(self.width, self.height))))
+        tiles_dir = os.path.join(output_dir, f'{stem}_files')
+
+        def size(level):
+            scale = 2 ** (top - level)
+            return -(-self.width // scale), -(-self.height // scale)
+
+        def build(level, column, row, block=None):
+            # Returns the tile's pixels after writing it; children first, depth first.
+            # block is the drawn full-resolution region the tile's subtree lies in.
+            level_width, level_height = size(level)
+            x, y = column * tile, row * tile
+            if x >= level_width or y >= level_height:
+                return None
+            if level == top:
+                (block_x, block_y), pixels = block
+                pixels = pixels[y - block_y:y - block_y + tile, x - block_x:x - block_x + tile]
+            else:
+                if level == top - BLOCK_LEVELS:
+                    span = tile << BLOCK_LEVELS
+                    region = (column * span, row * span)
+                    block = region, self.render(*region, min(span, self.width - region[0]),
+                                                min(span, self.height - region[1]))
+                pixels = _half(_join([[build(level + 1, 2 * column + dx, 2 * row + dy, block) for dx in (0, 1)]
+                                      for dy in (0, 1)]))
+            level_dir = os.path.join(tiles_dir, str(level))
+            os.makedirs(level_dir, exist_ok=True)
+            write_png(os.path.join(level_dir, f'{column}_{row}.png'), pixels)
+            return pixels
+
+        build(0, 0, 0, ((0, 0), self.render(0, 0, self.width, self.height)) if top <= BLOCK_LEVELS else None)
+        path = os.path.join(output_dir, f'{stem}.dzi')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="png" Overlap="0" '
+                    f'TileSize="{tile}">\n  <Size Width="{self.width}" Height="{self.height}"/>\n</Image>\n')
+        return path
+
+def _join(grid):
+    """Stitches a 2x2 grid of tiles (missing ones None) into one array"""
+    import numpy as np
+
+    rows = [np.concatenate([tile for tile in row if tile is not None], axis=1)
+            for row in grid if row[0] is not None]
+    return np.concatenate(rows, axis=0)
+
+def _half(pixels):
+    """Halves an image with a 2x2 box filter, repeating the last row/column of odd sizes"""
+    import numpy as np
+
+    height, width = pixels.shape[:2]
+    padded = np.pad(pixels, ((0, height % 2), (0, width % 2), (0, 0)), mode='edge').astype(np.uint16)
+    total = padded[0::2, 0::2] + padded[1::2, 0::2] + padded[0::2, 1::2] + padded[1::2, 1::2]
+    return ((total + 2) // 4).astype(np.uint8)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render poster-size diagrams tile by tile with bounded memory')
+    parser.add_argument('specs', nargs='+', help='spec names or JSON/YAML files')
+    parser.add_argument('-o', '--output-dir', default='.')
+    parser.add_argument('--dpi', type=int, default=600)
+    parser.add_argument('--band-rows', type=int, default=BAND_ROWS, help='rows per PNG band')
+    parser.add_argument('--deep-zoom', action='store_true', help='write a DZI tile pyramid instead of a PNG')
+    parser.add_argument('--tile', type=int, default=TILE_SIZE, help='deep zoom tile size in pixels')
+    args = parser.parse_args(argv)
+    set_headless(True)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for name in args.specs:
+        spec = load_spec(name)
+        start = time.perf_counter()
+        fig = build_figure(spec)
+        tiles = TiledRenderer(fig, args.dpi)
+        stem = os.path.splitext(output_filename(spec))[0]
+        if args.deep_zoom:
+            path = tiles.write_deep_zoom(args.output_dir, stem, args.tile)
+        else:
+            path = tiles.write_png(os.path.join(args.output_dir, f'{stem}-{args.dpi}dpi.png'), args.band_rows)
+        close_figure(fig)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f'{tiles.width}x{tiles.height} px in {time.perf_counter() - start:.1f}s, '
+              f'peak RSS {peak:.0f} MB: {path}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())